@@ -1,24 +1,41 @@
 # app/api/archivos/v1/routes.py
-from typing import List, Optional
+from tempfile import SpooledTemporaryFile
+from typing import Awaitable, BinaryIO, List, Optional, Tuple, Union
 from uuid import UUID
 
 import httpx
 from fastapi import (
     APIRouter,
+    Header,
     HTTPException,
     Query,
     UploadFile,
     File,
     status,
 )
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 
 from app.api.archivos.v1.schemas import (
     FileOut,
     PresignDownloadResponse,
-    PresignDownloadRequest
+    PresignDownloadRequest,
+    DedupStatsOut,
+    BatchUploadItem,
+    BatchUploadResponse,
 )
+from app.core.concurrency import gather_limited
+from app.core.config import settings
+from app.core.idempotency import IDEMPOTENCY_HEADER, idempotency_store
+from app.core.upstream import translate_httpx_error
 from app.services.archivos import client as archivos_client
+from app.services.archivos.dedup import (
+    HASH_CHUNK_SIZE,
+    SPOOL_MAX_SIZE,
+    HashingReader,
+    dedup_index,
+    new_hasher,
+)
+from app.services.archivos.zip_stream import stream_zip, unique_entry_names
 
 
 router = APIRouter(
@@ -26,37 +43,13 @@ router = APIRouter(
 )
 
 
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
-    """
-    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
-    """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = (
-                body.get("message")
-                or body.get("detail")
-                or default_message
-            )
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
-
-
 @router.post(
     "/",
     response_model=FileOut,
     status_code=status.HTTP_201_CREATED,
 )
 async def upload_file(
+    response: Response,
     message_id: Optional[str] = Query(
         None,
         description="ID del mensaje asociado (opcional, pero debe ir message_id o thread_id)",
@@ -66,10 +59,17 @@ async def upload_file(
         description="ID del hilo asociado (opcional, pero debe ir message_id o thread_id)",
     ),
     upload: UploadFile = File(..., description="Archivo a subir"),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    x_user_id: Optional[str] = Header(None, alias="X-User-Id"),
 ):
     """
     Sube un archivo y lo asocia a un mensaje o hilo.
 
+    Con `Idempotency-Key`, un reintento con la misma clave (mismo usuario
+    y mismo contenido) no vuelve a subir el archivo: recibe el resultado
+    del primero. En ese caso el archivo se copia antes de subirlo, para que
+    la subida termine aunque el cliente se desconecte.
+
     Gateway:    POST /api/v1/archivos/
     MS archivos: POST /v1/files
     """
@@ -79,17 +79,216 @@ async def upload_file(
             detail="Debe enviar message_id o thread_id",
         )
 
-    try:
-        file_bytes = await upload.read()
-        return await archivos_client.upload_file(
-            message_id=message_id,
-            thread_id=thread_id,
-            file_bytes=file_bytes,
-            filename=upload.filename or "upload",
-            mime_type=upload.content_type or "application/octet-stream",
+    if idempotency_key is None:
+        try:
+            uploaded, dedup = await _upload_with_dedup(upload, message_id, thread_id)
+        except httpx.HTTPError as e:
+            raise translate_httpx_error(e, "Error al subir el archivo")
+    else:
+        # FastAPI cierra `upload` al terminar el request; la subida corre en
+        # una tarea que puede seguir después, así que usa una copia propia
+        copy, digest = await _copy_upload(upload)
+        owned = False
+
+        def upload_once() -> Awaitable[Tuple[FileOut, Optional[str]]]:
+            nonlocal owned
+            owned = True
+            return _upload_copy(copy, digest, message_id, thread_id)
+
+        try:
+            uploaded, dedup = await idempotency_store.run(
+                f"archivos.upload_file:{x_user_id or ''}",
+                idempotency_key,
+                (message_id, thread_id, upload.filename, digest),
+                upload_once,
+                response,
+            )
+        finally:
+            if not owned:  # duplicado: la copia no se usó
+                await copy.close()
+    if dedup is not None:
+        response.headers["X-Dedup"] = dedup
+    return uploaded
+
+
+@router.post(
+    "/batch",
+    response_model=BatchUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_files_batch(
+    response: Response,
+    message_id: Optional[str] = Query(
+        None,
+        description="ID del mensaje asociado (opcional, pero debe ir message_id o thread_id)",
+    ),
+    thread_id: Optional[str] = Query(
+        None,
+        description="ID del hilo asociado (opcional, pero debe ir message_id o thread_id)",
+    ),
+    uploads: List[UploadFile] = File(..., description="Archivos a subir (campo 'uploads' repetido)"),
+):
+    """
+    Sube varios archivos en una sola request multipart y los asocia a un mensaje o hilo.
+
+    Cada archivo se envía al MS en paralelo (tope FILES_BATCH_CONCURRENCY).
+    Se permite éxito parcial: si algún archivo falla se responde 207 con el
+    resultado de cada uno.
+
+    Gateway:    POST /api/v1/archivos/batch
+    MS archivos: POST /v1/files (una vez por archivo)
+    """
+    if message_id is None and thread_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Debe enviar message_id o thread_id",
+        )
+    if len(uploads) > settings.files_batch_max_files:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se permiten como máximo {settings.files_batch_max_files} archivos por request",
+        )
+
+    async def upload_one(upload: UploadFile) -> BatchUploadItem:
+        filename = upload.filename or "upload"
+        try:
+            uploaded, dedup = await _upload_with_dedup(upload, message_id, thread_id)
+        except httpx.HTTPError as e:
+            error = translate_httpx_error(e, "Error al subir el archivo")
+            return BatchUploadItem(
+                filename=filename,
+                status_code=error.status_code,
+                error=error.detail,
+            )
+        return BatchUploadItem(
+            filename=filename,
+            status_code=status.HTTP_201_CREATED,
+            file=uploaded,
+            dedup=dedup,
         )
+
+    results = await gather_limited(
+        (lambda upload=upload: upload_one(upload) for upload in uploads),
+        limit=settings.files_batch_concurrency,
+    )
+    failed = sum(1 for item in results if item.error is not None)
+    if failed:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return BatchUploadResponse(
+        total=len(results),
+        succeeded=len(results) - failed,
+        failed=failed,
+        results=results,
+    )
+
+
+async def _hash_upload(upload: UploadFile) -> Tuple[str, int]:
+    """
+    Recorre el archivo recibido calculando su SHA-256 y tamaño, y lo deja
+    rebobinado para reenviarlo al MS.
+    """
+    hasher = new_hasher()
+    size = 0
+    while True:
+        chunk = await upload.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        size += len(chunk)
+    await upload.seek(0)
+    return hasher.hexdigest(), size
+
+
+async def _copy_upload(upload: UploadFile) -> Tuple[UploadFile, str]:
+    """
+    Copia el archivo recibido a un archivo temporal propio (en memoria
+    hasta SPOOL_MAX_SIZE) calculando su SHA-256 en la misma pasada.
+    """
+    copy = UploadFile(
+        SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE),
+        size=0,
+        filename=upload.filename,
+        headers=upload.headers,
+    )
+    hasher = new_hasher()
+    while True:
+        chunk = await upload.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        await copy.write(chunk)
+    await copy.seek(0)
+    return copy, hasher.hexdigest()
+
+
+async def _upload_copy(
+    copy: UploadFile,
+    digest: str,
+    message_id: Optional[str],
+    thread_id: Optional[str],
+) -> Tuple[FileOut, Optional[str]]:
+    try:
+        return await _upload_with_dedup(copy, message_id, thread_id, digest=digest)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al subir el archivo")
+        raise translate_httpx_error(e, "Error al subir el archivo")
+    finally:
+        await copy.close()
+
+
+async def _forward_upload(
+    upload: UploadFile,
+    message_id: Optional[str],
+    thread_id: Optional[str],
+    content: Optional[Union[BinaryIO, HashingReader]] = None,
+) -> FileOut:
+    # Se reenvía el archivo (ya en disco/memoria temporal) por trozos
+    return await archivos_client.upload_file(
+        message_id=message_id,
+        thread_id=thread_id,
+        file_content=content if content is not None else upload.file,
+        filename=upload.filename or "upload",
+        mime_type=upload.content_type or "application/octet-stream",
+    )
+
+
+async def _upload_with_dedup(
+    upload: UploadFile,
+    message_id: Optional[str],
+    thread_id: Optional[str],
+    digest: Optional[str] = None,
+) -> Tuple[FileOut, Optional[str]]:
+    """
+    Sube el archivo aplicando FILES_DEDUP_MODE. Devuelve el archivo y el
+    resultado de la deduplicación ("new", "duplicate", "reused" o None si está desactivada).
+    `digest` evita recalcular el hash si ya se conoce.
+    """
+    if settings.files_dedup_mode == "off":
+        return await _forward_upload(upload, message_id, thread_id), None
+    scope = (message_id, thread_id, upload.filename or "upload")
+
+    if digest is None and settings.files_dedup_mode == "report":
+        # solo se reporta: el hash se calcula mientras se envía
+        reader = HashingReader(upload.file)
+        uploaded = await _forward_upload(upload, message_id, thread_id, content=reader)
+        known, _ = dedup_index.lookup(reader.hexdigest(), scope)
+        dedup_index.record_upload(reader.size, duplicate=known, short_circuited=False)
+        dedup_index.remember(uploaded)
+        return uploaded, "duplicate" if known else "new"
+
+    if digest is None:
+        digest, size = await _hash_upload(upload)
+    else:
+        size = upload.size or 0
+    known, existing = dedup_index.lookup(digest, scope)
+
+    if existing is not None and settings.files_dedup_mode == "reuse":
+        dedup_index.record_upload(size, duplicate=True, short_circuited=True)
+        return existing, "reused"
+
+    uploaded = await _forward_upload(upload, message_id, thread_id)
+    dedup_index.record_upload(size, duplicate=known, short_circuited=False)
+    dedup_index.remember(uploaded)
+    return uploaded, "duplicate" if known else "new"
 
 
 @router.get(
@@ -104,9 +303,11 @@ async def get_file(file_id: UUID):
     MS archivos: GET /v1/files/{file_id}
     """
     try:
-        return await archivos_client.get_file(file_id)
+        file = await archivos_client.get_file(file_id)
+        dedup_index.remember(file)
+        return file
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener información del archivo")
+        raise translate_httpx_error(e, "Error al obtener información del archivo")
 
 
 @router.get(
@@ -137,12 +338,48 @@ async def list_files(
         )
 
     try:
-        return await archivos_client.list_files(
+        files = await archivos_client.list_files(
             message_id=message_id,
             thread_id=thread_id,
         )
+        dedup_index.remember_all(files)
+        return files
+    except httpx.HTTPError as e:
+        raise translate_httpx_error(e, "Error al listar archivos")
+
+
+@router.get(
+    "/thread/{thread_id}/zip",
+    response_class=StreamingResponse,
+)
+async def download_thread_zip(thread_id: str):
+    """
+    Descarga todos los archivos de un hilo en un único ZIP generado al vuelo.
+
+    Los archivos se descargan en paralelo (con tope FILES_ZIP_CONCURRENCY)
+    y el ZIP se transmite a medida que se arma, con memoria acotada.
+
+    Gateway:    GET /api/v1/archivos/thread/{thread_id}/zip
+    MS archivos: GET /v1/files?thread_id= + presign-download por archivo
+    """
+    try:
+        files = await archivos_client.list_files(thread_id=thread_id)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al listar archivos")
+        raise translate_httpx_error(e, "Error al listar archivos del hilo")
+
+    async def fetch(file: FileOut):
+        presigned = await archivos_client.presign_download(file.id)
+        async for chunk in archivos_client.stream_file_url(presigned.url):
+            yield chunk
+
+    entries = unique_entry_names(f for f in files if f.deleted_at is None)
+    return StreamingResponse(
+        stream_zip(entries, fetch, concurrency=settings.files_zip_concurrency),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="hilo-{thread_id}.zip"'
+        },
+    )
 
 
 @router.delete(
@@ -158,9 +395,10 @@ async def delete_file(file_id: UUID):
     """
     try:
         await archivos_client.delete_file(file_id)
+        dedup_index.forget(file_id)
         # 204 No Content -> sin body
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al eliminar el archivo")
+        raise translate_httpx_error(e, "Error al eliminar el archivo")
 
 
 @router.post(
@@ -177,7 +415,7 @@ async def presign_download(file_id: UUID):
     try:
         return await archivos_client.presign_download(file_id)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, f"Error al generar URL de descarga: {e}")
+        raise translate_httpx_error(e, f"Error al generar URL de descarga: {e}")
 
 
 @router.post(
@@ -204,4 +442,28 @@ async def download_file(request: PresignDownloadRequest):
             }
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al descargar el archivo")
\ No newline at end of file
+        raise translate_httpx_error(e, "Error al descargar el archivo")
+
+
+@router.get(
+    "/dedup/stats",
+    response_model=DedupStatsOut,
+)
+async def get_dedup_stats():
+    """
+    Métricas de deduplicación de subidas (ratio y bytes evitados).
+
+    Gateway:    GET /api/v1/archivos/dedup/stats
+    """
+    stats = dedup_index.stats
+    return DedupStatsOut(
+        mode=settings.files_dedup_mode,
+        uploads=stats.uploads,
+        duplicates=stats.duplicates,
+        short_circuited=stats.short_circuited,
+        dedup_ratio=stats.dedup_ratio,
+        bytes_received=stats.bytes_received,
+        bytes_duplicated=stats.bytes_duplicated,
+        bytes_avoided=stats.bytes_avoided,
+        indexed_hashes=len(dedup_index),
+    )
@@ -4,14 +4,49 @@ Schemas que usa el GATEWAY para el servicio de archivos.
 Por ahora reutilizamos los modelos del cliente de servicios para mantener consistencia.
 """
 
+from typing import List, Optional
+
 from app.services.archivos.schemas import FileOut, PresignDownloadResponse
 from pydantic import BaseModel
 
 __all__ = [
     "FileOut",
     "PresignDownloadResponse",
+    "PresignDownloadRequest",
+    "DedupStatsOut",
+    "BatchUploadItem",
+    "BatchUploadResponse",
 ]
 
 class PresignDownloadRequest(BaseModel):
     """Schema para solicitar URL firmada de descarga de archivo."""
-    file_url: str  # URL interna del archivo
\ No newline at end of file
+    file_url: str  # URL interna del archivo
+
+
+class DedupStatsOut(BaseModel):
+    """Métricas de deduplicación de subidas por hash de contenido."""
+    mode: str
+    uploads: int                # subidas recibidas por el gateway
+    duplicates: int             # subidas cuyo contenido ya era conocido
+    short_circuited: int        # duplicados resueltos sin subir al MS
+    dedup_ratio: float          # duplicates / uploads
+    bytes_received: int
+    bytes_duplicated: int
+    bytes_avoided: int          # bytes que no se transfirieron al MS
+    indexed_hashes: int
+
+
+class BatchUploadItem(BaseModel):
+    """Resultado de un archivo dentro de una subida múltiple."""
+    filename: str
+    status_code: int               # status que habría devuelto la subida individual
+    file: Optional[FileOut] = None
+    dedup: Optional[str] = None    # "new", "duplicate" o "reused"
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchUploadItem]  # en el mismo orden en que se enviaron
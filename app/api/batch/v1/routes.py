@@ -0,0 +1,124 @@
+# app/api/batch/v1/routes.py
+import asyncio
+import base64
+import logging
+
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.api.batch.v1.schemas import (
+    BatchRequest,
+    BatchResponse,
+    BatchSubRequest,
+    BatchSubResponse,
+)
+from app.core.concurrency import gather_limited
+from app.core.config import settings
+from app.core.dispatch import SubResponse, dispatch, target_path
+from app.core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    tags=["batch"],
+)
+
+API_PREFIX = "/api/v1/"
+
+
+def _error(item: BatchSubRequest, status_code: int, detail: str) -> BatchSubResponse:
+    return BatchSubResponse(id=item.id, status=status_code, body={"detail": detail})
+
+
+def _to_item(item: BatchSubRequest, response: SubResponse) -> BatchSubResponse:
+    headers = {
+        name.decode("latin-1"): value.decode("latin-1")
+        for name, value in response.headers
+        if name.lower() != b"content-length"
+    }
+    result = BatchSubResponse(id=item.id, status=response.status_code, headers=headers)
+    if not response.body:
+        return result
+
+    media_type = response.media_type.split(";", 1)[0].strip()
+    if media_type == "application/json" or media_type.endswith("+json"):
+        try:
+            result.body = loads(response.body)
+        except ValueError:
+            logger.warning("Sub-request %s %s respondió JSON inválido", item.method, item.path)
+            return _error(item, status.HTTP_502_BAD_GATEWAY, "La sub-request respondió JSON inválido")
+    elif media_type.startswith("text/") or media_type.endswith("ndjson"):
+        result.body = response.body.decode("utf-8", errors="replace")
+    else:
+        result.body = base64.b64encode(response.body).decode("ascii")
+        result.body_encoding = "base64"
+    return result
+
+
+@router.post(
+    "",
+    response_model=BatchResponse,
+)
+async def run_batch(payload: BatchRequest, request: Request):
+    """
+    Ejecuta varias llamadas a rutas del gateway en un solo round-trip.
+
+    Las sub-requests se ejecutan en paralelo dentro del mismo proceso (sin
+    HTTP de por medio), con a lo más `concurrency` en vuelo y un tiempo
+    límite común `timeout`. Cada una devuelve su propio status y body; un
+    fallo en una no afecta a las demás.
+
+    Los headers del request del batch (ej: Authorization) se heredan a
+    todas las sub-requests.
+
+    Gateway: POST /api/v1/batch
+    """
+    if len(payload.requests) > settings.batch_max_requests:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se permiten como máximo {settings.batch_max_requests} sub-requests por batch",
+        )
+
+    concurrency = min(payload.concurrency or settings.batch_concurrency, settings.batch_concurrency)
+    timeout = min(payload.timeout or settings.batch_timeout, settings.batch_timeout)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    batch_path = request.url.path.rstrip("/")
+
+    async def run_one(item: BatchSubRequest) -> BatchSubResponse:
+        # la misma ruta decodificada que usará el router (ej: /api/v1/ba%74ch)
+        path = target_path(item.path)
+        if not path.startswith(API_PREFIX):
+            return _error(item, status.HTTP_400_BAD_REQUEST, f"La ruta debe comenzar con {API_PREFIX}")
+        if path.rstrip("/") == batch_path:
+            return _error(item, status.HTTP_400_BAD_REQUEST, "No se permiten batches anidados")
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return _error(item, status.HTTP_504_GATEWAY_TIMEOUT, "Tiempo límite del batch agotado")
+
+        has_body = item.body is not None
+        try:
+            response = await asyncio.wait_for(
+                dispatch(
+                    request,
+                    item.method,
+                    item.path,
+                    headers=item.headers.items(),
+                    body=dumps(item.body) if has_body else b"",
+                    content_type="application/json" if has_body else None,
+                    path=path,
+                ),
+                timeout=remaining,
+            )
+        except asyncio.TimeoutError:
+            return _error(item, status.HTTP_504_GATEWAY_TIMEOUT, "Tiempo límite del batch agotado")
+        except Exception:
+            logger.exception("Error ejecutando sub-request %s %s", item.method, item.path)
+            return _error(item, status.HTTP_500_INTERNAL_SERVER_ERROR, "Error interno del gateway")
+        return _to_item(item, response)
+
+    responses = await gather_limited(
+        (lambda item=item: run_one(item) for item in payload.requests),
+        limit=concurrency,
+    )
+    return BatchResponse(responses=responses)
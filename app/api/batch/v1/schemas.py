@@ -0,0 +1,41 @@
+"""
+Schemas del endpoint de batch del GATEWAY (no hay un MS detrás).
+"""
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+__all__ = [
+    "BatchSubRequest",
+    "BatchRequest",
+    "BatchSubResponse",
+    "BatchResponse",
+]
+
+
+class BatchSubRequest(BaseModel):
+    """Una llamada a una ruta existente del gateway."""
+    id: Optional[str] = None               # se devuelve tal cual para correlacionar
+    method: str = "GET"
+    path: str                              # ej: "/api/v1/canales/abc?page=1"
+    headers: Dict[str, str] = {}           # se suman a los del request del batch
+    body: Optional[Any] = None             # se envía como JSON
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(None, ge=1)   # tope por batch (limitado por BATCH_CONCURRENCY)
+    timeout: Optional[float] = Field(None, gt=0)     # segundos (limitado por BATCH_TIMEOUT)
+
+
+class BatchSubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+    body_encoding: Optional[str] = None    # "base64" si el body no es JSON ni texto
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]      # en el mismo orden que `requests`
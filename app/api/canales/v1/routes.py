@@ -1,8 +1,7 @@
 # app/api/canales/v1/routes.py
 from typing import List
 
-import httpx
-from fastapi import APIRouter, HTTPException, status
+from fastapi import status
 
 from app.api.canales.v1.schemas import (
     Channel,
@@ -13,246 +12,220 @@ from app.api.canales.v1.schemas import (
     ChannelUpdatePayload,
     ChannelUserPayload,
 )
-from app.services.canales import client as canales_client
-
-router = APIRouter(
-    tags=["canales"],
-)
-
-
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
-    """
-    Traduce errores de httpx (llamadas al MS) a HTTPException hacia el cliente del gateway.
-    """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = body.get("detail", default_message)
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    # Errores de red, timeouts, etc.
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
-
-
-@router.post(
-    "/",
-    response_model=Channel,
-    status_code=status.HTTP_201_CREATED,
-)
-async def create_channel(payload: ChannelCreatePayload):
-    """
+from app.core.config import settings
+from app.core.upstream import Param, UpstreamRoute, build_router
+
+BASE_URL = settings.channels_service_base_url
+
+_CHANNEL_ID = Param("channel_id", source="path")
+_PAGE = Param("page", int, default=1)
+
+
+ROUTES = [
+    UpstreamRoute(
+        name="canales.create_channel",
+        method="POST",
+        path="/",
+        base_url=BASE_URL,
+        upstream_path="/v1/channels/",
+        response_model=Channel,
+        status_code=status.HTTP_201_CREATED,
+        params=[Param("payload", ChannelCreatePayload, source="body")],
+        error_message="Error al crear el canal",
+        description="""
     Crea un nuevo canal a través del gateway.
 
     Gateway:   POST /api/v1/canales/
     MS canales: POST /v1/channels/
-    """
-    try:
-        return await canales_client.create_channel(payload)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al crear el canal")
-
-
-@router.get(
-    "/",
-    response_model=List[ChannelBasicInfoResponse],
-)
-async def list_channels(page: int = 1, page_size: int = 10):
-    """
+    """,
+        idempotent=True,
+    ),
+    UpstreamRoute(
+        name="canales.list_channels",
+        method="GET",
+        path="/",
+        base_url=BASE_URL,
+        upstream_path="/v1/channels/",
+        response_model=List[ChannelBasicInfoResponse],
+        params=[_PAGE, Param("page_size", int, default=10)],
+        error_message="Error al listar canales",
+        description="""
     Lista canales (paginado).
 
     Gateway:   GET /api/v1/canales/?page=&page_size=
     MS canales: GET /v1/channels/
-    """
-    try:
-        return await canales_client.list_channels(page=page, page_size=page_size)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al listar canales")
-
-
-@router.get(
-    "/{channel_id}",
-    response_model=Channel,
-)
-async def get_channel(channel_id: str):
-    """
+    """,
+        cacheable=True,
+    ),
+    UpstreamRoute(
+        name="canales.get_channel",
+        method="GET",
+        path="/{channel_id}",
+        base_url=BASE_URL,
+        upstream_path="/v1/channels/{channel_id}",
+        response_model=Channel,
+        params=[_CHANNEL_ID],
+        error_message="Error al obtener el canal",
+        description="""
     Obtiene un canal por ID.
 
     Gateway:   GET /api/v1/canales/{channel_id}
     MS canales: GET /v1/channels/{channel_id}
-    """
-    try:
-        return await canales_client.get_channel(channel_id)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener el canal")
-
-
-@router.put(
-    "/{channel_id}",
-    response_model=Channel,
-)
-async def update_channel(channel_id: str, payload: ChannelUpdatePayload):
-    """
+    """,
+        cacheable=True,
+    ),
+    UpstreamRoute(
+        name="canales.update_channel",
+        method="PUT",
+        path="/{channel_id}",
+        base_url=BASE_URL,
+        upstream_path="/v1/channels/{channel_id}",
+        response_model=Channel,
+        params=[_CHANNEL_ID, Param("payload", ChannelUpdatePayload, source="body")],
+        error_message="Error al actualizar el canal",
+        description="""
     Actualiza un canal.
 
     Gateway:   PUT /api/v1/canales/{channel_id}
     MS canales: PUT /v1/channels/{channel_id}
-    """
-    try:
-        return await canales_client.update_channel(channel_id, payload)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al actualizar el canal")
-
-
-@router.delete(
-    "/{channel_id}",
-    response_model=ChannelIDResponse,
-)
-async def deactivate_channel(channel_id: str):
-    """
+    """,
+        body_exclude_unset=True,
+    ),
+    UpstreamRoute(
+        name="canales.deactivate_channel",
+        method="DELETE",
+        path="/{channel_id}",
+        base_url=BASE_URL,
+        upstream_path="/v1/channels/{channel_id}",
+        response_model=ChannelIDResponse,
+        params=[_CHANNEL_ID],
+        error_message="Error al desactivar el canal",
+        description="""
     Desactiva lógicamente un canal.
 
     Gateway:   DELETE /api/v1/canales/{channel_id}
     MS canales: DELETE /v1/channels/{channel_id}
-    """
-    try:
-        return await canales_client.deactivate_channel(channel_id)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al desactivar el canal")
-
-
-@router.post(
-    "/{channel_id}/reactivate",
-    response_model=ChannelIDResponse,
-)
-async def reactivate_channel(channel_id: str):
-    """
+    """,
+    ),
+    UpstreamRoute(
+        name="canales.reactivate_channel",
+        method="POST",
+        path="/{channel_id}/reactivate",
+        base_url=BASE_URL,
+        upstream_path="/v1/channels/{channel_id}/reactivate",
+        response_model=ChannelIDResponse,
+        params=[_CHANNEL_ID],
+        error_message="Error al reactivar el canal",
+        description="""
     Reactiva un canal desactivado.
 
     Gateway:   POST /api/v1/canales/{channel_id}/reactivate
     MS canales: POST /v1/channels/{channel_id}/reactivate
-    """
-    try:
-        return await canales_client.reactivate_channel(channel_id)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al reactivar el canal")
-
-
-@router.get(
-    "/{channel_id}/basic",
-    response_model=ChannelBasicInfoResponse,
-)
-async def get_channel_basic_info(channel_id: str):
-    """
+    """,
+    ),
+    UpstreamRoute(
+        name="canales.get_channel_basic_info",
+        method="GET",
+        path="/{channel_id}/basic",
+        base_url=BASE_URL,
+        upstream_path="/v1/channels/{channel_id}/basic",
+        response_model=ChannelBasicInfoResponse,
+        params=[_CHANNEL_ID],
+        error_message="Error al obtener información básica del canal",
+        description="""
     Obtiene info básica de un canal.
 
     Gateway:   GET /api/v1/canales/{channel_id}/basic
     MS canales: GET /v1/channels/{channel_id}/basic
-    """
-    try:
-        return await canales_client.get_channel_basic_info(channel_id)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener información básica del canal")
-
-
-# --- Rutas relacionadas a miembros ---
-
-
-@router.post(
-    "/members/",
-    response_model=Channel,
-)
-async def add_member(payload: ChannelUserPayload):
-    """
+    """,
+        cacheable=True,
+    ),
+
+    # --- Rutas relacionadas a miembros ---
+
+    UpstreamRoute(
+        name="canales.add_member",
+        method="POST",
+        path="/members/",
+        base_url=BASE_URL,
+        upstream_path="/v1/members/",
+        response_model=Channel,
+        params=[Param("payload", ChannelUserPayload, source="body")],
+        error_message="Error al agregar miembro al canal",
+        description="""
     Agrega un usuario a un canal.
 
     Gateway:   POST /api/v1/canales/members/
     MS canales: POST /v1/members/
-    """
-    try:
-        return await canales_client.add_member(payload)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al agregar miembro al canal")
-
-
-@router.delete(
-    "/members/",
-    response_model=Channel,
-)
-async def remove_member(payload: ChannelUserPayload):
-    """
+    """,
+    ),
+    UpstreamRoute(
+        name="canales.remove_member",
+        method="DELETE",
+        path="/members/",
+        base_url=BASE_URL,
+        upstream_path="/v1/members/",
+        response_model=Channel,
+        params=[Param("payload", ChannelUserPayload, source="body")],
+        error_message="Error al eliminar miembro del canal",
+        description="""
     Elimina un usuario de un canal.
 
     Gateway:   DELETE /api/v1/canales/members/
     MS canales: DELETE /v1/members/
-    """
-    try:
-        return await canales_client.remove_member(payload)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al eliminar miembro del canal")
-
-
-@router.get(
-    "/members/{user_id}",
-    response_model=List[ChannelBasicInfoResponse],
-)
-async def get_channels_for_user(user_id: str):
-    """
+    """,
+    ),
+    UpstreamRoute(
+        name="canales.get_channels_for_user",
+        method="GET",
+        path="/members/{user_id}",
+        base_url=BASE_URL,
+        upstream_path="/v1/members/{user_id}",
+        response_model=List[ChannelBasicInfoResponse],
+        params=[Param("user_id", source="path")],
+        error_message="Error al obtener canales del usuario",
+        description="""
     Obtiene todos los canales en los que un usuario es miembro.
 
     Gateway:   GET /api/v1/canales/members/{user_id}
     MS canales: GET /v1/members/{user_id}
-    """
-    try:
-        return await canales_client.get_channels_for_user(user_id)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener canales del usuario")
-
-
-@router.get(
-    "/members/owner/{owner_id}",
-    response_model=List[ChannelBasicInfoResponse],
-)
-async def get_channels_for_owner(owner_id: str):
-    """
+    """,
+        cacheable=True,
+    ),
+    UpstreamRoute(
+        name="canales.get_channels_for_owner",
+        method="GET",
+        path="/members/owner/{owner_id}",
+        base_url=BASE_URL,
+        upstream_path="/v1/members/owner/{owner_id}",
+        response_model=List[ChannelBasicInfoResponse],
+        params=[Param("owner_id", source="path")],
+        error_message="Error al obtener canales del propietario",
+        description="""
     Obtiene todos los canales asociados a un propietario.
 
     Gateway:   GET /api/v1/canales/members/owner/{owner_id}
     MS canales: GET /v1/members/owner/{owner_id}
-    """
-    try:
-        return await canales_client.get_channels_for_owner(owner_id)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener canales del propietario")
-
-
-@router.get(
-    "/members/channel/{channel_id}",
-    response_model=List[ChannelMember],
-)
-async def get_members_for_channel(
-    channel_id: str,
-    page: int = 1,
-    page_size: int = 100,
-):
-    """
+    """,
+        cacheable=True,
+    ),
+    UpstreamRoute(
+        name="canales.get_members_for_channel",
+        method="GET",
+        path="/members/channel/{channel_id}",
+        base_url=BASE_URL,
+        upstream_path="/v1/members/channel/{channel_id}",
+        response_model=List[ChannelMember],
+        params=[_CHANNEL_ID, _PAGE, Param("page_size", int, default=100)],
+        error_message="Error al obtener miembros del canal",
+        description="""
     Obtiene los miembros de un canal (paginado).
 
     Gateway:   GET /api/v1/canales/members/channel/{channel_id}?page=&page_size=
     MS canales: GET /v1/members/channel/{channel_id}
-    """
-    try:
-        return await canales_client.get_members_for_channel(
-            channel_id=channel_id,
-            page=page,
-            page_size=page_size,
-        )
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener miembros del canal")
+    """,
+        cacheable=True,
+    ),
+]
+
+router = build_router(ROUTES, tags=["canales"])
@@ -1,5 +1,5 @@
 import httpx
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, status
 
 from app.api.chatbot_programacion.v1.schemas import (
     HealthResponse,
@@ -7,6 +7,7 @@ from app.api.chatbot_programacion.v1.schemas import (
     ChatRequest,
     ChatResponse,
 )
+from app.core.upstream import translate_httpx_error
 from app.services.chatbot_programacion import client as chatbot_client
 
 
@@ -15,31 +16,6 @@ router = APIRouter(
 )
 
 
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
-    """
-    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
-    """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = (
-                body.get("message")
-                or body.get("detail")
-                or default_message
-            )
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
-
-
 # @router.get(
 #     "/health",
 #     response_model=HealthResponse,
@@ -54,7 +30,7 @@ def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPExce
 #     try:
 #         return await chatbot_client.health()
 #     except httpx.HTTPError as e:
-#         raise _translate_httpx_error(e, "Error al verificar salud del chatbot")
+#         raise translate_httpx_error(e, "Error al verificar salud del chatbot")
 
 
 # @router.get(
@@ -71,7 +47,7 @@ def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPExce
 #     try:
 #         return await chatbot_client.get_question()
 #     except httpx.HTTPError as e:
-#         raise _translate_httpx_error(e, "Error al obtener pregunta de programación")
+#         raise translate_httpx_error(e, "Error al obtener pregunta de programación")
 
 
 # @router.post(
@@ -89,7 +65,7 @@ def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPExce
 #     try:
 #         return await chatbot_client.publish_question()
 #     except httpx.HTTPError as e:
-#         raise _translate_httpx_error(e, "Error al publicar pregunta de programación")
+#         raise translate_httpx_error(e, "Error al publicar pregunta de programación")
 
 
 @router.post(
@@ -107,4 +83,4 @@ async def chat(payload: ChatRequest):
     try:
         return await chatbot_client.chat(payload)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al comunicarse con el chatbot de programación")
+        raise translate_httpx_error(e, "Error al comunicarse con el chatbot de programación")
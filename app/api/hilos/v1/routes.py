@@ -2,7 +2,7 @@
 from typing import List, Optional
 
 import httpx
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, Header, Query, Response, status
 
 from app.api.hilos.v1.schemas import (
     ThreadCreate,
@@ -10,6 +10,8 @@ from app.api.hilos.v1.schemas import (
     ThreadOut,
     ThreadBasicInfo
 )
+from app.core.idempotency import IDEMPOTENCY_HEADER, idempotency_store
+from app.core.upstream import translate_httpx_error
 from app.services.hilos import client as hilos_client
 
 
@@ -18,47 +20,39 @@ router = APIRouter(
 )
 
 
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
-    """
-    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
-    """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = (
-                body.get("message")
-                or body.get("detail")
-                or default_message
-            )
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
-
-
 @router.post(
     "/",
     response_model=ThreadOut,
     status_code=status.HTTP_201_CREATED,
 )
-async def create_thread(payload: ThreadCreate):
+async def create_thread(
+    payload: ThreadCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    x_user_id: Optional[str] = Header(None, alias="X-User-Id"),
+):
     """
     Crea un nuevo hilo en un canal existente.
 
+    Con `Idempotency-Key`, un reintento con la misma clave (y el mismo
+    X-User-Id) recibe el hilo creado por el primero.
+
     Gateway: POST /api/v1/hilos/
     MS hilos: POST /v1/
     """
-    try:
-        return await hilos_client.create_thread(payload)
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al crear el hilo")
+    async def create() -> ThreadOut:
+        try:
+            return await hilos_client.create_thread(payload)
+        except httpx.HTTPError as e:
+            raise translate_httpx_error(e, "Error al crear el hilo")
+
+    return await idempotency_store.run(
+        f"hilos.create_thread:{x_user_id or ''}",
+        idempotency_key,
+        payload.model_dump_json(),
+        create,
+        response,
+    )
 
 
 @router.get(
@@ -80,7 +74,7 @@ async def list_threads(
     try:
         return await hilos_client.get_threads_by_channel(channel_id=channel_id)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al listar hilos")
+        raise translate_httpx_error(e, "Error al listar hilos")
 
 
 @router.get(
@@ -97,7 +91,7 @@ async def get_thread(thread_id: str):
     try:
         return await hilos_client.get_thread(thread_id)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener el hilo")
+        raise translate_httpx_error(e, "Error al obtener el hilo")
 
 
 @router.patch(
@@ -117,7 +111,7 @@ async def update_thread(
     try:
         return await hilos_client.update_thread(thread_id=thread_id, payload=payload)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al actualizar el hilo")
+        raise translate_httpx_error(e, "Error al actualizar el hilo")
 
 
 @router.post(
@@ -134,7 +128,7 @@ async def archive_thread(thread_id: str):
     try:
         return await hilos_client.archive_thread(thread_id)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al archivar el hilo")
+        raise translate_httpx_error(e, "Error al archivar el hilo")
 
 
 @router.delete(
@@ -152,4 +146,4 @@ async def delete_thread(thread_id: str):
         await hilos_client.delete_thread(thread_id)
         # 204 No Content -> sin body
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al eliminar el hilo")
+        raise translate_httpx_error(e, "Error al eliminar el hilo")
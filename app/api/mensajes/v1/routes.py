@@ -1,45 +1,57 @@
-from typing import Optional
+import asyncio
+from typing import AsyncIterator, Optional, Union
 from uuid import UUID
 
 import httpx
-from fastapi import APIRouter, HTTPException, Header, Query, status
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
 
 from app.api.mensajes.v1.schemas import (
+    ExportFormat,
     MessageCreateIn,
+    MessageImportLine,
+    ModeratedMessageOut,
     MessageUpdateIn,
     MessageOut,
+    MessagesDeltaOut,
     MessagesPageOut,
 )
+from app.core import passthrough
+from app.core.config import settings
+from app.core.idempotency import IDEMPOTENCY_HEADER, idempotency_store
+from app.core.serialization import dumps
+from app.core.streaming import DuplexStreamingResponse
+from app.core.upstream import translate_httpx_error
 from app.services.mensajes import client as mensajes_client
+from app.services.mensajes import export
+from app.services.mensajes.delta import Checkpoint, compute_delta
+from app.services.mensajes.importer import ImportItem, ImportResult, ndjson_lines, run_import
+from app.services.mensajes.journal import journal
+from app.services.mensajes.moderated import moderated_poster
+from app.services.mensajes.page_cache import page_cache
+from app.services.mensajes.prefetch import prefetcher
+from app.services.mensajes.stream import (
+    MESSAGE_CREATED,
+    MESSAGE_DELETED,
+    MESSAGE_UPDATED,
+    message_stream,
+)
 
 router = APIRouter(
     tags=["mensajes"],
 )
 
 
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
-    """
-    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
-    """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = (
-                body.get("message")
-                or body.get("detail")
-                or default_message
-            )
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
+def _on_message_written(thread_id: UUID, event: str, message: Union[MessageOut, dict]) -> None:
+    """Efectos de una escritura ya aceptada por el MS: caché de páginas, journal y streams del hilo."""
+    message_id = message.id if isinstance(message, MessageOut) else message["id"]
+    if event == MESSAGE_CREATED:
+        page_cache.on_created(thread_id)
+    else:
+        page_cache.on_changed(message_id)
+    journal.record(thread_id, event, message_id, message if isinstance(message, MessageOut) else None)
+    message_stream.publish(thread_id, event, message)
 
 
 @router.post(
@@ -50,22 +62,73 @@ def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPExce
 async def create_message(
     thread_id: UUID,
     payload: MessageCreateIn,
+    response: Response,
     x_user_id: str = Header(..., alias="X-User-Id"),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
 ):
     """
     Crea un nuevo mensaje en un hilo.
 
+    Con `Idempotency-Key`, un reintento con la misma clave no crea un
+    segundo mensaje: recibe el resultado del primero.
+
     Gateway:    POST /api/v1/mensajes/threads/{thread_id}/messages
     MS mensajes: POST /threads/{thread_id}/messages
     """
-    try:
-        return await mensajes_client.create_message(
-            thread_id=thread_id,
-            payload=payload,
-            x_user_id=x_user_id,
-        )
-    except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al crear el mensaje")
+    async def create() -> MessageOut:
+        try:
+            created = await mensajes_client.create_message(
+                thread_id=thread_id,
+                payload=payload,
+                x_user_id=x_user_id,
+            )
+        except httpx.HTTPError as e:
+            raise translate_httpx_error(e, "Error al crear el mensaje")
+        _on_message_written(thread_id, MESSAGE_CREATED, created)
+        return created
+
+    return await idempotency_store.run(
+        f"mensajes.create_message:{x_user_id}",
+        idempotency_key,
+        (str(thread_id), payload.model_dump_json()),
+        create,
+        response,
+    )
+
+
+@router.post(
+    "/threads/{thread_id}/messages/moderated",
+    response_model=ModeratedMessageOut,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_moderated_message(
+    thread_id: UUID,
+    payload: MessageCreateIn,
+    channel_id: str = Query(..., description="Canal del hilo (lo pide el MS de moderación)"),
+    x_user_id: str = Header(..., alias="X-User-Id"),
+):
+    """
+    Modera y crea un mensaje en una sola llamada.
+
+    Reemplaza POST /moderacion/check seguido de POST .../messages: ambas
+    llamadas salen en paralelo y el mensaje solo se publica si la moderación
+    lo aprueba. Si lo rechaza responde 422 con el veredicto en el detail, y
+    el mensaje creado de forma especulativa se elimina.
+
+    Gateway:    POST /api/v1/mensajes/threads/{thread_id}/messages/moderated
+    MS:         POST /check (moderación) + POST /threads/{thread_id}/messages
+    """
+    created, verdict = await moderated_poster.post(
+        thread_id,
+        channel_id,
+        payload,
+        x_user_id,
+        on_approved=lambda thread, message: _on_message_written(thread, MESSAGE_CREATED, message),
+        on_compensated=lambda thread, message: _on_message_written(
+            thread, MESSAGE_DELETED, {"id": str(message.id), "thread_id": str(thread)}
+        ),
+    )
+    return ModeratedMessageOut(message=created, moderation=verdict)
 
 
 @router.put(
@@ -85,14 +148,16 @@ async def update_message(
     MS mensajes: PUT /threads/{thread_id}/messages/{message_id}
     """
     try:
-        return await mensajes_client.update_message(
+        updated = await mensajes_client.update_message(
             thread_id=thread_id,
             message_id=message_id,
             payload=payload,
             x_user_id=x_user_id,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al actualizar el mensaje")
+        raise translate_httpx_error(e, "Error al actualizar el mensaje")
+    _on_message_written(thread_id, MESSAGE_UPDATED, updated)
+    return updated
 
 
 @router.delete(
@@ -118,7 +183,8 @@ async def delete_message(
         )
         # 204 No Content => FastAPI no devuelve body
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al eliminar el mensaje")
+        raise translate_httpx_error(e, "Error al eliminar el mensaje")
+    _on_message_written(thread_id, MESSAGE_DELETED, {"id": str(message_id), "thread_id": str(thread_id)})
 
 
 @router.get(
@@ -127,20 +193,236 @@ async def delete_message(
 )
 async def list_messages(
     thread_id: UUID,
+    background_tasks: BackgroundTasks,
     limit: int = Query(50, ge=1, le=200),
     cursor: Optional[str] = None,
+    wait: float = Query(
+        0,
+        ge=0,
+        le=settings.messages_long_poll_max_wait,
+        description="Segundos a esperar un mensaje nuevo si se pide la página más reciente (long-poll)",
+    ),
+    after: Optional[str] = Query(
+        None,
+        description="Id del mensaje más reciente que ya tiene el cliente; con wait, responde de inmediato si hay otro más nuevo",
+    ),
 ):
     """
     Lista mensajes de un hilo con paginación por cursor.
 
-    Gateway:    GET /api/v1/mensajes/threads/{thread_id}/messages?limit=&cursor=
+    Las páginas con `cursor` se sirven desde la caché de páginas cuando es
+    posible (ver mensajes.page_cache). Con MESSAGES_PREFETCH_ENABLED, si la
+    página trae `has_more`, la siguiente se pide al MS en segundo plano
+    después de responder (ver mensajes.prefetch).
+
+    Con `wait` y sin `cursor` (long-poll), el request queda en espera hasta
+    que llega un mensaje nuevo al hilo o se cumple el plazo, y luego devuelve
+    la página más reciente. La espera no consulta al MS por su cuenta:
+    comparte el poller del hilo con los streams SSE (ver mensajes.stream) y
+    despierta de inmediato con las escrituras hechas por el gateway. Los
+    long-polls que despiertan juntos comparten la consulta de la página.
+
+    Gateway:    GET /api/v1/mensajes/threads/{thread_id}/messages?limit=&cursor=&wait=&after=
     MS mensajes: GET /threads/{thread_id}/messages
     """
     try:
-        return await mensajes_client.list_messages(
-            thread_id=thread_id,
+        cacheable = cursor is not None and settings.messages_page_cache_ttl > 0
+        raw = page_cache.get(thread_id, cursor, limit) if cacheable else None
+        from_cache = raw is not None
+        if wait > 0 and cursor is None:
+            await message_stream.wait(thread_id, wait, after=after)
+            raw = await page_cache.head(
+                thread_id,
+                limit,
+                lambda: mensajes_client.list_messages_raw(thread_id=thread_id, limit=limit),
+            )
+        elif raw is None:
+            version = page_cache.version
+            raw = await mensajes_client.list_messages_raw(
+                thread_id=thread_id,
+                limit=limit,
+                cursor=cursor,
+            )
+            if cacheable:
+                page_cache.put(thread_id, cursor, limit, raw, version)
+    except httpx.HTTPError as e:
+        raise translate_httpx_error(e, "Error al listar mensajes del hilo")
+
+    if settings.messages_prefetch_enabled and settings.messages_page_cache_ttl > 0:
+        next_cursor = prefetcher.plan(thread_id, cursor, limit, raw, from_cache=from_cache)
+        if next_cursor is not None:
+            background_tasks.add_task(prefetcher.prefetch, thread_id, next_cursor, limit)
+    return passthrough.respond("mensajes.list_messages", raw, MessagesPageOut)
+
+
+@router.get(
+    "/threads/{thread_id}/delta",
+    response_model=MessagesDeltaOut,
+)
+async def messages_delta(
+    thread_id: UUID,
+    since: Optional[str] = Query(None, description="Checkpoint devuelto por el delta anterior"),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """
+    Mensajes creados, editados y eliminados en un hilo desde un checkpoint.
+
+    Pensado para reconectar: en vez de volver a pedir la primera página, el
+    cliente envía el último `checkpoint` y recibe solo lo que cambió. Sin
+    `since`, o si los cambios no caben en MESSAGES_DELTA_MAX_PAGES páginas,
+    responde con reset=true y la primera página en `created` (ver
+    mensajes.delta).
+
+    Gateway:    GET /api/v1/mensajes/threads/{thread_id}/delta?since=&limit=
+    MS mensajes: GET /threads/{thread_id}/messages (páginas recientes)
+    """
+    try:
+        checkpoint = Checkpoint.decode(since) if since is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        delta = await compute_delta(
+            thread_id,
+            checkpoint,
             limit=limit,
-            cursor=cursor,
+            max_pages=settings.messages_delta_max_pages,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al listar mensajes del hilo")
+        raise translate_httpx_error(e, "Error al obtener cambios del hilo")
+    return MessagesDeltaOut(
+        created=delta.created,
+        updated=delta.updated,
+        deleted=delta.deleted,
+        checkpoint=delta.checkpoint,
+        reset=delta.reset,
+        journal_complete=delta.journal_complete,
+    )
+
+
+@router.get(
+    "/threads/{thread_id}/stream",
+    response_class=StreamingResponse,
+)
+async def stream_messages(thread_id: UUID):
+    """
+    Mensajes de un hilo en tiempo real (Server-Sent Events).
+
+    Eventos: message.created, message.updated, message.deleted (data: JSON
+    del mensaje). Solo se emite lo ocurrido desde la suscripción; la
+    historia se obtiene con GET /threads/{thread_id}/messages.
+
+    Todos los suscriptores de un hilo comparten un único poller hacia el MS
+    (ver mensajes.stream); las escrituras hechas por el gateway se emiten
+    de inmediato. Si el cliente no consume a tiempo, el stream se cierra y
+    debe reconectarse.
+
+    Gateway:    GET /api/v1/mensajes/threads/{thread_id}/stream
+    MS mensajes: GET /threads/{thread_id}/messages (compartido por hilo)
+    """
+
+    async def events() -> AsyncIterator[bytes]:
+        async with message_stream.subscribe(thread_id) as subscription:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        settings.messages_stream_keepalive,
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield event.encode()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/threads/{thread_id}/export",
+    response_class=StreamingResponse,
+)
+async def export_messages(
+    thread_id: UUID,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="ndjson (un mensaje por línea) o json (arreglo)"),
+):
+    """
+    Exporta el historial completo de un hilo en una sola respuesta.
+
+    El gateway recorre los cursores del MS con una página de adelanto y
+    transmite los mensajes a medida que llegan, con memoria constante (ver
+    mensajes.export). Orden: del más reciente al más antiguo.
+
+    Gateway:    GET /api/v1/mensajes/threads/{thread_id}/export?format=
+    MS mensajes: GET /threads/{thread_id}/messages (todas las páginas)
+    """
+    limit = settings.messages_export_page_size
+    try:
+        # la primera página se pide antes de responder: los errores llegan con su status
+        first = await export.fetch_page(thread_id, limit)
+    except httpx.HTTPError as e:
+        raise translate_httpx_error(e, "Error al exportar mensajes del hilo")
+
+    pages = export.iter_pages(thread_id, limit, first)
+    if format == ExportFormat.json:
+        body, media_type, extension = export.json_array(pages), "application/json", "json"
+    else:
+        body, media_type, extension = export.ndjson_lines(pages), "application/x-ndjson", "ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="hilo-{thread_id}.{extension}"'},
+    )
+
+
+@router.post(
+    "/import",
+    response_class=DuplexStreamingResponse,
+)
+async def import_messages(
+    request: Request,
+    x_user_id: Optional[str] = Header(None, alias="X-User-Id"),
+):
+    """
+    Importa mensajes en masa desde un body NDJSON.
+
+    Cada línea es un mensaje: {"thread_id", "content", "type"?, "paths"?,
+    "user_id"?} (sin user_id se usa X-User-Id). Las líneas se validan y se
+    crean a medida que llegan, con concurrencia acotada entre hilos y en
+    orden dentro de cada hilo (ver mensajes.importer).
+
+    La respuesta es NDJSON con un resultado por línea, en orden de término:
+    {"line", "status_code", "thread_id", "id" | "error"}, y al final
+    {"summary": {"lines", "created", "failed"}}.
+
+    Gateway:    POST /api/v1/mensajes/import
+    MS mensajes: POST /threads/{thread_id}/messages (una por línea)
+    """
+
+    def parse(number: int, raw: bytes):
+        try:
+            line = MessageImportLine.model_validate_json(raw)
+        except ValidationError as e:
+            return ImportResult(number, 422, error=e.errors(include_url=False, include_context=False))
+        user_id = line.user_id or x_user_id
+        if not user_id:
+            return ImportResult(number, 422, str(line.thread_id), error="Falta user_id (o el header X-User-Id)")
+        payload = MessageCreateIn(content=line.content, type=line.type, paths=line.paths)
+        return ImportItem(number, line.thread_id, user_id, payload)
+
+    async def results():
+        async for result in run_import(
+            ndjson_lines(request.stream(), settings.messages_import_max_line_bytes),
+            parse,
+            concurrency=settings.messages_import_concurrency,
+            max_pending=settings.messages_import_max_pending,
+            on_created=lambda thread_id, message: _on_message_written(thread_id, MESSAGE_CREATED, message),
+        ):
+            yield dumps(result) + b"\n"
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
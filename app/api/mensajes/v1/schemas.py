@@ -5,6 +5,11 @@ Schemas que usa el GATEWAY para el servicio de mensajes.
 Por ahora reutilizamos los modelos del cliente de servicios para mantener
 consistencia 1 a 1 con el microservicio de mensajes.
 """
+from enum import Enum
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
 
 from app.services.mensajes.schemas import (
     MessageCreateIn,
@@ -12,10 +17,47 @@ from app.services.mensajes.schemas import (
     MessageOut,
     MessagesPageOut,
 )
+from app.services.moderacion.schemas import ModerateMessageResponse
+
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    json = "json"
+
+
+class MessagesDeltaOut(BaseModel):
+    created: List[MessageOut]
+    updated: List[MessageOut]
+    deleted: List[UUID]
+    # checkpoint a enviar como `since` en el próximo delta
+    checkpoint: str
+    # True: descartar el estado local y usar `created` como primera página
+    reset: bool = False
+    # False: pueden faltar ediciones o borrados hechos fuera de este gateway
+    journal_complete: bool = True
+
+
+class MessageImportLine(MessageCreateIn):
+    """Una línea del NDJSON de POST /mensajes/import."""
+    thread_id: UUID
+    # autor del mensaje; si falta se usa el header X-User-Id del request
+    user_id: Optional[str] = None
+
+
+class ModeratedMessageOut(BaseModel):
+    """Mensaje publicado por POST .../messages/moderated y el veredicto que lo aprobó."""
+    message: MessageOut
+    moderation: ModerateMessageResponse
+
 
 __all__ = [
+    "ExportFormat",
     "MessageCreateIn",
     "MessageUpdateIn",
     "MessageOut",
     "MessagesPageOut",
+    "MessagesDeltaOut",
+    "MessageImportLine",
+    "ModeratedMessageOut",
 ]
@@ -1,9 +1,12 @@
 from typing import Optional
 
 import httpx
-from fastapi import APIRouter, HTTPException, Header, Query, status
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
 
 from app.api.moderacion.v1.schemas import (
+    AnalyzeBatchItem,
+    AnalyzeBatchRequest,
+    AnalyzeBatchResponse,
     ModerateMessageRequest,
     ModerateMessageResponse,
     AnalyzeTextRequest,
@@ -19,7 +22,11 @@ from app.api.moderacion.v1.schemas import (
     UserStatusResponse,
     ChannelStatsResponse,
 )
+from app.core.config import settings
+from app.core.upstream import translate_httpx_error
+from app.services.moderacion import analysis
 from app.services.moderacion import client as moderacion_client
+from app.services.moderacion.blacklist import blacklist_mirror, clean_analysis
 
 
 router = APIRouter(
@@ -27,29 +34,10 @@ router = APIRouter(
 )
 
 
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
-    """
-    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
-    """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = (
-                body.get("message")
-                or body.get("detail")
-                or default_message
-            )
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
+def _blacklist_changed() -> None:
+    """La lista negra cambió en el MS: recargar la copia local y olvidar análisis previos."""
+    blacklist_mirror.invalidate()
+    analysis.analysis_cache.clear()
 
 
 # --- ENDPOINTS PRINCIPALES ---
@@ -67,23 +55,72 @@ async def moderate_message(payload: ModerateMessageRequest):
     try:
         return await moderacion_client.moderate_message(payload)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al moderar el mensaje")
+        raise translate_httpx_error(e, "Error al moderar el mensaje")
 
 
 @router.post(
     "/analyze",
     response_model=AnalyzeTextResponse,
 )
-async def analyze_text(payload: AnalyzeTextRequest):
+async def analyze_text(payload: AnalyzeTextRequest, response: Response):
     """
     Analiza un texto sin aplicar strikes ni bans.
+
+    Con MODERATION_ANALYZE_CACHE_TTL > 0 los resultados se cachean por texto
+    e idioma (ver moderacion.analysis).
+    Con MODERATION_PREFILTER_ENABLED, un texto sin ninguna palabra de la
+    lista negra se responde en el gateway (header X-Moderation-Prefilter: clean).
+
     Gateway:    POST /api/v1/moderacion/analyze
     MS:         POST /analyze
     """
+    hit = analysis.cached(payload)
+    if hit is not None:
+        return hit
+    if settings.moderation_prefilter_enabled and blacklist_mirror.check(payload.text):
+        response.headers["X-Moderation-Prefilter"] = "clean"
+        return clean_analysis(payload)
+    version = analysis.analysis_cache.version
     try:
-        return await moderacion_client.analyze_text(payload)
+        result = await moderacion_client.analyze_text(payload)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al analizar el texto")
+        raise translate_httpx_error(e, "Error al analizar el texto")
+    analysis.remember(payload, result, version)
+    return result
+
+
+@router.post(
+    "/analyze/batch",
+    response_model=AnalyzeBatchResponse,
+)
+async def analyze_text_batch(payload: AnalyzeBatchRequest, response: Response):
+    """
+    Analiza varios textos en una sola request (importaciones, revisiones).
+
+    Los textos repetidos (mismo texto e idioma) se analizan una vez, los ya
+    analizados salen de la caché y el resto va al MS en paralelo (tope
+    MODERATION_BATCH_CONCURRENCY). Se permite éxito parcial: si algún texto
+    falla se responde 207 con el resultado de cada uno.
+
+    Gateway:    POST /api/v1/moderacion/analyze/batch
+    MS:         POST /analyze (una vez por texto distinto no cacheado)
+    """
+    if len(payload.items) > settings.moderation_batch_max_texts:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se permiten como máximo {settings.moderation_batch_max_texts} textos por request",
+        )
+    results, unique = await analysis.analyze_many(payload.items, settings.moderation_batch_concurrency)
+    failed = sum(1 for item in results if item.error is not None)
+    if failed:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return AnalyzeBatchResponse(
+        total=len(results),
+        unique=unique,
+        succeeded=len(results) - failed,
+        failed=failed,
+        results=[AnalyzeBatchItem(**vars(item)) for item in results],
+    )
 
 
 @router.get(
@@ -99,7 +136,7 @@ async def get_status(user_id: str, channel_id: str):
     try:
         return await moderacion_client.get_status(user_id=user_id, channel_id=channel_id)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener estado de moderación")
+        raise translate_httpx_error(e, "Error al obtener estado de moderación")
 
 
 # --- BLACKLIST WORDS ---
@@ -118,9 +155,11 @@ async def add_word(
     MS:         POST /words
     """
     try:
-        return await moderacion_client.add_word(payload=payload, api_key=api_key)
+        result = await moderacion_client.add_word(payload=payload, api_key=api_key)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al agregar palabra a la lista negra")
+        raise translate_httpx_error(e, "Error al agregar palabra a la lista negra")
+    _blacklist_changed()
+    return result
 
 
 @router.get(
@@ -148,7 +187,7 @@ async def list_words(
             skip=skip,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al listar palabras de la lista negra")
+        raise translate_httpx_error(e, "Error al listar palabras de la lista negra")
 
 
 @router.delete(
@@ -165,9 +204,11 @@ async def delete_word(
     MS:         DELETE /words/{word_id}
     """
     try:
-        return await moderacion_client.delete_word(word_id=word_id, api_key=api_key)
+        result = await moderacion_client.delete_word(word_id=word_id, api_key=api_key)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al eliminar palabra de la lista negra")
+        raise translate_httpx_error(e, "Error al eliminar palabra de la lista negra")
+    _blacklist_changed()
+    return result
 
 
 @router.get(
@@ -183,7 +224,7 @@ async def get_blacklist_stats():
     try:
         return await moderacion_client.get_blacklist_stats()
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener estadísticas de la lista negra")
+        raise translate_httpx_error(e, "Error al obtener estadísticas de la lista negra")
 
 
 @router.post(
@@ -199,9 +240,11 @@ async def refresh_cache(
     MS:         POST /refresh-cache
     """
     try:
-        return await moderacion_client.refresh_cache(api_key=api_key)
+        result = await moderacion_client.refresh_cache(api_key=api_key)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al refrescar el caché de lista negra")
+        raise translate_httpx_error(e, "Error al refrescar el caché de lista negra")
+    _blacklist_changed()
+    return result
 
 
 # --- BANS, VIOLACIONES Y ESTADÍSTICAS ---
@@ -225,7 +268,7 @@ async def get_banned_users(
             channel_id=channel_id,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener usuarios baneados")
+        raise translate_httpx_error(e, "Error al obtener usuarios baneados")
 
 
 @router.get(
@@ -251,7 +294,7 @@ async def get_user_violations(
             api_key=api_key,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener historial de violaciones")
+        raise translate_httpx_error(e, "Error al obtener historial de violaciones")
 
 
 @router.put(
@@ -275,7 +318,7 @@ async def unban_user(
             api_key=api_key,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al desbanear usuario")
+        raise translate_httpx_error(e, "Error al desbanear usuario")
 
 
 @router.get(
@@ -299,7 +342,7 @@ async def get_user_status(
             api_key=api_key,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener estado del usuario")
+        raise translate_httpx_error(e, "Error al obtener estado del usuario")
 
 
 @router.post(
@@ -323,7 +366,7 @@ async def reset_strikes(
             api_key=api_key,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al resetear strikes del usuario")
+        raise translate_httpx_error(e, "Error al resetear strikes del usuario")
 
 
 @router.get(
@@ -345,7 +388,7 @@ async def get_channel_stats(
             api_key=api_key,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener estadísticas del canal")
+        raise translate_httpx_error(e, "Error al obtener estadísticas del canal")
 
 
 @router.post(
@@ -363,4 +406,4 @@ async def expire_bans(
     try:
         return await moderacion_client.expire_bans(api_key=api_key)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al expirar bans")
+        raise translate_httpx_error(e, "Error al expirar bans")
@@ -3,6 +3,9 @@ Schemas que usa el GATEWAY para el servicio de moderación.
 
 Por ahora reutilizamos los modelos del cliente de servicios para mantener consistencia
 """
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
 
 from app.services.moderacion.schemas import (
     ModerateMessageRequest,
@@ -21,6 +24,28 @@ from app.services.moderacion.schemas import (
     ChannelStatsResponse,
 )
 
+
+
+class AnalyzeBatchRequest(BaseModel):
+    items: List[AnalyzeTextRequest] = Field(..., min_length=1)
+
+
+class AnalyzeBatchItem(BaseModel):
+    """Resultado de un texto dentro de un análisis en lote."""
+    status_code: int                # status que habría devuelto /analyze
+    result: Optional[AnalyzeTextResponse] = None
+    source: Optional[str] = None    # "cache", "prefilter" o "service"
+    error: Optional[str] = None
+
+
+class AnalyzeBatchResponse(BaseModel):
+    total: int
+    unique: int                     # textos distintos (los repetidos se analizan una vez)
+    succeeded: int
+    failed: int
+    results: List[AnalyzeBatchItem]  # en el mismo orden en que se enviaron
+
+
 __all__ = [
     "ModerateMessageRequest",
     "ModerateMessageResponse",
@@ -36,4 +61,7 @@ __all__ = [
     "UnbanUserRequest",
     "UserStatusResponse",
     "ChannelStatsResponse",
+    "AnalyzeBatchRequest",
+    "AnalyzeBatchItem",
+    "AnalyzeBatchResponse",
 ]
@@ -1,7 +1,9 @@
-from typing import Optional
+import logging
+from typing import Dict, List, Optional
 
 import httpx
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
 
 from app.api.presencia.v1.schemas import (
     DeviceEnum,
@@ -14,38 +16,40 @@ from app.api.presencia.v1.schemas import (
     SinglePresenceResponse,
     StatusUpdateRequest,
     SimpleResponse,
+    PresenceBulkRequest,
+    PresenceBrief,
+    PresenceBulkResponse,
 )
+from app.core import passthrough
+from app.core.config import settings
+from app.core.serialization import dumps, loads
+from app.core.upstream import translate_httpx_error
 from app.services.presencia import client as presencia_client
+from app.services.presencia.cache import presence_cache, resolve_presence
+from app.services.presencia.heartbeats import heartbeat_aggregator
+from app.services.presencia.hub import PresenceConnection, presence_hub
+from app.services.presencia.index import presence_index
 
 
 router = APIRouter(
     tags=["presencia"],
 )
 
+logger = logging.getLogger(__name__)
 
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
+
+def _presence_changed(user_id: str, new_status: StatusEnum, removed: bool = False) -> None:
     """
-    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
+    Propaga un cambio ya aceptado por el MS a la caché, al índice local y a
+    los sockets que observan al usuario (en segundo plano: el request no
+    espera a los sockets).
     """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = (
-                body.get("message")
-                or body.get("detail")
-                or default_message
-            )
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
+    presence_cache.invalidate(user_id)
+    if removed:
+        presence_index.remove(user_id)
+    else:
+        presence_index.set_status(user_id, new_status)
+    presence_hub.notify(user_id, new_status.value)
 
 
 @router.get(
@@ -61,7 +65,7 @@ async def health_check():
     try:
         return await presencia_client.health()
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al verificar salud del servicio de presencia")
+        raise translate_httpx_error(e, "Error al verificar salud del servicio de presencia")
 
 
 @router.post(
@@ -77,9 +81,11 @@ async def connect_user(payload: UserConnection):
     MS:         POST /api/v1.0.0/presence
     """
     try:
-        return await presencia_client.connect_user(payload)
+        created = await presencia_client.connect_user(payload)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al registrar la presencia del usuario")
+        raise translate_httpx_error(e, "Error al registrar la presencia del usuario")
+    _presence_changed(payload.userId, StatusEnum.online)
+    return created
 
 
 @router.get(
@@ -92,13 +98,25 @@ async def list_presence(
     """
     Lista usuarios con su estado de presencia actual, opcionalmente filtrando por estado.
 
+    Con status=online responde desde el índice local de presencia cuando
+    está sincronizado (ver presencia.index).
+
     Gateway:    GET /api/v1/presencia/?status=
     MS:         GET /api/v1.0.0/presence
     """
+    online_only = status == StatusEnum.online and settings.presence_index_enabled
+    if online_only:
+        local = presence_index.local_online_list()
+        if local is not None:
+            return local
     try:
-        return await presencia_client.list_presence(status=status)
+        raw = await presencia_client.list_presence_raw(status=status)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al listar presencia de usuarios")
+        raise translate_httpx_error(e, "Error al listar presencia de usuarios")
+    if online_only and presence_index.ready:
+        # al índice le faltaban registros de usuarios conectados por este gateway
+        presence_index.load_online(PresenceListResponse.model_validate_json(raw).data.users)
+    return passthrough.respond("presencia.list_presence", raw, PresenceListResponse)
 
 
 @router.get(
@@ -109,13 +127,213 @@ async def get_stats():
     """
     Devuelve estadísticas agregadas de presencia.
 
+    Responde desde el índice local de presencia cuando está sincronizado
+    (ver presencia.index).
+
     Gateway:    GET /api/v1/presencia/stats
     MS:         GET /api/v1.0.0/presence/stats
     """
+    if settings.presence_index_enabled:
+        local = presence_index.local_stats()
+        if local is not None:
+            return local
     try:
         return await presencia_client.get_stats()
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener estadísticas de presencia")
+        raise translate_httpx_error(e, "Error al obtener estadísticas de presencia")
+
+
+def _brief(presence) -> Optional[PresenceBrief]:
+    if presence is None:
+        return None
+    return PresenceBrief(status=presence.status, lastSeen=presence.lastSeen)
+
+
+@router.post(
+    "/bulk",
+    response_model=PresenceBulkResponse,
+)
+async def bulk_presence(payload: PresenceBulkRequest):
+    """
+    Presencia de varios usuarios en una sola llamada (ej: lista de miembros).
+
+    Responde desde la caché local de presencia y completa los faltantes con
+    el MS: consultas individuales en paralelo (acotadas) o, si faltan
+    muchos, un único listado completo.
+
+    Gateway:    POST /api/v1/presencia/bulk
+    MS:         GET /api/v1.0.0/presence/{userId}  o  GET /api/v1.0.0/presence
+    """
+    user_ids = list(dict.fromkeys(payload.userIds))
+    if len(user_ids) > settings.presence_bulk_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se permiten como máximo {settings.presence_bulk_max_ids} usuarios por request",
+        )
+
+    try:
+        found, unresolved = await resolve_presence(user_ids)
+    except httpx.HTTPError as e:
+        raise translate_httpx_error(e, "Error al listar presencia de usuarios")
+
+    users: Dict[str, Optional[PresenceBrief]] = {}
+    for user_id in user_ids:
+        if user_id not in found:
+            continue
+        users[user_id] = _brief(found[user_id])
+    return PresenceBulkResponse(users=users, unresolved=unresolved)
+
+
+async def _ws_send(websocket: WebSocket, message: dict) -> None:
+    await websocket.send_text(dumps(message).decode("utf-8"))
+
+
+async def _ws_open(connection: PresenceConnection, device: DeviceEnum) -> None:
+    """Primera conexión del usuario en este pod: se registra en el MS como online."""
+    websocket = connection.websocket
+    await presencia_client.connect_user(UserConnection(
+        userId=connection.user_id,
+        device=device,
+        ip=websocket.client.host if websocket.client else None,
+    ))
+    _presence_changed(connection.user_id, StatusEnum.online)
+
+
+async def _ws_close(user_id: str) -> None:
+    """Se cerró el último socket del usuario en este pod: se elimina su presencia."""
+    heartbeat_aggregator.discard(user_id)
+    try:
+        await presencia_client.delete_user_presence(user_id=user_id)
+    except httpx.HTTPError as e:
+        # el MS igual lo marcará offline por falta de heartbeats
+        logger.warning("No se pudo eliminar la presencia de %s al cerrar el socket: %r", user_id, e)
+    _presence_changed(user_id, StatusEnum.offline, removed=True)
+
+
+async def _ws_heartbeat(user_id: str) -> None:
+    if settings.presence_heartbeat_write_behind:
+        heartbeat_aggregator.record(user_id)
+    else:
+        await presencia_client.update_user_presence(
+            user_id=user_id,
+            payload=StatusUpdateRequest(heartbeat=True),
+        )
+    presence_index.heartbeat(user_id)
+
+
+async def _ws_watch(connection: PresenceConnection, user_ids: List[str]) -> dict:
+    added = presence_hub.watch(connection, user_ids)
+    found, unresolved = await resolve_presence(added)
+    return {
+        "type": "snapshot",
+        "users": {user_id: _brief(found[user_id]) for user_id in added if user_id in found},
+        "unresolved": unresolved,
+        "watching": len(connection.watching),
+    }
+
+
+async def _ws_status(user_id: str, new_status: StatusEnum) -> None:
+    heartbeat_aggregator.discard(user_id)
+    await presencia_client.update_user_presence(
+        user_id=user_id,
+        payload=StatusUpdateRequest(status=new_status),
+    )
+    _presence_changed(user_id, new_status)
+
+
+async def _ws_handle(connection: PresenceConnection, message: dict) -> Optional[dict]:
+    kind = message.get("type")
+    if kind == "ping":
+        await _ws_heartbeat(connection.user_id)
+        return {"type": "pong"}
+    if kind in ("watch", "unwatch"):
+        user_ids = message.get("userIds")
+        if not isinstance(user_ids, list) or not all(isinstance(u, str) for u in user_ids):
+            return {"type": "error", "detail": "'userIds' debe ser una lista de strings"}
+        user_ids = list(dict.fromkeys(user_ids))
+        if kind == "unwatch":
+            presence_hub.unwatch(connection, user_ids)
+            return None
+        return await _ws_watch(connection, user_ids)
+    if kind == "status":
+        try:
+            new_status = StatusEnum(message.get("status"))
+        except ValueError:
+            return {"type": "error", "detail": "'status' debe ser online u offline"}
+        await _ws_status(connection.user_id, new_status)
+        return None
+    return {"type": "error", "detail": f"Tipo de mensaje desconocido: {kind!r}"}
+
+
+@router.websocket("/ws")
+async def presence_socket(
+    websocket: WebSocket,
+    userId: str = Query(...),
+    device: DeviceEnum = Query(DeviceEnum.unknown),
+):
+    """
+    Presencia por WebSocket: abrir el socket conecta al usuario y cerrarlo
+    (el último, si tiene varios) elimina su presencia.
+
+    Mensajes del cliente (JSON):
+    - {"type": "ping"}: heartbeat (se agrupa como en PATCH), responde {"type": "pong"}
+    - {"type": "watch", "userIds": [...]}: suscribe a cambios y responde un snapshot
+    - {"type": "unwatch", "userIds": [...]}
+    - {"type": "status", "status": "online" | "offline"}: cambio de estado inmediato
+
+    Mensajes del servidor: {"type": "presence", "userId", "status", "lastSeen"}
+    por cada cambio de un usuario observado, además de pong/snapshot/error.
+
+    Cada socket inactivo solo ocupa su conexión y una entrada en el hub:
+    no hay timers ni tareas por socket; el cliente marca el ritmo con ping.
+
+    Gateway:    WS /api/v1/presencia/ws?userId=&device=
+    MS:         POST / PATCH / DELETE /api/v1.0.0/presence[/{userId}]
+    """
+    await websocket.accept()
+    connection = PresenceConnection(websocket, userId)
+    try:
+        if presence_hub.register(connection):
+            await _ws_open(connection, device)
+    except httpx.HTTPError as e:
+        presence_hub.unregister(connection)
+        error = translate_httpx_error(e, "Error al registrar la presencia del usuario")
+        await _ws_send(websocket, {"type": "error", "status_code": error.status_code, "detail": error.detail})
+        await websocket.close(code=1011)
+        return
+
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            raw = frame.get("text")
+            if raw is None:
+                # frame binario (receive_text fallaría con KeyError)
+                await _ws_send(websocket, {"type": "error", "detail": "Se esperaba un mensaje de texto (JSON)"})
+                continue
+            try:
+                message = loads(raw)
+            except ValueError:
+                await _ws_send(websocket, {"type": "error", "detail": "JSON inválido"})
+                continue
+            if not isinstance(message, dict):
+                await _ws_send(websocket, {"type": "error", "detail": "Se esperaba un objeto JSON"})
+                continue
+            try:
+                reply = await _ws_handle(connection, message)
+            except httpx.HTTPError as e:
+                error = translate_httpx_error(e, "Error al comunicarse con el servicio de presencia")
+                reply = {"type": "error", "status_code": error.status_code, "detail": error.detail}
+            except ValidationError as e:
+                reply = {"type": "error", "detail": str(e)}
+            if reply is not None:
+                await _ws_send(websocket, reply)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if presence_hub.unregister(connection):
+            await _ws_close(userId)
 
 
 @router.get(
@@ -130,9 +348,12 @@ async def get_user_presence(user_id: str):
     MS:         GET /api/v1.0.0/presence/{userId}
     """
     try:
-        return await presencia_client.get_user_presence(user_id=user_id)
+        found = await presencia_client.get_user_presence(user_id=user_id)
+        presence_cache.put(found.data)
+        presence_index.upsert(found.data)
+        return found
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener presencia del usuario")
+        raise translate_httpx_error(e, "Error al obtener presencia del usuario")
 
 
 @router.patch(
@@ -146,16 +367,34 @@ async def update_user_presence(
     """
     Actualiza el estado de un usuario (online/offline) o envía un heartbeat.
 
+    Los heartbeats se confirman de inmediato y se envían al MS agrupados
+    (ver presencia.heartbeats); los cambios de estado se envían en el momento.
+
     Gateway:    PATCH /api/v1/presencia/{user_id}
     MS:         PATCH /api/v1.0.0/presence/{userId}
     """
+    if payload.heartbeat and settings.presence_heartbeat_write_behind:
+        heartbeat_aggregator.record(user_id)
+        presence_index.heartbeat(user_id)
+        return SimpleResponse(status="success", message="Heartbeat registrado")
+
+    # un cambio de estado reemplaza cualquier heartbeat pendiente
+    heartbeat_aggregator.discard(user_id)
     try:
-        return await presencia_client.update_user_presence(
+        updated = await presencia_client.update_user_presence(
             user_id=user_id,
             payload=payload,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al actualizar la presencia del usuario")
+        raise translate_httpx_error(e, "Error al actualizar la presencia del usuario")
+    # solo se marca en el índice lo que el MS aceptó (ej: no un 404)
+    if payload.heartbeat:
+        presence_index.heartbeat(user_id)
+    if payload.status is not None:
+        _presence_changed(user_id, payload.status)
+    else:
+        presence_cache.invalidate(user_id)
+    return updated
 
 
 @router.delete(
@@ -169,7 +408,10 @@ async def delete_user_presence(user_id: str):
     Gateway:    DELETE /api/v1/presencia/{user_id}
     MS:         DELETE /api/v1.0.0/presence/{userId}
     """
+    heartbeat_aggregator.discard(user_id)
     try:
-        return await presencia_client.delete_user_presence(user_id=user_id)
+        deleted = await presencia_client.delete_user_presence(user_id=user_id)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al eliminar presencia del usuario")
+        raise translate_httpx_error(e, "Error al eliminar presencia del usuario")
+    _presence_changed(user_id, StatusEnum.offline, removed=True)
+    return deleted
@@ -4,6 +4,11 @@ Schemas que usa el GATEWAY para el servicio de presencia.
 Por ahora reutilizamos los modelos del cliente de servicios para mantener consistencia.
 """
 
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
 from app.services.presencia.schemas import (
     DeviceEnum,
     StatusEnum,
@@ -30,4 +35,21 @@ __all__ = [
     "SinglePresenceResponse",
     "StatusUpdateRequest",
     "SimpleResponse",
+    "PresenceBulkRequest",
+    "PresenceBrief",
+    "PresenceBulkResponse",
 ]
+
+
+class PresenceBulkRequest(BaseModel):
+    userIds: List[str] = Field(..., min_length=1)
+
+
+class PresenceBrief(BaseModel):
+    status: StatusEnum
+    lastSeen: datetime
+
+
+class PresenceBulkResponse(BaseModel):
+    users: Dict[str, Optional[PresenceBrief]]   # null si el MS no conoce al usuario
+    unresolved: List[str] = []                  # usuarios que no se pudieron consultar (error del MS)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status, Header, Depends
+from fastapi import APIRouter, status, Header, Depends
 import httpx
 
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -9,6 +9,7 @@ from app.api.usuarios.v1.schemas import (
     UserOut,
     TokenOut,
 )
+from app.core.upstream import translate_httpx_error
 from app.services.usuarios import client as usuarios_client
 
 router = APIRouter(
@@ -17,27 +18,6 @@ router = APIRouter(
 
 security = HTTPBearer()
 
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
-    """
-    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
-    """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = body.get("message") or body.get("detail") or default_message
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
-
-
 @router.post(
     "/register",
     response_model=UserOut,
@@ -53,7 +33,7 @@ async def register_user(payload: UserRegisterIn):
     try:
         return await usuarios_client.register_user(payload)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al registrar el usuario")
+        raise translate_httpx_error(e, "Error al registrar el usuario")
 
 
 @router.post(
@@ -70,7 +50,7 @@ async def login_user(payload: UserLoginIn):
     try:
         return await usuarios_client.login_user(payload)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al iniciar sesión")
+        raise translate_httpx_error(e, "Error al iniciar sesión")
 
 
 @router.get(
@@ -89,7 +69,7 @@ async def get_me(token: HTTPAuthorizationCredentials = Depends(security)):
     try:
         return await usuarios_client.get_me(authorization_header=authorization_header)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al obtener el perfil del usuario")
+        raise translate_httpx_error(e, "Error al obtener el perfil del usuario")
 
 
 @router.patch(
@@ -111,4 +91,4 @@ async def update_me(
             payload=payload,
         )
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(e, "Error al actualizar el perfil del usuario")
\ No newline at end of file
+        raise translate_httpx_error(e, "Error al actualizar el perfil del usuario")
\ No newline at end of file
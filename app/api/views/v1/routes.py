@@ -0,0 +1,327 @@
+# app/api/views/v1/routes.py
+import asyncio
+import logging
+from typing import Awaitable, Dict, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import Response
+
+from app.api.canales.v1.routes import router as canales_router
+from app.api.views.v1.schemas import (
+    THREAD_VIEW_FIELDS,
+    ChannelMemberView,
+    ChannelView,
+    MemberPresence,
+    MessageView,
+    SectionError,
+    ThreadView,
+)
+from app.core.upstream import translate_httpx_error
+from app.services.archivos import client as archivos_client
+from app.services.archivos.schemas import FileOut
+from app.services.canales.schemas import ChannelMember
+from app.services.hilos import client as hilos_client
+from app.services.mensajes import client as mensajes_client
+from app.services.mensajes.schemas import MessageOut
+from app.services.presencia.cache import resolve_presence
+from app.services.presencia.schemas import UserPresence
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    tags=["views"],
+)
+
+T = TypeVar("T")
+
+# rutas compiladas de canales (caché de GET, métricas e invalidación compartidas)
+_get_channel = canales_router.upstream_routes["canales.get_channel"]
+_get_members = canales_router.upstream_routes["canales.get_members_for_channel"]
+
+
+async def _section(
+    name: str,
+    errors: Dict[str, SectionError],
+    call: Awaitable[T],
+    default_message: str,
+) -> Optional[T]:
+    """
+    Ejecuta la llamada de una sección. Si el MS falla, registra el error en
+    `errors` y devuelve None en vez de propagar (respuesta parcial).
+    """
+    try:
+        return await call
+    except httpx.HTTPError as e:
+        error = translate_httpx_error(e, default_message)
+        errors[name] = SectionError(status_code=error.status_code, detail=str(error.detail))
+        return None
+    except Exception:
+        # ej: respuesta que no calza con el schema; no debe tumbar la vista
+        logger.exception("Error inesperado en la sección %s de una vista", name)
+        errors[name] = SectionError(status_code=status.HTTP_502_BAD_GATEWAY, detail=default_message)
+        return None
+
+
+async def _members_with_presence(
+    channel_id: str,
+    members_limit: int,
+    errors: Dict[str, SectionError],
+) -> Optional[List[ChannelMemberView]]:
+    """
+    Miembros del canal con su presencia. La presencia se pide solo para
+    esos miembros (caché de presencia y, si faltan muchos, el listado del
+    MS; ver presencia.cache.resolve_presence).
+    """
+    members = await _section(
+        "members", errors,
+        _get_members.call(channel_id=channel_id, page=1, page_size=members_limit),
+        "Error al obtener miembros del canal",
+    )
+    if members is None:
+        return None
+    user_ids = list(dict.fromkeys(member.id for member in members))
+    resolved = await _section(
+        "presence", errors,
+        resolve_presence(user_ids),
+        "Error al obtener la presencia de usuarios",
+    )
+    by_user: Dict[str, UserPresence] = {}
+    if resolved is not None:
+        found, unresolved = resolved
+        by_user = {user_id: presence for user_id, presence in found.items() if presence is not None}
+        if unresolved:
+            errors["presence"] = SectionError(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"No se pudo obtener la presencia de {len(unresolved)} miembros",
+            )
+    return _join_presence(members, by_user)
+
+
+def _join_presence(
+    members: List[ChannelMember],
+    by_user: Dict[str, UserPresence],
+) -> List[ChannelMemberView]:
+    """
+    Agrega a cada miembro su presencia (`by_user`: la sesión más relevante
+    de cada usuario, ver presencia.cache.more_relevant).
+    """
+    views = []
+    for member in members:
+        presence = by_user.get(member.id)
+        views.append(
+            ChannelMemberView(
+                id=member.id,
+                joined_at=member.joined_at,
+                status=member.status,
+                presence=(
+                    MemberPresence(
+                        status=presence.status,
+                        device=presence.device,
+                        lastSeen=presence.lastSeen,
+                    )
+                    if presence is not None
+                    else None
+                ),
+            )
+        )
+    return views
+
+
+@router.get(
+    "/channel/{channel_id}",
+    response_model=ChannelView,
+)
+async def get_channel_view(
+    channel_id: str,
+    members_limit: int = Query(100, ge=1, le=500),
+):
+    """
+    Todo lo necesario para abrir un canal en una sola llamada: datos del
+    canal, miembros con su presencia e hilos.
+
+    Las llamadas a canales e hilos se hacen en paralelo, por lo que la
+    latencia es la del MS más lento y no la suma. La presencia se pide
+    solo para los miembros obtenidos, casi siempre desde la caché local.
+    Si un MS falla, su sección queda en null y el error se informa en
+    `errors` (si falla presencia, los miembros salen sin ella).
+
+    Gateway: GET /api/v1/views/channel/{channel_id}
+    MS:      canales (canal y miembros), hilos, presencia
+    """
+    errors: Dict[str, SectionError] = {}
+
+    async with asyncio.TaskGroup() as tg:
+        channel_task = tg.create_task(_section(
+            "channel", errors,
+            _get_channel.call(channel_id=channel_id),
+            "Error al obtener el canal",
+        ))
+        members_task = tg.create_task(_members_with_presence(channel_id, members_limit, errors))
+        threads_task = tg.create_task(_section(
+            "threads", errors,
+            hilos_client.get_threads_by_channel(channel_id),
+            "Error al obtener hilos del canal",
+        ))
+
+    channel_error = errors.get("channel")
+    if channel_error is not None and channel_error.status_code == status.HTTP_404_NOT_FOUND:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=channel_error.detail)
+
+    return ChannelView(
+        channel=channel_task.result(),
+        members=members_task.result(),
+        threads=threads_task.result(),
+        errors=errors,
+    )
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(THREAD_VIEW_FIELDS)
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in THREAD_VIEW_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos desconocidos: {', '.join(unknown)}. Válidos: {', '.join(THREAD_VIEW_FIELDS)}",
+        )
+    return selected
+
+
+def _file_index(files: List[FileOut]) -> Dict[str, FileOut]:
+    """Índice de archivos por las formas en que un mensaje puede referenciarlos en `paths`."""
+    index: Dict[str, FileOut] = {}
+    for file in files:
+        index[str(file.id)] = file
+        index[file.object_key] = file
+        index[f"{file.bucket}/{file.object_key}"] = file
+    return index
+
+
+def _resolve_path(path: str, index: Dict[str, FileOut]) -> Optional[FileOut]:
+    # acepta id, object_key, "bucket/object_key" o una URL que termine en ellos
+    key = urlsplit(path).path if "://" in path else path.split("?", 1)[0]
+    key = key.lstrip("/")
+    file = index.get(path) or index.get(key)
+    if file is None and "/" in key:
+        file = index.get(key.split("/", 1)[1])
+    return file
+
+
+def _embed_attachments(
+    messages: List[MessageOut],
+    files: Optional[List[FileOut]],
+) -> Tuple[List[MessageView], Optional[List[FileOut]]]:
+    """
+    Asocia archivos a mensajes (por message_id o por referencia en `paths`)
+    y devuelve (mensajes con adjuntos, archivos que no quedaron en ningún mensaje).
+    `files` ya viene sin archivos eliminados. Sin `files` (sección no pedida o
+    fallida) los mensajes quedan con attachments null.
+    """
+    if files is None:
+        views = [MessageView.model_construct(**message.__dict__, attachments=None) for message in messages]
+        return views, None
+    index = _file_index(files)
+    by_message: Dict[str, List[FileOut]] = {}
+    for file in files:
+        if file.message_id is not None:
+            by_message.setdefault(file.message_id, []).append(file)
+
+    used = set()
+    views = []
+    for message in messages:
+        attachments = list(by_message.get(str(message.id), ()))
+        seen = {file.id for file in attachments}
+        for path in message.paths or ():
+            file = _resolve_path(path, index)
+            if file is not None and file.id not in seen:
+                seen.add(file.id)
+                attachments.append(file)
+        used.update(seen)
+        # los datos ya vienen validados del MS: no se vuelven a validar
+        views.append(MessageView.model_construct(**message.__dict__, attachments=attachments))
+
+    return views, [file for file in files if file.id not in used]
+
+
+@router.get(
+    "/thread/{thread_id}",
+    response_model=ThreadView,
+)
+async def get_thread_view(
+    thread_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(
+        None,
+        description='Secciones a incluir separadas por coma: "thread", "messages", "attachments" (por defecto todas)',
+    ),
+):
+    """
+    Hilo, página de mensajes y adjuntos en una sola llamada.
+
+    Las llamadas a hilos, mensajes y archivos se hacen en paralelo. Los
+    archivos se incrustan en los mensajes que los referencian (por
+    message_id o en `paths`); los que no calzan con ningún mensaje de la
+    página quedan en `attachments`. Con `fields` se omiten las secciones que
+    no se usan (y sus llamadas al MS).
+
+    Gateway: GET /api/v1/views/thread/{thread_id}?limit=&cursor=&fields=
+    MS:      hilos, mensajes, archivos
+    """
+    selected = _parse_fields(fields)
+    errors: Dict[str, SectionError] = {}
+    thread_task = messages_task = files_task = None
+
+    async with asyncio.TaskGroup() as tg:
+        if "thread" in selected:
+            thread_task = tg.create_task(_section(
+                "thread", errors,
+                hilos_client.get_thread(thread_id),
+                "Error al obtener el hilo",
+            ))
+        if "messages" in selected:
+            messages_task = tg.create_task(_section(
+                "messages", errors,
+                mensajes_client.list_messages(thread_id=thread_id, limit=limit, cursor=cursor),
+                "Error al listar mensajes del hilo",
+            ))
+        if "attachments" in selected:
+            files_task = tg.create_task(_section(
+                "attachments", errors,
+                archivos_client.list_files(thread_id=thread_id),
+                "Error al listar archivos del hilo",
+            ))
+
+    thread_error = errors.get("thread")
+    if thread_error is not None and thread_error.status_code == status.HTTP_404_NOT_FOUND:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=thread_error.detail)
+
+    # solo las secciones pedidas (y errors) van en la respuesta
+    view = ThreadView(errors=errors)
+    include = {"errors"}
+    if thread_task is not None:
+        include.add("thread")
+        view.thread = thread_task.result()
+
+    files = files_task.result() if files_task is not None else None
+    if files is not None:
+        files = [file for file in files if file.deleted_at is None]
+    if messages_task is not None:
+        include.add("messages")
+        page = messages_task.result()
+        if page is not None:
+            include.update(("next_cursor", "has_more"))
+            view.messages, files = _embed_attachments(page.items, files)
+            view.next_cursor = page.next_cursor
+            view.has_more = page.has_more
+    if files_task is not None:
+        include.add("attachments")
+        view.attachments = files
+
+    return Response(
+        content=view.model_dump_json(include=include),
+        media_type="application/json",
+    )
@@ -0,0 +1,70 @@
+"""
+Schemas de las vistas compuestas del GATEWAY.
+
+Una vista junta en una sola respuesta lo que el frontend armaría con varias
+llamadas a distintos MS. Si alguno falla, su sección queda en null y el
+error se informa en `errors` (respuesta parcial).
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.services.archivos.schemas import FileOut
+from app.services.canales.schemas import Channel, ChannelMember
+from app.services.hilos.schemas import ThreadBasicInfo, ThreadOut
+from app.services.mensajes.schemas import MessageOut
+from app.services.presencia.schemas import DeviceEnum, StatusEnum
+
+__all__ = [
+    "SectionError",
+    "MemberPresence",
+    "ChannelMemberView",
+    "ChannelView",
+    "MessageView",
+    "ThreadView",
+    "THREAD_VIEW_FIELDS",
+]
+
+
+class SectionError(BaseModel):
+    """Error de un MS al armar una sección de la vista."""
+    status_code: int
+    detail: str
+
+
+class MemberPresence(BaseModel):
+    status: StatusEnum
+    device: DeviceEnum
+    lastSeen: datetime
+
+
+class ChannelMemberView(ChannelMember):
+    presence: Optional[MemberPresence] = None   # null si el MS de presencia no lo conoce
+
+
+class ChannelView(BaseModel):
+    channel: Optional[Channel] = None
+    members: Optional[List[ChannelMemberView]] = None
+    threads: Optional[List[ThreadBasicInfo]] = None
+    errors: Dict[str, SectionError] = {}        # sección -> error ("channel", "members", "threads", "presence")
+
+
+class MessageView(MessageOut):
+    # archivos del mensaje (por message_id o por `paths`); null si no se
+    # pidieron los adjuntos o no se pudieron obtener
+    attachments: Optional[List[FileOut]] = None
+
+
+# Secciones seleccionables con ?fields= en la vista de hilo
+THREAD_VIEW_FIELDS = ("thread", "messages", "attachments")
+
+
+class ThreadView(BaseModel):
+    thread: Optional[ThreadOut] = None
+    messages: Optional[List[MessageView]] = None
+    next_cursor: Optional[str] = None
+    has_more: Optional[bool] = None
+    attachments: Optional[List[FileOut]] = None  # archivos del hilo no asociados a los mensajes de la página
+    errors: Dict[str, SectionError] = {}        # sección -> error ("thread", "messages", "attachments")
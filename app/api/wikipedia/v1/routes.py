@@ -1,10 +1,11 @@
 import httpx
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, status
 
 from app.api.wikipedia.v1.schemas import (
     ChatWikipediaRequest,
     ChatWikipediaResponse,
 )
+from app.core.upstream import translate_httpx_error
 from app.services.wikipedia import client as wikipedia_client
 
 
@@ -13,31 +14,6 @@ router = APIRouter(
 )
 
 
-def _translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
-    """
-    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
-    """
-    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-        try:
-            body = e.response.json()
-            detail = (
-                body.get("message")
-                or body.get("detail")
-                or default_message
-            )
-        except ValueError:
-            detail = default_message
-        return HTTPException(
-            status_code=e.response.status_code,
-            detail=detail,
-        )
-
-    return HTTPException(
-        status_code=status.HTTP_502_BAD_GATEWAY,
-        detail=default_message,
-    )
-
-
 @router.post(
     "/chat",
     response_model=ChatWikipediaResponse,
@@ -53,7 +29,7 @@ async def chat_wikipedia(payload: ChatWikipediaRequest):
     try:
         return await wikipedia_client.chat_wikipedia(payload)
     except httpx.HTTPError as e:
-        raise _translate_httpx_error(
+        raise translate_httpx_error(
             e,
             "Error al consultar el servicio de Wikipedia",
         )
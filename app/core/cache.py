@@ -0,0 +1,83 @@
+"""
+Caché en memoria con expiración (TTL) y tamaño máximo (LRU).
+
+Pensada para el event loop del gateway: no usa locks porque todas las
+operaciones son síncronas y se ejecutan en un único hilo.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Iterator, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 60.0,
+        on_evict: Optional[Callable[[Hashable, V], None]] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default=None, count: bool = True):
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            self._evict(key)
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = (expires_at, value)
+        while len(self._data) > self.max_entries:
+            oldest = next(iter(self._data))
+            self._evict(oldest)
+
+    def pop(self, key: Hashable, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Elimina las entradas cuya llave cumple `predicate`; devuelve cuántas."""
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            self._evict(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        for key in list(self._data):
+            self._evict(key)
+
+    def items(self) -> Iterator[Tuple[Hashable, V]]:
+        now = time.monotonic()
+        for key, (expires_at, value) in list(self._data.items()):
+            if expires_at > now:
+                yield key, value
+
+    def _evict(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None and self.on_evict is not None:
+            self.on_evict(key, entry[1])
@@ -0,0 +1,238 @@
+"""
+Middleware de compresión de respuestas con negociación zstd / brotli / gzip.
+
+- Se elige la codificación según Accept-Encoding (preferencia del gateway:
+  zstd > br > gzip, entre las que el cliente acepta y estén instaladas).
+- Solo se comprimen respuestas completas (un único mensaje de body); las
+  respuestas en streaming (ZIP, SSE, NDJSON) pasan sin tocar.
+- Se omiten bodies pequeños, respuestas que ya traen Content-Encoding y
+  tipos que ya vienen comprimidos (descargas de archivos, imágenes, etc.).
+- Bodies grandes se comprimen en el threadpool para no bloquear el event loop.
+
+Las métricas (ratio y tiempo de CPU) se acumulan por ruta en `compression_stats`.
+"""
+import gzip
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # dependencia opcional
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:  # dependencia opcional (Python < 3.14)
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+EXCLUDED_MEDIA_PREFIXES = (
+    "application/octet-stream",
+    "application/zip",
+    "application/gzip",
+    "application/pdf",
+    "image/",
+    "video/",
+    "audio/",
+    "text/event-stream",
+)
+
+
+def _compressors(gzip_level: int, brotli_quality: int, zstd_level: int) -> Dict[str, Callable[[bytes], bytes]]:
+    available: Dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        # ZstdCompressor no es thread-safe: se crea uno por llamada
+        available["zstd"] = lambda data: zstandard.ZstdCompressor(level=zstd_level).compress(data)
+    if brotli is not None:
+        available["br"] = lambda data: brotli.compress(data, quality=brotli_quality)
+    available["gzip"] = lambda data: gzip.compress(data, compresslevel=gzip_level, mtime=0)
+    return available
+
+
+def negotiate_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """
+    Devuelve la mejor codificación disponible aceptada por el cliente
+    (respetando q=0), o None si no hay ninguna.
+    """
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    wildcard = accepted.get("*")
+    for encoding in available:
+        quality = accepted.get(encoding, wildcard)
+        if quality is not None and quality > 0:
+            return encoding
+    return None
+
+
+@dataclass
+class RouteCompressionStats:
+    responses: int = 0
+    compressed: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    cpu_seconds: float = 0.0
+    by_encoding: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+
+class CompressionStats:
+    def __init__(self) -> None:
+        self.routes: Dict[str, RouteCompressionStats] = {}
+
+    def record(self, route: str, encoding: Optional[str], size_in: int, size_out: int, cpu: float) -> None:
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteCompressionStats()
+        stats.responses += 1
+        if encoding is None:
+            return
+        stats.compressed += 1
+        stats.bytes_in += size_in
+        stats.bytes_out += size_out
+        stats.cpu_seconds += cpu
+        stats.by_encoding[encoding] = stats.by_encoding.get(encoding, 0) + 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            route: {
+                "responses": stats.responses,
+                "compressed": stats.compressed,
+                "bytes_in": stats.bytes_in,
+                "bytes_out": stats.bytes_out,
+                "ratio": round(stats.ratio, 4),
+                "cpu_ms": round(stats.cpu_seconds * 1000, 3),
+                "by_encoding": dict(stats.by_encoding),
+            }
+            for route, stats in sorted(self.routes.items())
+        }
+
+
+compression_stats = CompressionStats()
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _route_path(scope: Scope) -> str:
+    """
+    Plantilla de la ruta atendida (ej: /api/v1/mensajes/threads/{thread_id}/messages).
+
+    Según la versión de FastAPI, route.path puede venir con o sin el prefijo
+    del router; el prefijo se recupera de la ruta real quitando tantos
+    segmentos como tenga la plantilla. Los requests que no calzan con
+    ninguna ruta (404, escaneos) se agrupan en una sola llave: la ruta real
+    haría crecer las estadísticas sin límite.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    path = scope.get("path", "")
+    prefix = path.rsplit("/", template.count("/"))[0]
+    return prefix + template
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        threadpool_min_size: int = 256 * 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.threadpool_min_size = threadpool_min_size
+        self.compressors = _compressors(gzip_level, brotli_quality, zstd_level)
+        self.preference = [e for e in ("zstd", "br", "gzip") if e in self.compressors]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""),
+            self.preference,
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, encoding: str, body: bytes) -> Tuple[bytes, float]:
+        started = time.thread_time()
+        compressed = self.compressors[encoding](body)
+        return compressed, time.thread_time() - started
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, send: Send, encoding: str) -> None:
+        self.middleware = middleware
+        self.scope = scope
+        self.downstream = send
+        self.encoding = encoding
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").lower()
+            if "content-encoding" in headers or media_type.startswith(EXCLUDED_MEDIA_PREFIXES):
+                self.passthrough = True
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        start, self.start_message = self.start_message, None
+        self.passthrough = True  # lo que venga después se reenvía tal cual
+        body = message.get("body", b"")
+        route = _route_path(self.scope)
+
+        if message.get("more_body", False) or len(body) < self.middleware.minimum_size:
+            compression_stats.record(route, None, len(body), len(body), 0.0)
+            await self.downstream(start)
+            await self.downstream(message)
+            return
+
+        if len(body) >= self.middleware.threadpool_min_size:
+            compressed, cpu = await run_in_threadpool(self.middleware.compress, self.encoding, body)
+        else:
+            compressed, cpu = self.middleware.compress(self.encoding, body)
+        compression_stats.record(route, self.encoding, len(body), len(compressed), cpu)
+
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        await self.downstream(start)
+        await self.downstream({"type": "http.response.body", "body": compressed, "more_body": False})
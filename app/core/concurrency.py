@@ -0,0 +1,31 @@
+"""
+Utilidades de concurrencia compartidas por los routers del gateway.
+"""
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+
+async def gather_limited(
+    factories: Iterable[Callable[[], Awaitable[T]]],
+    limit: int,
+    return_exceptions: bool = False,
+) -> List[T]:
+    """
+    Ejecuta las corrutinas creadas por `factories` con a lo más `limit`
+    en vuelo a la vez y devuelve los resultados en el mismo orden.
+
+    Se reciben fábricas (y no corrutinas) para que cada llamada al MS
+    recién se cree cuando obtiene cupo.
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(factory: Callable[[], Awaitable[T]]) -> T:
+        async with semaphore:
+            return await factory()
+
+    return await asyncio.gather(
+        *(run(factory) for factory in factories),
+        return_exceptions=return_exceptions,
+    )
@@ -27,6 +27,40 @@ class Settings:
         "MESSAGES_SERVICE_BASE_URL",
         "https://messages.example.com",
     )
+    # Stream SSE de mensajes: un poller compartido por hilo con suscriptores
+    messages_stream_poll_interval: float = float(os.getenv("MESSAGES_STREAM_POLL_INTERVAL", "2"))
+    messages_stream_page_size: int = int(os.getenv("MESSAGES_STREAM_PAGE_SIZE", "50"))
+    # Páginas que un poll puede recorrer para alcanzar lo ya visto (ráfagas)
+    messages_stream_max_pages: int = int(os.getenv("MESSAGES_STREAM_MAX_PAGES", "5"))
+    # Eventos pendientes por suscriptor antes de pedirle que se reconecte
+    messages_stream_queue_size: int = int(os.getenv("MESSAGES_STREAM_QUEUE_SIZE", "100"))
+    messages_stream_keepalive: float = float(os.getenv("MESSAGES_STREAM_KEEPALIVE", "15"))
+    # Segundos que un hilo sigue consultándose sin suscriptores (long-polls consecutivos)
+    messages_stream_linger: float = float(os.getenv("MESSAGES_STREAM_LINGER", "5"))
+    # Espera máxima (segundos) de GET .../messages?wait= (long-poll)
+    messages_long_poll_max_wait: float = float(os.getenv("MESSAGES_LONG_POLL_MAX_WAIT", "30"))
+    # Caché de páginas con cursor (0 = deshabilitada)
+    messages_page_cache_ttl: float = float(os.getenv("MESSAGES_PAGE_CACHE_TTL", "300"))
+    messages_page_cache_max_entries: int = int(os.getenv("MESSAGES_PAGE_CACHE_MAX_ENTRIES", "5000"))
+    # true si los cursores del MS son estables (keyset): un mensaje nuevo no corre las páginas antiguas
+    messages_page_cache_keyset_cursors: bool = os.getenv("MESSAGES_PAGE_CACHE_KEYSET_CURSORS", "true").lower() == "true"
+    # Prefetch de next_cursor hacia la caché de páginas (requiere la caché)
+    messages_prefetch_enabled: bool = os.getenv("MESSAGES_PREFETCH_ENABLED", "false").lower() == "true"
+    # Prefetches permitidos por cada página pedida al MS por un cliente
+    messages_prefetch_share: float = float(os.getenv("MESSAGES_PREFETCH_SHARE", "0.5"))
+    messages_prefetch_burst: int = int(os.getenv("MESSAGES_PREFETCH_BURST", "20"))
+    messages_prefetch_per_thread: int = int(os.getenv("MESSAGES_PREFETCH_PER_THREAD", "2"))
+    # Tamaño de página al exportar un hilo completo
+    messages_export_page_size: int = int(os.getenv("MESSAGES_EXPORT_PAGE_SIZE", "200"))
+    # Journal de escrituras para GET .../delta (por réplica, en memoria)
+    messages_journal_per_thread: int = int(os.getenv("MESSAGES_JOURNAL_PER_THREAD", "500"))
+    messages_journal_max_threads: int = int(os.getenv("MESSAGES_JOURNAL_MAX_THREADS", "10000"))
+    # Páginas que un delta puede recorrer antes de pedir al cliente recargar
+    messages_delta_max_pages: int = int(os.getenv("MESSAGES_DELTA_MAX_PAGES", "5"))
+    # Importación masiva: creaciones en vuelo entre todos los hilos y líneas leídas sin resultado
+    messages_import_concurrency: int = int(os.getenv("MESSAGES_IMPORT_CONCURRENCY", "16"))
+    messages_import_max_pending: int = int(os.getenv("MESSAGES_IMPORT_MAX_PENDING", "1000"))
+    messages_import_max_line_bytes: int = int(os.getenv("MESSAGES_IMPORT_MAX_LINE_BYTES", "1048576"))
 
     # Moderación
     moderation_service_base_url: str = os.getenv(
@@ -34,12 +68,50 @@ class Settings:
         "https://moderation.example.com",
     )
 
+    # Prefiltro con la lista negra en el gateway (ver moderacion.blacklist):
+    # los textos sin coincidencias se responden en /analyze sin llamar al MS
+    moderation_prefilter_enabled: bool = os.getenv("MODERATION_PREFILTER_ENABLED", "false").lower() == "true"
+    moderation_blacklist_refresh_interval: float = float(os.getenv("MODERATION_BLACKLIST_REFRESH_INTERVAL", "300"))
+    moderation_blacklist_page_size: int = int(os.getenv("MODERATION_BLACKLIST_PAGE_SIZE", "100"))
+    # Caché de POST /moderacion/analyze por (texto, idioma) (0 = sin caché)
+    moderation_analyze_cache_ttl: float = float(os.getenv("MODERATION_ANALYZE_CACHE_TTL", "0"))
+    moderation_analyze_cache_max_entries: int = int(os.getenv("MODERATION_ANALYZE_CACHE_MAX_ENTRIES", "10000"))
+    # POST /moderacion/analyze/batch: textos por request y llamadas en paralelo al MS
+    moderation_batch_max_texts: int = int(os.getenv("MODERATION_BATCH_MAX_TEXTS", "200"))
+    moderation_batch_concurrency: int = int(os.getenv("MODERATION_BATCH_CONCURRENCY", "8"))
+
     # Presencia
     presence_service_base_url: str = os.getenv(
         "PRESENCE_SERVICE_BASE_URL",
         "https://presence.example.com",
     )
 
+    # Caché local de presencia (segundos) y consulta masiva POST /presencia/bulk
+    presence_cache_ttl: float = float(os.getenv("PRESENCE_CACHE_TTL", "10"))
+    presence_cache_max_entries: int = int(os.getenv("PRESENCE_CACHE_MAX_ENTRIES", "50000"))
+    presence_bulk_max_ids: int = int(os.getenv("PRESENCE_BULK_MAX_IDS", "500"))
+    presence_bulk_concurrency: int = int(os.getenv("PRESENCE_BULK_CONCURRENCY", "8"))
+    # Desde cuántos usuarios faltantes conviene un solo listado completo
+    presence_bulk_list_threshold: int = int(os.getenv("PRESENCE_BULK_LIST_THRESHOLD", "25"))
+
+    # Heartbeats write-behind: se confirman al cliente y se envían agrupados al MS
+    presence_heartbeat_write_behind: bool = os.getenv("PRESENCE_HEARTBEAT_WRITE_BEHIND", "true").lower() == "true"
+    # Debe ser menor que el timeout de inactividad del MS de presencia
+    presence_heartbeat_flush_interval: float = float(os.getenv("PRESENCE_HEARTBEAT_FLUSH_INTERVAL", "30"))
+    presence_heartbeat_concurrency: int = int(os.getenv("PRESENCE_HEARTBEAT_CONCURRENCY", "16"))
+
+    # WebSocket de presencia: máximo de usuarios observados por socket y
+    # tiempo máximo para entregar una notificación a un socket lento
+    presence_ws_max_watch: int = int(os.getenv("PRESENCE_WS_MAX_WATCH", "1000"))
+    presence_ws_send_timeout: float = float(os.getenv("PRESENCE_WS_SEND_TIMEOUT", "2"))
+
+    # Índice local de presencia para /presencia/stats y ?status=online
+    presence_index_enabled: bool = os.getenv("PRESENCE_INDEX_ENABLED", "true").lower() == "true"
+    # Segundos sin heartbeats tras los que un usuario pasa a offline en el índice
+    presence_index_offline_after: float = float(os.getenv("PRESENCE_INDEX_OFFLINE_AFTER", "90"))
+    presence_index_wheel_slot: float = float(os.getenv("PRESENCE_INDEX_WHEEL_SLOT", "5"))
+    presence_index_resync_interval: float = float(os.getenv("PRESENCE_INDEX_RESYNC_INTERVAL", "60"))
+
     # Chatbot Wikipedia
     wikipedia_service_base_url: str = os.getenv(
         "WIKIPEDIA_SERVICE_BASE_URL",
@@ -52,6 +124,17 @@ class Settings:
         "https://files.example.com",
     )
 
+    # Máximo de archivos descargándose en paralelo al armar un ZIP de hilo
+    files_zip_concurrency: int = int(os.getenv("FILES_ZIP_CONCURRENCY", "4"))
+
+    # Deduplicación de subidas por hash: "off", "report" o "reuse"
+    files_dedup_mode: str = os.getenv("FILES_DEDUP_MODE", "report")
+    files_dedup_max_entries: int = int(os.getenv("FILES_DEDUP_MAX_ENTRIES", "10000"))
+
+    # Subida múltiple: archivos por request y subidas en paralelo al MS
+    files_batch_max_files: int = int(os.getenv("FILES_BATCH_MAX_FILES", "20"))
+    files_batch_concurrency: int = int(os.getenv("FILES_BATCH_CONCURRENCY", "4"))
+
     # Chatbot de programación
     chatbot_service_base_url: str = os.getenv(
         "CHATBOT_SERVICE_BASE_URL",
@@ -70,6 +153,43 @@ class Settings:
         "https://threads.example.com",
     )
 
+    # Compresión de respuestas (zstd / br / gzip)
+    compression_enabled: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    compression_minimum_size: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    # Bodies desde este tamaño se comprimen fuera del event loop
+    compression_threadpool_min_size: int = int(os.getenv("COMPRESSION_THREADPOOL_MIN_SIZE", "262144"))
+    compression_gzip_level: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    compression_brotli_quality: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    compression_zstd_level: int = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+    # Rutas que reenvían el JSON del MS sin re-validar (ej: "mensajes.list_messages")
+    passthrough_routes: str = os.getenv("PASSTHROUGH_ROUTES", "")
+    # Fracción de respuestas pass-through que igual se validan contra el schema
+    passthrough_sample_rate: float = float(os.getenv("PASSTHROUGH_SAMPLE_RATE", "0.01"))
+
+    # Serializador JSON de respuestas: "auto", "orjson" o "stdlib"
+    json_backend: str = os.getenv("JSON_BACKEND", "auto")
+
+    # Clientes httpx compartidos hacia los MS (ver app.core.upstream)
+    upstream_timeout: float = float(os.getenv("UPSTREAM_TIMEOUT", "5"))
+    upstream_max_connections: int = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+    upstream_max_keepalive: int = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"))
+    # Reintentos ante errores de red en GET de rutas declarativas
+    upstream_retries: int = int(os.getenv("UPSTREAM_RETRIES", "1"))
+    # Segundos que se cachean los GET marcados como cacheables (0 = sin caché)
+    upstream_cache_ttl: float = float(os.getenv("UPSTREAM_CACHE_TTL", "0"))
+    upstream_cache_max_entries: int = int(os.getenv("UPSTREAM_CACHE_MAX_ENTRIES", "1024"))
+
+    # Idempotency-Key en los POST que crean (ver app.core.idempotency)
+    idempotency_ttl: float = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    idempotency_max_entries: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+    # Batch de sub-requests (POST /api/v1/batch)
+    batch_max_requests: int = int(os.getenv("BATCH_MAX_REQUESTS", "50"))
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    # Tiempo máximo (segundos) para todo el batch
+    batch_timeout: float = float(os.getenv("BATCH_TIMEOUT", "10"))
+
     #CORS
     cors_allowed_origins: str = os.getenv(
         "CORS_ALLOWED_ORIGINS",
@@ -0,0 +1,163 @@
+"""
+Ejecución de sub-requests dentro del mismo proceso.
+
+`dispatch` arma un scope ASGI a partir del request original y lo entrega
+directamente al router de la app: no hay loopback HTTP, ni serialización de
+la conexión, ni paso por los middlewares (CORS, compresión) que solo tienen
+sentido para la respuesta externa.
+
+Las respuestas en streaming sin fin (SSE) no se pueden juntar en una
+respuesta completa: se cortan apenas la ruta envía sus headers y la
+sub-request responde 400.
+"""
+import asyncio
+import json
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.types import Message
+
+# Headers del request original que no se heredan a las sub-requests
+_NOT_INHERITED = frozenset({
+    b"content-length",
+    b"content-type",
+    b"transfer-encoding",
+    b"accept-encoding",
+    b"expect",
+})
+
+# Claves del scope original que la app necesita en la sub-request
+_INHERITED_SCOPE_KEYS = (
+    "asgi",
+    "http_version",
+    "scheme",
+    "server",
+    "client",
+    "root_path",
+    "app",
+    "state",
+    "starlette.exception_handlers",
+)
+
+_EVENT_STREAM = "text/event-stream"
+
+
+class _StreamingRejected(Exception):
+    """La sub-request respondió un stream sin fin (SSE)."""
+
+
+def _streaming_rejected(exc: Exception) -> bool:
+    # StreamingResponse envía desde un task group: puede llegar agrupada
+    if isinstance(exc, BaseExceptionGroup):
+        return exc.subgroup(_StreamingRejected) is not None
+    return isinstance(exc, _StreamingRejected)
+
+
+@dataclass
+class SubResponse:
+    status_code: int = 500
+    headers: List[Tuple[bytes, bytes]] = field(default_factory=list)
+    body: bytes = b""
+
+    @property
+    def media_type(self) -> str:
+        for name, value in self.headers:
+            if name.lower() == b"content-type":
+                return value.decode("latin-1").lower()
+        return ""
+
+
+def target_path(url: str) -> str:
+    """Ruta (decodificada) que verá el router para `url`."""
+    return unquote(urlsplit(url).path)
+
+
+async def dispatch(
+    request: Request,
+    method: str,
+    url: str,
+    headers: Iterable[Tuple[str, str]] = (),
+    body: bytes = b"",
+    content_type: Optional[str] = None,
+    path: Optional[str] = None,
+) -> SubResponse:
+    """
+    Ejecuta `method url` contra la misma app y devuelve la respuesta completa.
+
+    Los headers del request original (ej: Authorization, X-User-Id) se
+    heredan y los de `headers` los sobrescriben. `path` es la ruta ya
+    decodificada con `target_path`, si quien llama la validó.
+    """
+    parts = urlsplit(url)
+    overrides = {name.lower().encode("latin-1"): value.encode("latin-1") for name, value in headers}
+    if content_type is not None and b"content-type" not in overrides:
+        overrides[b"content-type"] = content_type.encode("latin-1")
+    if body:
+        overrides[b"content-length"] = str(len(body)).encode("latin-1")
+
+    raw_headers = [
+        (name, value)
+        for name, value in request.scope["headers"]
+        if name not in _NOT_INHERITED and name not in overrides
+    ]
+    raw_headers.extend(overrides.items())
+
+    scope = {key: request.scope[key] for key in _INHERITED_SCOPE_KEYS if key in request.scope}
+    scope.update(
+        type="http",
+        method=method.upper(),
+        # como los servidores ASGI: path decodificado, raw_path tal cual llegó
+        path=path if path is not None else target_path(url),
+        raw_path=parts.path.encode("utf-8"),
+        query_string=parts.query.encode("latin-1"),
+        headers=raw_headers,
+    )
+
+    body_sent = False
+
+    async def receive() -> Message:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # el "cliente" nunca se desconecta; la espera se cancela al terminar
+        await asyncio.Future()
+
+    response = SubResponse()
+    chunks: List[bytes] = []
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            response.status_code = message["status"]
+            response.headers = list(message.get("headers", []))
+            if response.media_type.startswith(_EVENT_STREAM):
+                raise _StreamingRejected()
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    async with AsyncExitStack() as stack:
+        scope["fastapi_middleware_astack"] = stack
+        try:
+            await request.app.router(scope, receive, send)
+        except HTTPException as exc:
+            # ej: 404/405 del router, que normalmente resuelve ExceptionMiddleware
+            if chunks:
+                raise
+            _error(response, chunks, exc.status_code, exc.detail)
+        except Exception as exc:
+            if not _streaming_rejected(exc):
+                raise
+            _error(response, chunks, 400, "Las rutas en streaming (SSE) no se pueden usar en un batch")
+
+    response.body = b"".join(chunks)
+    return response
+
+
+def _error(response: SubResponse, chunks: List[bytes], status_code: int, detail: object) -> None:
+    response.status_code = status_code
+    response.headers = [(b"content-type", b"application/json")]
+    chunks[:] = [json.dumps({"detail": detail}).encode("utf-8")]
@@ -0,0 +1,143 @@
+"""
+Claves de idempotencia (header `Idempotency-Key`) para los endpoints que crean.
+
+Un cliente que reintenta un POST después de un timeout no sabe si el primero
+llegó al MS. Si ambos traen la misma Idempotency-Key:
+
+- mientras el primero está en curso, el duplicado espera su resultado;
+- cuando terminó, el duplicado recibe el mismo resultado sin llamar al MS
+  (con el header `Idempotent-Replayed: true`).
+
+La llamada al MS corre en una tarea propia: si el cliente se desconecta, la
+creación igual termina y queda guardada para su reintento. Se guardan los
+resultados exitosos y los rechazos 4xx (salvo 408 y 429); los errores 5xx y
+de red no, para que el reintento vuelva a intentarlo.
+
+Las claves son por ruta y por usuario (X-User-Id): dos usuarios pueden
+usar la misma clave sin verse. Reusar una clave con otro contenido (otro
+body u otro archivo) responde 422. Las claves viven IDEMPOTENCY_TTL segundos, como mucho
+IDEMPOTENCY_MAX_ENTRIES resultados, en memoria y por réplica.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# rechazos que dependen del momento y no del request: no se repiten
+_RETRYABLE_STATUS = frozenset({status.HTTP_408_REQUEST_TIMEOUT, status.HTTP_429_TOO_MANY_REQUESTS})
+
+
+@dataclass
+class _Outcome:
+    fingerprint: Hashable
+    value: Any = None
+    error: Optional[HTTPException] = None
+
+    def result(self) -> Any:
+        if self.error is not None:
+            # una instancia nueva por respuesta (la original acumula traceback)
+            raise HTTPException(self.error.status_code, self.error.detail, self.error.headers)
+        return self.value
+
+
+@dataclass
+class IdempotencyStats:
+    stored: int = 0         # resultados guardados
+    replayed: int = 0       # duplicados respondidos con un resultado guardado
+    waited: int = 0         # duplicados que esperaron al request en curso
+    conflicts: int = 0      # clave reusada con otro contenido
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: float, max_entries: int, max_key_length: int = 255) -> None:
+        self.max_key_length = max_key_length
+        self._done: TTLCache[_Outcome] = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._inflight: Dict[Tuple[str, str], Tuple[Hashable, asyncio.Task]] = {}
+        self.stats = IdempotencyStats()
+
+    def _check(self, fingerprint: Hashable, expected: Hashable) -> None:
+        if fingerprint != expected:
+            self.stats.conflicts += 1
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"La {IDEMPOTENCY_HEADER} ya se usó con un request distinto",
+            )
+
+    def _finish(self, key: Tuple[str, str], fingerprint: Hashable, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            outcome = _Outcome(fingerprint, value=task.result())
+        elif isinstance(error, HTTPException) and error.status_code < 500 and error.status_code not in _RETRYABLE_STATUS:
+            outcome = _Outcome(fingerprint, error=error)
+        else:
+            return
+        self._done.set(key, outcome)
+        self.stats.stored += 1
+
+    async def run(
+        self,
+        scope: str,
+        key: Optional[str],
+        fingerprint: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        response: Optional[Response] = None,
+    ) -> Any:
+        """
+        Ejecuta `call` una sola vez por (scope, key). `scope` separa las
+        claves por ruta (y usuario, si se conoce); `fingerprint` resume el
+        contenido del request. Sin `key` se llama directamente.
+        """
+        if key is None:
+            return await call()
+        if not key or len(key) > self.max_key_length:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{IDEMPOTENCY_HEADER} debe tener entre 1 y {self.max_key_length} caracteres",
+            )
+
+        entry_key = (scope, key)
+        outcome = self._done.get(entry_key)
+        if outcome is not None:
+            self._check(fingerprint, outcome.fingerprint)
+            self.stats.replayed += 1
+            if response is not None:
+                response.headers[REPLAYED_HEADER] = "true"
+            return outcome.result()
+
+        inflight = self._inflight.get(entry_key)
+        if inflight is not None:
+            expected, task = inflight
+            self._check(fingerprint, expected)
+            self.stats.waited += 1
+            if response is not None:
+                response.headers[REPLAYED_HEADER] = "true"
+        else:
+            task = asyncio.ensure_future(call())
+            self._inflight[entry_key] = (fingerprint, task)
+            task.add_done_callback(lambda t: self._finish(entry_key, fingerprint, t))
+        # shield: si este cliente se desconecta, la llamada sigue para los demás
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> dict:
+        return {
+            **vars(self.stats),
+            "entries": len(self._done),
+            "inflight": len(self._inflight),
+        }
+
+
+idempotency_store = IdempotencyStore(
+    ttl=settings.idempotency_ttl,
+    max_entries=settings.idempotency_max_entries,
+)
@@ -0,0 +1,77 @@
+"""
+Modo "pass-through" para rutas con upstreams de confianza.
+
+Normalmente el gateway parsea el JSON del MS a un modelo Pydantic y FastAPI
+lo vuelve a validar y serializar con `response_model`. Para las rutas listadas
+en PASSTHROUGH_ROUTES (ej: "mensajes.list_messages,busqueda.general_search")
+se reenvían los bytes del MS sin tocarlos, validando solo una muestra
+(PASSTHROUGH_SAMPLE_RATE) contra el schema para detectar cambios de contrato.
+"""
+import logging
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, Union
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_ENABLED_ROUTES = frozenset(
+    name.strip() for name in settings.passthrough_routes.split(",") if name.strip()
+)
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+@dataclass
+class PassthroughStats:
+    forwarded: int = 0
+    sampled: int = 0
+    mismatches: int = 0
+
+
+passthrough_stats: Dict[str, PassthroughStats] = {}
+
+
+def is_enabled(route_name: str) -> bool:
+    return route_name in _ENABLED_ROUTES
+
+
+def _adapter(model: Any) -> TypeAdapter:
+    adapter = _adapters.get(model)
+    if adapter is None:
+        adapter = _adapters[model] = TypeAdapter(model)
+    return adapter
+
+
+def respond(route_name: str, content: bytes, model: Any, status_code: int = 200) -> Union[Response, Any]:
+    """
+    Devuelve la respuesta para `content` (JSON crudo del MS):
+
+    - ruta en pass-through: un Response con los mismos bytes (FastAPI no
+      vuelve a validar ni serializar);
+    - si no: el modelo validado, como hasta ahora.
+    """
+    if route_name not in _ENABLED_ROUTES:
+        return _adapter(model).validate_json(content)
+
+    stats = passthrough_stats.get(route_name)
+    if stats is None:
+        stats = passthrough_stats[route_name] = PassthroughStats()
+    stats.forwarded += 1
+
+    if settings.passthrough_sample_rate > 0 and random.random() < settings.passthrough_sample_rate:
+        stats.sampled += 1
+        try:
+            _adapter(model).validate_json(content)
+        except ValidationError as e:
+            stats.mismatches += 1
+            logger.warning(
+                "Respuesta del MS no cumple el schema en %s: %s",
+                route_name,
+                e.errors(include_url=False)[:3],
+            )
+
+    return Response(content=content, status_code=status_code, media_type="application/json")
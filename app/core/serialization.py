@@ -0,0 +1,123 @@
+"""
+Serialización JSON rápida para las respuestas del gateway.
+
+El backend se elige con JSON_BACKEND:
+- "auto" (por defecto): orjson si está instalado, si no la librería estándar.
+- "orjson" / "stdlib": fuerza uno de los dos.
+
+Ambos backends entienden modelos Pydantic, UUID, datetime y Enum, por lo que
+un endpoint puede devolver `GatewayJSONResponse(modelo_o_dict)` directamente y
+evitar el paso por `jsonable_encoder` de FastAPI.
+"""
+import inspect
+import json
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Dict
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from app.core.config import settings
+
+try:  # dependencia opcional
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _use_orjson() -> bool:
+    if settings.json_backend == "stdlib":
+        return False
+    if settings.json_backend == "orjson" and orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson pero orjson no está instalado")
+    return orjson is not None
+
+
+def _orjson_default(obj: Any) -> Any:
+    # orjson ya maneja UUID, datetime, Enum y dataclasses de forma nativa
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(by_alias=True)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return jsonable_encoder(obj)
+
+
+def _stdlib_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json", by_alias=True)
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return jsonable_encoder(obj)
+
+
+if _use_orjson():
+    BACKEND = "orjson"
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(data: Any) -> Any:
+        return orjson.loads(data)
+
+else:
+    BACKEND = "stdlib"
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(
+            obj,
+            default=_stdlib_default,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    def loads(data: Any) -> Any:
+        return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    # Modelos (o listas de modelos) se serializan directo con el core de
+    # Pydantic, que es más rápido que pasar por model_dump + backend.
+    if isinstance(obj, BaseModel) or (
+        isinstance(obj, list) and obj and isinstance(obj[0], BaseModel)
+    ):
+        return to_json(obj, by_alias=True)
+    return _dumps(obj)
+
+
+class GatewayJSONResponse(JSONResponse):
+    """
+    JSONResponse que serializa con el backend rápido configurado.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Las versiones recientes de FastAPI serializan las rutas con response_model
+# directamente a bytes con Pydantic (dump_json), pero solo si la app no
+# declara default_response_class (ni siquiera JSONResponse: FastAPI lo
+# detecta porque el valor sigue siendo su DefaultPlaceholder). En ese caso
+# no hay que pasarla (ver benchmarks/json_serialization.py).
+FASTAPI_NATIVE_JSON = "dump_json" in inspect.signature(serialize_response).parameters
+
+
+def app_response_options() -> Dict[str, Any]:
+    """
+    Argumentos de FastAPI(...) para la respuesta por defecto: ninguno si
+    FastAPI tiene la serialización nativa con Pydantic, si no
+    GatewayJSONResponse.
+    """
+    if FASTAPI_NATIVE_JSON:
+        return {}
+    return {"default_response_class": GatewayJSONResponse}
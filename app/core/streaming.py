@@ -0,0 +1,26 @@
+"""
+Respuestas en streaming que leen el body del request mientras responden.
+"""
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse para endpoints que siguen leyendo el body del request
+    mientras transmiten la respuesta (ej: NDJSON de entrada y de salida).
+
+    StreamingResponse, con servidores ASGI < 2.4, escucha `receive()` en
+    paralelo para detectar la desconexión del cliente y se quedaría con los
+    trozos del body. Aquí la desconexión se detecta al leer el body
+    (ClientDisconnect) o al fallar el envío.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,410 @@
+"""
+Motor de proxy declarativo hacia los microservicios.
+
+Cada servicio puede describir sus rutas como una tabla de `UpstreamRoute`
+(ruta del gateway -> método, URL y modelo en el MS) y `build_router` la
+compila al arrancar en endpoints de FastAPI. Todas las rutas compiladas
+comparten un único camino de llamada con:
+
+- clientes httpx compartidos por servicio (pool de conexiones keep-alive),
+- reintentos de errores de red en métodos idempotentes,
+- caché opcional de respuestas GET (UPSTREAM_CACHE_TTL),
+- pass-through opcional (ver app.core.passthrough),
+- Idempotency-Key opcional en rutas que crean (ver app.core.idempotency),
+- métricas por ruta (ver `upstream_stats`).
+
+Agregar una ruta que solo reenvía al MS es agregar una entrada a la tabla.
+"""
+import asyncio
+import inspect
+import time
+import weakref
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from enum import Enum
+from string import Formatter
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+import httpx
+from fastapi import APIRouter, Body, Header, HTTPException, Path, Query, status
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+from app.core import passthrough
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER, idempotency_store
+
+
+# --- ERRORES ---
+
+def translate_httpx_error(e: httpx.HTTPError, default_message: str) -> HTTPException:
+    """
+    Traduce errores de httpx (del microservicio) a HTTPException para el cliente del gateway.
+    """
+    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
+        try:
+            body = e.response.json()
+            detail = (
+                body.get("message")
+                or body.get("detail")
+                or default_message
+            )
+        except (ValueError, AttributeError):
+            detail = default_message
+        return HTTPException(
+            status_code=e.response.status_code,
+            detail=detail,
+        )
+
+    # Errores de red, timeouts, etc.
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail=default_message,
+    )
+
+
+# --- CLIENTES COMPARTIDOS ---
+
+# Un conjunto de clientes por event loop (las conexiones no se pueden
+# compartir entre loops, ej: en tests que crean un loop por request).
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_client(pool: str) -> httpx.AsyncClient:
+    """
+    Devuelve el cliente httpx compartido para `pool` (normalmente la URL base
+    del servicio). Reutilizar el cliente evita abrir una conexión TCP/TLS
+    nueva en cada llamada.
+    """
+    loop = asyncio.get_running_loop()
+    clients = _clients.get(loop)
+    if clients is None:
+        clients = _clients[loop] = {}
+    client = clients.get(pool)
+    if client is None or client.is_closed:
+        client = clients[pool] = httpx.AsyncClient(
+            timeout=settings.upstream_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.upstream_max_connections,
+                max_keepalive_connections=settings.upstream_max_keepalive,
+            ),
+        )
+    return client
+
+
+async def close_clients() -> None:
+    """Cierra los clientes compartidos del event loop actual (shutdown)."""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+# --- TABLA DE RUTAS ---
+
+@dataclass(frozen=True)
+class Param:
+    """
+    Parámetro de una ruta del gateway y cómo se reenvía al MS.
+
+    source: "path", "query", "header" o "body".
+    alias:  nombre del header en el gateway (source="header").
+    upstream: nombre en el MS (query/header); por defecto el mismo.
+    """
+    name: str
+    annotation: Any = str
+    source: str = "query"
+    default: Any = ...
+    alias: Optional[str] = None
+    upstream: Optional[str] = None
+    description: Optional[str] = None
+    constraints: Mapping[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class UpstreamRoute:
+    name: str                       # ej: "canales.get_channel" (usado en métricas y PASSTHROUGH_ROUTES)
+    method: str
+    path: str                       # ruta en el gateway (relativa al router)
+    base_url: str                   # URL base del MS
+    upstream_path: str              # plantilla en el MS, ej: "/v1/channels/{channel_id}"
+    response_model: Any = None
+    status_code: int = status.HTTP_200_OK
+    params: Sequence[Param] = ()
+    error_message: str = "Error al comunicarse con el servicio"
+    description: str = ""
+    body_exclude_unset: bool = False
+    cacheable: bool = False         # GET cacheable por UPSTREAM_CACHE_TTL segundos
+    idempotent: bool = False        # acepta Idempotency-Key (ver app.core.idempotency)
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    total_ms: float = 0.0
+
+    def snapshot(self) -> dict:
+        upstream_calls = self.calls - self.cache_hits
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "avg_ms": round(self.total_ms / upstream_calls, 3) if upstream_calls else 0.0,
+        }
+
+
+upstream_stats: Dict[str, RouteStats] = {}
+
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_response_cache: TTLCache[bytes] = TTLCache(
+    max_entries=settings.upstream_cache_max_entries,
+    ttl=settings.upstream_cache_ttl,
+)
+
+
+def invalidate_service(base_url: str) -> None:
+    """
+    Descarta las respuestas GET cacheadas de un MS. Las rutas compiladas lo
+    hacen solas en cada escritura; los clientes escritos a mano que
+    escriben en un MS con rutas cacheables deben llamarlo.
+    """
+    if len(_response_cache):
+        pool = base_url.rstrip("/")
+        _response_cache.discard_where(lambda key: key[1].startswith(pool))
+
+
+def _to_upstream_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_to_upstream_value(v) for v in value]
+    return value
+
+
+class CompiledRoute:
+    """
+    Ruta lista para ejecutarse: la URL del MS y el reparto de parámetros se
+    calculan una sola vez al compilar, no en cada request.
+    """
+
+    __slots__ = (
+        "route", "name", "method", "pool", "url_template", "has_path_params",
+        "query", "headers", "body", "adapter", "retries", "cache_ttl", "stats",
+    )
+
+    def __init__(self, route: UpstreamRoute) -> None:
+        self.route = route
+        self.name = route.name
+        self.method = route.method.upper()
+        self.pool = route.base_url.rstrip("/")
+        self.url_template = self.pool + route.upstream_path
+        self.has_path_params = any(
+            field_name for _, field_name, _, _ in Formatter().parse(route.upstream_path)
+        )
+        self.query: Tuple[Tuple[str, str], ...] = tuple(
+            (p.name, p.upstream or p.name) for p in route.params if p.source == "query"
+        )
+        self.headers: Tuple[Tuple[str, str], ...] = tuple(
+            (p.name, p.upstream or p.alias or p.name) for p in route.params if p.source == "header"
+        )
+        bodies = [p.name for p in route.params if p.source == "body"]
+        self.body: Optional[str] = bodies[0] if bodies else None
+        self.adapter = TypeAdapter(route.response_model) if route.response_model is not None else None
+        self.retries = settings.upstream_retries if self.method in _IDEMPOTENT_METHODS else 0
+        self.cache_ttl = settings.upstream_cache_ttl if route.cacheable and self.method == "GET" else 0
+        self.stats = upstream_stats.setdefault(route.name, RouteStats())
+
+    async def fetch(self, values: Mapping[str, Any]) -> bytes:
+        """
+        Ejecuta la llamada al MS y devuelve el body crudo.
+        Lanza httpx.HTTPError igual que los clientes de servicios.
+        """
+        url = self.url_template.format_map(values) if self.has_path_params else self.url_template
+        params = {}
+        for name, upstream_name in self.query:
+            value = values.get(name)
+            if value is not None:
+                params[upstream_name] = _to_upstream_value(value)
+        headers = {}
+        for name, upstream_name in self.headers:
+            value = values.get(name)
+            if value is not None:
+                headers[upstream_name] = str(value)
+        json_body = None
+        if self.body is not None:
+            payload = values[self.body]
+            json_body = (
+                payload.model_dump(mode="json", exclude_unset=self.route.body_exclude_unset)
+                if isinstance(payload, BaseModel)
+                else payload
+            )
+
+        stats = self.stats
+        stats.calls += 1
+        cache_key = None
+        if self.cache_ttl:
+            # los headers reenviados (ej: X-User-Id) pueden cambiar la respuesta
+            cache_key = (self.name, url, repr(sorted(params.items())), repr(sorted(headers.items())))
+            cached = _response_cache.get(cache_key)
+            if cached is not None:
+                stats.cache_hits += 1
+                return cached
+
+        client = get_client(self.pool)
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    resp = await client.request(
+                        self.method,
+                        url,
+                        params=params or None,
+                        headers=headers or None,
+                        json=json_body,
+                    )
+                    break
+                except httpx.TransportError:
+                    if attempt >= self.retries:
+                        raise
+                    attempt += 1
+                    stats.retries += 1
+            resp.raise_for_status()
+        except httpx.HTTPError:
+            stats.errors += 1
+            raise
+        finally:
+            stats.total_ms += (time.perf_counter() - started) * 1000
+
+        content = resp.content
+        if cache_key is not None:
+            _response_cache.set(cache_key, content)
+        elif self.method not in _IDEMPOTENT_METHODS:
+            # una escritura en el MS invalida lo cacheado de ese servicio
+            invalidate_service(self.pool)
+        return content
+
+    async def call(self, **values: Any) -> Any:
+        """Llama al MS y devuelve la respuesta validada con el response_model."""
+        content = await self.fetch(values)
+        if self.adapter is None:
+            return None
+        return self.adapter.validate_json(content)
+
+
+def _endpoint_parameter(param: Param) -> inspect.Parameter:
+    if param.source == "path":
+        default = Path(..., description=param.description)
+    elif param.source == "query":
+        default = Query(param.default, description=param.description, **param.constraints)
+    elif param.source == "header":
+        default = Header(param.default, alias=param.alias, description=param.description)
+    elif param.source == "body":
+        default = Body(...)
+    else:
+        raise ValueError(f"Origen de parámetro desconocido: {param.source}")
+    return inspect.Parameter(
+        param.name,
+        inspect.Parameter.KEYWORD_ONLY,
+        default=default,
+        annotation=param.annotation,
+    )
+
+
+_IDEMPOTENCY_PARAM = "idempotency_key"
+_IDEMPOTENCY_USER_PARAM = "idempotency_user"
+_RESPONSE_PARAM = "response"
+
+
+def _make_endpoint(compiled: CompiledRoute) -> Callable[..., Any]:
+    route = compiled.route
+
+    async def fetch(values: Mapping[str, Any]) -> bytes:
+        try:
+            return await compiled.fetch(values)
+        except httpx.HTTPError as e:
+            raise translate_httpx_error(e, route.error_message)
+
+    async def endpoint(**values: Any) -> Any:
+        if not route.idempotent:
+            content = await fetch(values)
+        else:
+            # lo que guarda el store son los bytes del MS; la respuesta se
+            # arma de nuevo en cada replay
+            key = values.pop(_IDEMPOTENCY_PARAM)
+            user = values.pop(_IDEMPOTENCY_USER_PARAM)
+            response = values.pop(_RESPONSE_PARAM)
+            fingerprint = repr(sorted(
+                (name, value.model_dump_json() if isinstance(value, BaseModel) else repr(value))
+                for name, value in values.items()
+            ))
+            content = await idempotency_store.run(
+                f"{route.name}:{user or ''}", key, fingerprint, lambda: fetch(values), response,
+            )
+        if compiled.adapter is None:
+            result = Response(status_code=route.status_code)
+        else:
+            result = passthrough.respond(route.name, content, route.response_model, route.status_code)
+        # un modelo sale con los headers de `response`; un Response propio no
+        if route.idempotent and isinstance(result, Response) and REPLAYED_HEADER in response.headers:
+            result.headers[REPLAYED_HEADER] = "true"
+        return result
+
+    parameters = [_endpoint_parameter(p) for p in route.params]
+    if route.idempotent:
+        parameters += [
+            inspect.Parameter(
+                _IDEMPOTENCY_PARAM,
+                inspect.Parameter.KEYWORD_ONLY,
+                default=Header(None, alias=IDEMPOTENCY_HEADER),
+                annotation=Optional[str],
+            ),
+            # las claves son por usuario (no se reenvía al MS)
+            inspect.Parameter(
+                _IDEMPOTENCY_USER_PARAM,
+                inspect.Parameter.KEYWORD_ONLY,
+                default=Header(None, alias="X-User-Id"),
+                annotation=Optional[str],
+            ),
+            inspect.Parameter(_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        ]
+    endpoint.__name__ = route.name.rsplit(".", 1)[-1]
+    endpoint.__doc__ = route.description
+    endpoint.__signature__ = inspect.Signature(parameters)
+    return endpoint
+
+
+def build_router(routes: Sequence[UpstreamRoute], **router_kwargs: Any) -> APIRouter:
+    """
+    Compila una tabla de rutas a un APIRouter. Las rutas compiladas quedan
+    disponibles en `router.upstream_routes` por nombre para llamarlas desde
+    código (ej: vistas compuestas) con el mismo camino optimizado.
+    """
+    router = APIRouter(**router_kwargs)
+    compiled_routes: Dict[str, CompiledRoute] = {}
+    for route in routes:
+        compiled = CompiledRoute(route)
+        compiled_routes[route.name] = compiled
+        router.add_api_route(
+            route.path,
+            _make_endpoint(compiled),
+            methods=[compiled.method],
+            response_model=route.response_model,
+            status_code=route.status_code,
+            name=route.name,
+        )
+    router.upstream_routes = compiled_routes
+    return router
+
+
+def stats_snapshot() -> Dict[str, dict]:
+    return {name: stats.snapshot() for name, stats in sorted(upstream_stats.items())}
@@ -1,7 +1,23 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.compression import CompressionMiddleware, compression_stats
 from app.core.config import settings
+from app.core.idempotency import idempotency_store
+from app.core.passthrough import passthrough_stats
+from app.core.serialization import app_response_options
+from app.core import upstream
+from app.services.mensajes.journal import journal as message_journal
+from app.services.mensajes.moderated import moderated_poster
+from app.services.mensajes.page_cache import page_cache
+from app.services.mensajes.prefetch import prefetcher
+from app.services.mensajes.stream import message_stream
+from app.services.moderacion.blacklist import blacklist_mirror
+from app.services.presencia.heartbeats import heartbeat_aggregator
+from app.services.presencia.hub import presence_hub
+from app.services.presencia.index import presence_index
 from app.api.canales.v1 import routes as canales_v1
 from app.api.usuarios.v1 import routes as usuarios_v1
 from app.api.mensajes.v1 import routes as mensajes_v1
@@ -12,9 +28,37 @@ from app.api.archivos.v1 import routes as archivos_v1
 from app.api.chatbot_programacion.v1 import routes as chatbot_v1
 from app.api.busqueda.v1 import routes as busqueda_v1
 from app.api.hilos.v1 import routes as hilos_v1
+from app.api.batch.v1 import routes as batch_v1
+from app.api.views.v1 import routes as views_v1
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.presence_heartbeat_write_behind:
+        heartbeat_aggregator.start()
+    if settings.presence_index_enabled:
+        # expiraciones y correcciones del resync también llegan a los sockets
+        presence_index.on_change = presence_hub.notify
+        presence_index.start()
+    if settings.moderation_prefilter_enabled:
+        blacklist_mirror.start()
+    yield
+    await blacklist_mirror.stop()
+    await presence_index.stop()
+    await message_stream.close()
+    # eliminar los mensajes no aprobados antes de cerrar las conexiones
+    await moderated_poster.drain(timeout=settings.upstream_timeout)
+    # enviar los heartbeats pendientes antes de cerrar las conexiones
+    await heartbeat_aggregator.stop()
+    # cerrar las conexiones keep-alive hacia los MS
+    await upstream.close_clients()
 
-app = FastAPI(title=settings.app_name)
+
+app = FastAPI(
+    title=settings.app_name,
+    lifespan=lifespan,
+    **app_response_options(),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +68,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        threadpool_min_size=settings.compression_threadpool_min_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        zstd_level=settings.compression_zstd_level,
+    )
+
 @app.get("/")
 def read_root():
     return {
@@ -35,6 +89,97 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/stats/compression")
+def get_compression_stats():
+    """
+    Ratio de compresión (bytes_out / bytes_in) y tiempo de CPU por ruta.
+    """
+    return compression_stats.snapshot()
+
+@app.get("/stats/passthrough")
+def get_passthrough_stats():
+    """
+    Respuestas reenviadas sin re-validar y resultado del muestreo de schema por ruta.
+    """
+    return {route: vars(stats) for route, stats in passthrough_stats.items()}
+
+@app.get("/stats/upstream")
+def get_upstream_stats():
+    """
+    Llamadas, errores, reintentos, aciertos de caché y latencia media por ruta declarativa.
+    """
+    return upstream.stats_snapshot()
+
+@app.get("/stats/heartbeats")
+def get_heartbeat_stats():
+    """
+    Heartbeats de presencia recibidos vs. enviados al MS (write-behind).
+    """
+    return heartbeat_aggregator.snapshot()
+
+@app.get("/stats/presence-ws")
+def get_presence_ws_stats():
+    """
+    Usuarios y sockets de presencia conectados a este pod, y usuarios observados.
+    """
+    return presence_hub.snapshot()
+
+@app.get("/stats/presence-index")
+def get_presence_index_stats():
+    """
+    Estado del índice local de presencia y drift respecto del MS en los resyncs.
+    """
+    return presence_index.snapshot()
+
+@app.get("/stats/message-streams")
+def get_message_stream_stats():
+    """
+    Hilos con stream abierto, suscriptores y eventos por poller vs. escrituras del gateway.
+    """
+    return message_stream.snapshot()
+
+@app.get("/stats/message-pages")
+def get_message_page_stats():
+    """
+    Páginas de mensajes en caché, aciertos e invalidaciones por escrituras.
+    """
+    return page_cache.snapshot()
+
+@app.get("/stats/message-journal")
+def get_message_journal_stats():
+    """
+    Escrituras de mensajes registradas por esta réplica para los deltas.
+    """
+    return message_journal.snapshot()
+
+@app.get("/stats/message-prefetch")
+def get_message_prefetch_stats():
+    """
+    Páginas prefetcheadas, cuántas se usaron y su peso sobre el tráfico hacia el MS.
+    """
+    return prefetcher.snapshot()
+
+@app.get("/stats/idempotency")
+def get_idempotency_stats():
+    """
+    Resultados guardados por Idempotency-Key y duplicados respondidos sin llamar al MS.
+    """
+    return idempotency_store.snapshot()
+
+@app.get("/stats/moderated-posts")
+def get_moderated_post_stats():
+    """
+    Publicaciones moderadas: aprobadas, rechazadas y mensajes especulativos eliminados.
+    """
+    return moderated_poster.snapshot()
+
+@app.get("/stats/moderation-prefilter")
+def get_moderation_prefilter_stats():
+    """
+    Copia local de la lista negra y cuántos textos se respondieron sin llamar al MS.
+    """
+    return blacklist_mirror.snapshot()
+
 # Versión 1 de la API: montamos servicios
 app.include_router(canales_v1.router, prefix="/api/v1/canales")
 app.include_router(usuarios_v1.router, prefix="/api/v1/usuarios")
@@ -46,3 +191,5 @@ app.include_router(archivos_v1.router, prefix="/api/v1/archivos")
 app.include_router(chatbot_v1.router, prefix="/api/v1/chatbot")
 app.include_router(busqueda_v1.router, prefix="/api/v1/busqueda")
 app.include_router(hilos_v1.router, prefix="/api/v1/hilos")
+app.include_router(batch_v1.router, prefix="/api/v1/batch")
+app.include_router(views_v1.router, prefix="/api/v1/views")
@@ -1,26 +1,34 @@
 # app/services/archivos/client.py
-from typing import List, Optional
+from typing import AsyncIterator, BinaryIO, List, Optional, Union
 from uuid import UUID
 
-import httpx
+from pydantic import TypeAdapter
 
 from app.core.config import settings
+from app.core.upstream import get_client
 from app.services.archivos.schemas import FileOut, PresignDownloadResponse
 
 BASE_URL = settings.files_service_base_url.rstrip("/")
 FILES_BASE = f"{BASE_URL}/v1/files"
+# Las descargas van a URLs firmadas del storage, no al MS
+DOWNLOADS_POOL = "archivos.downloads"
+
+_FILE_OUT_LIST = TypeAdapter(List[FileOut])
 
 
 async def upload_file(
     *,
     message_id: Optional[str],
     thread_id: Optional[str],
-    file_bytes: bytes,
+    file_content: Union[bytes, BinaryIO],
     filename: str,
     mime_type: str,
 ) -> FileOut:
     """
     Llama a POST /v1/files con multipart/form-data (campo 'upload').
+
+    file_content puede ser bytes o un archivo abierto; en ese caso httpx lo
+    envía por trozos sin cargarlo completo en memoria.
     """
     params = {}
     if message_id is not None:
@@ -29,21 +37,21 @@ async def upload_file(
         params["thread_id"] = thread_id
 
     files = {
-        "upload": (filename, file_bytes, mime_type),
+        "upload": (filename, file_content, mime_type),
     }
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(FILES_BASE, params=params, files=files)
-        resp.raise_for_status()
-        return FileOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(FILES_BASE, params=params, files=files)
+    resp.raise_for_status()
+    return FileOut.model_validate_json(resp.content)
 
 
 async def get_file(file_id: UUID) -> FileOut:
     url = f"{FILES_BASE}/{file_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return FileOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return FileOut.model_validate_json(resp.content)
 
 
 async def list_files(
@@ -56,31 +64,42 @@ async def list_files(
     if thread_id is not None:
         params["thread_id"] = thread_id
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(FILES_BASE, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        return [FileOut(**item) for item in data]
+    client = get_client(BASE_URL)
+    resp = await client.get(FILES_BASE, params=params)
+    resp.raise_for_status()
+    return _FILE_OUT_LIST.validate_json(resp.content)
 
 
 async def delete_file(file_id: UUID) -> None:
     url = f"{FILES_BASE}/{file_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.delete(url)
-        resp.raise_for_status()
-        return None  # 204 No Content
+    client = get_client(BASE_URL)
+    resp = await client.delete(url)
+    resp.raise_for_status()
+    return None  # 204 No Content
 
 
 async def presign_download(file_id: UUID) -> PresignDownloadResponse:
     url = f"{FILES_BASE}/{file_id}/presign-download"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url)
-        resp.raise_for_status()
-        return PresignDownloadResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url)
+    resp.raise_for_status()
+    return PresignDownloadResponse.model_validate_json(resp.content)
 
 
 async def download_file_url(url: str) -> bytes:
-    async with httpx.AsyncClient() as client:
-        download_resp = await client.get(url)
+    client = get_client(DOWNLOADS_POOL)
+    download_resp = await client.get(url)
+    download_resp.raise_for_status()
+    return download_resp.content
+
+
+async def stream_file_url(url: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """
+    Descarga un archivo desde una URL firmada entregando el contenido por trozos,
+    sin cargarlo completo en memoria.
+    """
+    client = get_client(DOWNLOADS_POOL)
+    async with client.stream("GET", url) as download_resp:
         download_resp.raise_for_status()
-        return download_resp.content
+        async for chunk in download_resp.aiter_bytes(chunk_size):
+            yield chunk
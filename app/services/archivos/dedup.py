@@ -0,0 +1,152 @@
+# app/services/archivos/dedup.py
+"""
+Índice en memoria de archivos por hash de contenido (SHA-256).
+
+El gateway calcula el hash de cada subida y consulta este índice para
+detectar archivos repetidos. Según FILES_DEDUP_MODE:
+
+- "off":    no se calcula ni registra nada.
+- "report": se sube igual, pero se contabiliza el duplicado. El hash se
+            calcula mientras los bytes se reenvían al MS (`HashingReader`),
+            sin una pasada extra por el archivo.
+- "reuse":  si el mismo contenido ya existe con el mismo nombre para el
+            mismo mensaje/hilo se devuelve el archivo existente sin volver a
+            transferir los bytes (hay que hashear antes de subir). El MS de
+            archivos no permite asociar un objeto existente a otro hilo ni
+            renombrarlo, así que en los demás casos solo se reporta.
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.services.archivos.schemas import FileOut
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# copias temporales de subidas: en memoria hasta este tamaño, luego a disco
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# (message_id, thread_id, filename) con que quedó guardado un archivo
+Scope = Tuple[Optional[str], Optional[str], str]
+
+
+def new_hasher():
+    return hashlib.sha256()
+
+
+class HashingReader:
+    """
+    Envuelve un archivo abierto y calcula el SHA-256 y el tamaño de lo que
+    se lee de él (httpx lo lee por trozos al enviarlo). Volver al inicio
+    con seek(0) reinicia el cálculo, como hace httpx antes de enviar.
+    """
+
+    def __init__(self, file: BinaryIO) -> None:
+        self._file = file
+        self._reset()
+
+    def _reset(self) -> None:
+        self._hasher = new_hasher()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file.read(size)
+        self._hasher.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        position = self._file.seek(offset, whence)
+        if position == 0:
+            self._reset()
+        return position
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+
+@dataclass
+class DedupStats:
+    uploads: int = 0
+    duplicates: int = 0
+    short_circuited: int = 0
+    bytes_received: int = 0
+    bytes_duplicated: int = 0
+    bytes_avoided: int = 0
+
+    @property
+    def dedup_ratio(self) -> float:
+        return self.duplicates / self.uploads if self.uploads else 0.0
+
+
+class DedupIndex:
+    """
+    Mapa hash -> archivos conocidos con ese contenido, acotado en tamaño (LRU).
+    """
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self._by_hash: "OrderedDict[str, Dict[Scope, FileOut]]" = OrderedDict()
+        self._hash_by_id: Dict[UUID, str] = {}
+        self.stats = DedupStats()
+
+    def __len__(self) -> int:
+        return len(self._by_hash)
+
+    def remember(self, file: FileOut) -> None:
+        if file.deleted_at is not None or not file.checksum_sha256:
+            self.forget(file.id)
+            return
+        digest = file.checksum_sha256.lower()
+        scopes = self._by_hash.setdefault(digest, {})
+        scopes[(file.message_id, file.thread_id, file.filename)] = file
+        self._by_hash.move_to_end(digest)
+        self._hash_by_id[file.id] = digest
+        while len(self._by_hash) > self.max_entries:
+            _, evicted = self._by_hash.popitem(last=False)
+            for old in evicted.values():
+                self._hash_by_id.pop(old.id, None)
+
+    def remember_all(self, files: Iterable[FileOut]) -> None:
+        for file in files:
+            self.remember(file)
+
+    def forget(self, file_id: UUID) -> None:
+        digest = self._hash_by_id.pop(file_id, None)
+        if digest is None:
+            return
+        scopes = self._by_hash.get(digest, {})
+        for scope, file in list(scopes.items()):
+            if file.id == file_id:
+                del scopes[scope]
+        if not scopes:
+            self._by_hash.pop(digest, None)
+
+    def lookup(self, digest: str, scope: Scope) -> Tuple[bool, Optional[FileOut]]:
+        """
+        Devuelve (contenido_conocido, archivo_reutilizable_en_este_scope).
+        """
+        scopes = self._by_hash.get(digest)
+        if not scopes:
+            return False, None
+        self._by_hash.move_to_end(digest)
+        return True, scopes.get(scope)
+
+    def record_upload(self, size: int, duplicate: bool, short_circuited: bool) -> None:
+        stats = self.stats
+        stats.uploads += 1
+        stats.bytes_received += size
+        if duplicate:
+            stats.duplicates += 1
+            stats.bytes_duplicated += size
+        if short_circuited:
+            stats.short_circuited += 1
+            stats.bytes_avoided += size
+
+
+dedup_index = DedupIndex(max_entries=settings.files_dedup_max_entries)
@@ -0,0 +1,173 @@
+# app/services/archivos/zip_stream.py
+"""
+Construcción de archivos ZIP "al vuelo" a partir de streams de archivos.
+
+El ZIP se escribe sobre un sumidero no posicionable (sin seek), por lo que
+zipfile usa descriptores de datos y cada trozo puede enviarse al cliente
+apenas se genera. Las descargas de los archivos se adelantan en paralelo
+(hasta `concurrency` a la vez) usando colas acotadas, de modo que la memoria
+usada queda limitada a concurrency * queue_size trozos.
+"""
+import asyncio
+import io
+import zipfile
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Callable, Deque, Iterable, List, Optional, Tuple
+
+from app.services.archivos.schemas import FileOut
+
+# Función que, dado un archivo, entrega su contenido por trozos
+FileFetcher = Callable[[FileOut], AsyncIterator[bytes]]
+
+_END = object()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Destino de escritura para zipfile que solo acumula lo escrito hasta que
+    se drena. No implementa seek, así zipfile genera un ZIP apto para streaming.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _entry_name(file: FileOut) -> str:
+    """
+    Nombre seguro para la entrada: sin unidad (C:), sin raíz y sin
+    segmentos "." ni ".." (evita zip slip al descomprimir).
+    """
+    name = (file.filename or "").replace("\\", "/")
+    if len(name) >= 2 and name[1] == ":" and name[0].isalpha():
+        name = name[2:]
+    parts = [part for part in name.split("/") if part not in ("", ".", "..")]
+    return "/".join(parts) or str(file.id)
+
+
+def unique_entry_names(files: Iterable[FileOut]) -> List[Tuple[str, FileOut]]:
+    """
+    Asigna a cada archivo un nombre único dentro del ZIP
+    (ej: informe.pdf, informe (1).pdf, ...).
+    """
+    used = set()
+    entries = []
+    for file in files:
+        name = _entry_name(file)
+        candidate = name
+        counter = 1
+        while candidate in used:
+            stem, dot, ext = name.rpartition(".")
+            if dot and stem:
+                candidate = f"{stem} ({counter}).{ext}"
+            else:
+                candidate = f"{name} ({counter})"
+            counter += 1
+        used.add(candidate)
+        entries.append((candidate, file))
+    return entries
+
+
+def _zip_info(name: str, file: FileOut) -> zipfile.ZipInfo:
+    created = file.created_at or datetime.now()
+    date_time = (max(created.year, 1980), created.month, created.day,
+                 created.hour, created.minute, created.second)
+    info = zipfile.ZipInfo(name, date_time=date_time)
+    # Los adjuntos típicos (pdf, imágenes, office) ya vienen comprimidos:
+    # se guardan tal cual para no gastar CPU del gateway.
+    info.compress_type = zipfile.ZIP_STORED
+    info.file_size = file.size
+    return info
+
+
+async def _pump(file: FileOut, fetch: FileFetcher, queue: asyncio.Queue) -> None:
+    try:
+        async for chunk in fetch(file):
+            await queue.put(chunk)
+        await queue.put(_END)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:  # se reporta al consumidor en orden
+        await queue.put(e)
+
+
+async def stream_zip(
+    entries: List[Tuple[str, FileOut]],
+    fetch: FileFetcher,
+    concurrency: int = 4,
+    queue_size: int = 8,
+) -> AsyncIterator[bytes]:
+    """
+    Genera el ZIP trozo a trozo. Los archivos se escriben en el orden de
+    `entries` mientras hasta `concurrency` descargas avanzan en paralelo.
+
+    Si un archivo falla antes de entregar datos se omite y se lista en
+    ERRORES.txt al final del ZIP; si falla a mitad de camino el stream se
+    corta (no hay forma de "deshacer" bytes ya enviados).
+    """
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w", allowZip64=True)
+    window: Deque[Tuple[str, FileOut, asyncio.Queue, asyncio.Task]] = deque()
+    pending = iter(entries)
+    failed: List[str] = []
+
+    def fill_window() -> None:
+        while len(window) < max(concurrency, 1):
+            nxt: Optional[Tuple[str, FileOut]] = next(pending, None)
+            if nxt is None:
+                return
+            name, file = nxt
+            queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+            task = asyncio.create_task(_pump(file, fetch, queue))
+            window.append((name, file, queue, task))
+
+    try:
+        fill_window()
+        while window:
+            name, file, queue, _ = window[0]
+            first = await queue.get()
+            if isinstance(first, Exception):
+                failed.append(f"{name}: {first}")
+            else:
+                with archive.open(_zip_info(name, file), mode="w") as entry:
+                    item = first
+                    while item is not _END:
+                        if isinstance(item, Exception):
+                            raise item
+                        entry.write(item)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                        item = await queue.get()
+                data = sink.drain()
+                if data:
+                    yield data
+            window.popleft()
+            fill_window()
+
+        if failed:
+            archive.writestr("ERRORES.txt", "\n".join(failed) + "\n")
+        archive.close()
+        yield sink.drain()
+    finally:
+        for _, _, _, task in window:
+            task.cancel()
@@ -1,8 +1,16 @@
+"""
+Cliente del MS de canales para código del gateway.
+
+Las rutas /canales y las vistas usan las rutas compiladas de
+app.api.canales.v1.routes (caché de GET incluida). Las escrituras de este
+cliente invalidan esa caché, para que no sirva datos viejos.
+"""
 from typing import List
 
-import httpx
+from pydantic import TypeAdapter
 
 from app.core.config import settings
+from app.core.upstream import get_client, invalidate_service
 from app.services.canales.schemas import (
     Channel,
     ChannelBasicInfoResponse,
@@ -17,93 +25,99 @@ BASE_URL = settings.channels_service_base_url.rstrip("/")
 CHANNELS_BASE = f"{BASE_URL}/v1/channels"
 MEMBERS_BASE = f"{BASE_URL}/v1/members"
 
+_CHANNEL_BASIC_INFO_RESPONSE_LIST = TypeAdapter(List[ChannelBasicInfoResponse])
+_CHANNEL_MEMBER_LIST = TypeAdapter(List[ChannelMember])
+
 
 async def create_channel(payload: ChannelCreatePayload) -> Channel:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{CHANNELS_BASE}/", json=payload.dict())
-        resp.raise_for_status()
-        return Channel(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(f"{CHANNELS_BASE}/", json=payload.dict())
+    resp.raise_for_status()
+    invalidate_service(BASE_URL)
+    return Channel.model_validate_json(resp.content)
 
 
 async def list_channels(page: int = 1, page_size: int = 10) -> List[ChannelBasicInfoResponse]:
     params = {"page": page, "page_size": page_size}
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{CHANNELS_BASE}/", params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        return [ChannelBasicInfoResponse(**item) for item in data]
+    client = get_client(BASE_URL)
+    resp = await client.get(f"{CHANNELS_BASE}/", params=params)
+    resp.raise_for_status()
+    return _CHANNEL_BASIC_INFO_RESPONSE_LIST.validate_json(resp.content)
 
 
 async def get_channel(channel_id: str) -> Channel:
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{CHANNELS_BASE}/{channel_id}")
-        resp.raise_for_status()
-        return Channel(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(f"{CHANNELS_BASE}/{channel_id}")
+    resp.raise_for_status()
+    return Channel.model_validate_json(resp.content)
 
 
 async def update_channel(channel_id: str, payload: ChannelUpdatePayload) -> Channel:
-    async with httpx.AsyncClient() as client:
-        resp = await client.put(
-            f"{CHANNELS_BASE}/{channel_id}",
-            json=payload.dict(exclude_unset=True),
-        )
-        resp.raise_for_status()
-        return Channel(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.put(
+        f"{CHANNELS_BASE}/{channel_id}",
+        json=payload.dict(exclude_unset=True),
+    )
+    resp.raise_for_status()
+    invalidate_service(BASE_URL)
+    return Channel.model_validate_json(resp.content)
 
 
 async def deactivate_channel(channel_id: str) -> ChannelIDResponse:
-    async with httpx.AsyncClient() as client:
-        resp = await client.delete(f"{CHANNELS_BASE}/{channel_id}")
-        resp.raise_for_status()
-        return ChannelIDResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.delete(f"{CHANNELS_BASE}/{channel_id}")
+    resp.raise_for_status()
+    invalidate_service(BASE_URL)
+    return ChannelIDResponse.model_validate_json(resp.content)
 
 
 async def reactivate_channel(channel_id: str) -> ChannelIDResponse:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{CHANNELS_BASE}/{channel_id}/reactivate")
-        resp.raise_for_status()
-        return ChannelIDResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(f"{CHANNELS_BASE}/{channel_id}/reactivate")
+    resp.raise_for_status()
+    invalidate_service(BASE_URL)
+    return ChannelIDResponse.model_validate_json(resp.content)
 
 
 async def get_channel_basic_info(channel_id: str) -> ChannelBasicInfoResponse:
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{CHANNELS_BASE}/{channel_id}/basic")
-        resp.raise_for_status()
-        return ChannelBasicInfoResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(f"{CHANNELS_BASE}/{channel_id}/basic")
+    resp.raise_for_status()
+    return ChannelBasicInfoResponse.model_validate_json(resp.content)
 
 
 async def add_member(payload: ChannelUserPayload) -> Channel:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{MEMBERS_BASE}/", json=payload.dict())
-        resp.raise_for_status()
-        return Channel(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(f"{MEMBERS_BASE}/", json=payload.dict())
+    resp.raise_for_status()
+    invalidate_service(BASE_URL)
+    return Channel.model_validate_json(resp.content)
 
 
 async def remove_member(payload: ChannelUserPayload) -> Channel:
-    async with httpx.AsyncClient() as client:
-        resp = await client.request(
-            method="DELETE",
-            url=f"{MEMBERS_BASE}/",
-            json=payload.dict()
-        )
-        resp.raise_for_status()
-        return Channel(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.request(
+        method="DELETE",
+        url=f"{MEMBERS_BASE}/",
+        json=payload.dict()
+    )
+    resp.raise_for_status()
+    invalidate_service(BASE_URL)
+    return Channel.model_validate_json(resp.content)
 
 
 async def get_channels_for_user(user_id: str) -> List[ChannelBasicInfoResponse]:
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{MEMBERS_BASE}/{user_id}")
-        resp.raise_for_status()
-        data = resp.json()
-        return [ChannelBasicInfoResponse(**item) for item in data]
+    client = get_client(BASE_URL)
+    resp = await client.get(f"{MEMBERS_BASE}/{user_id}")
+    resp.raise_for_status()
+    return _CHANNEL_BASIC_INFO_RESPONSE_LIST.validate_json(resp.content)
 
 
 async def get_channels_for_owner(owner_id: str) -> List[ChannelBasicInfoResponse]:
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{MEMBERS_BASE}/owner/{owner_id}")
-        resp.raise_for_status()
-        data = resp.json()
-        return [ChannelBasicInfoResponse(**item) for item in data]
+    client = get_client(BASE_URL)
+    resp = await client.get(f"{MEMBERS_BASE}/owner/{owner_id}")
+    resp.raise_for_status()
+    return _CHANNEL_BASIC_INFO_RESPONSE_LIST.validate_json(resp.content)
 
 
 async def get_members_for_channel(
@@ -112,8 +126,7 @@ async def get_members_for_channel(
     page_size: int = 100,
 ) -> List[ChannelMember]:
     params = {"page": page, "page_size": page_size}
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{MEMBERS_BASE}/channel/{channel_id}", params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        return [ChannelMember(**item) for item in data]
+    client = get_client(BASE_URL)
+    resp = await client.get(f"{MEMBERS_BASE}/channel/{channel_id}", params=params)
+    resp.raise_for_status()
+    return _CHANNEL_MEMBER_LIST.validate_json(resp.content)
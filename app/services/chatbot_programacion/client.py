@@ -1,6 +1,7 @@
 import httpx
 
 from app.core.config import settings
+from app.core.upstream import get_client
 from app.services.chatbot_programacion.schemas import (
     HealthResponse,
     QuestionResponse,
@@ -16,10 +17,10 @@ async def health() -> HealthResponse:
     Llama a GET /health del servicio de chatbot (quiz / wrapper).
     """
     url = f"{BASE_URL}/health"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return HealthResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return HealthResponse.model_validate_json(resp.content)
 
 
 async def get_question() -> QuestionResponse:
@@ -27,10 +28,10 @@ async def get_question() -> QuestionResponse:
     Llama a GET /questions.
     """
     url = f"{BASE_URL}/questions"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return QuestionResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return QuestionResponse.model_validate_json(resp.content)
 
 
 async def publish_question() -> QuestionResponse:
@@ -41,10 +42,10 @@ async def publish_question() -> QuestionResponse:
 
     timeout = httpx.Timeout(60.0)
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        resp = await client.post(url)
-        resp.raise_for_status()
-        return QuestionResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, timeout=timeout)
+    resp.raise_for_status()
+    return QuestionResponse.model_validate_json(resp.content)
 
 
 async def chat(payload: ChatRequest) -> ChatResponse:
@@ -55,7 +56,7 @@ async def chat(payload: ChatRequest) -> ChatResponse:
 
     timeout = httpx.Timeout(60.0)
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        resp = await client.post(url, json=payload.model_dump())
-        resp.raise_for_status()
-        return ChatResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, json=payload.model_dump(), timeout=timeout)
+    resp.raise_for_status()
+    return ChatResponse.model_validate_json(resp.content)
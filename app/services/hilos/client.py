@@ -1,9 +1,10 @@
 # app/services/hilos/client.py
 from typing import List, Optional
 
-import httpx
+from pydantic import TypeAdapter
 
 from app.core.config import settings
+from app.core.upstream import get_client
 from app.services.hilos.schemas import ThreadCreate, ThreadOut, ThreadUpdate, ThreadBasicInfo
 
 BASE_URL = settings.threads_service_base_url.rstrip("/")
@@ -11,16 +12,19 @@ BASE_URL = f"{BASE_URL}/threads"
 THREADS_BASE = f"{BASE_URL}/threads"
 CHANNELS_BASE = f"{BASE_URL}/channel"
 
+_THREAD_BASIC_INFO_LIST = TypeAdapter(List[ThreadBasicInfo])
+_THREAD_OUT_LIST = TypeAdapter(List[ThreadOut])
+
 
 async def create_thread(payload: ThreadCreate) -> ThreadOut:
     """
     POST /v1/  -> crea un nuevo hilo y devuelve ThreadOut.
     """
     url = f"{THREADS_BASE}/?channel_id={payload.channel_id}&thread_name={payload.title}&user_id={payload.created_by}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=payload.dict())
-        resp.raise_for_status()
-        return ThreadOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, json=payload.dict())
+    resp.raise_for_status()
+    return ThreadOut.model_validate_json(resp.content)
 
 
 async def list_threads(channel_id: Optional[str] = None) -> List[ThreadOut]:
@@ -32,11 +36,10 @@ async def list_threads(channel_id: Optional[str] = None) -> List[ThreadOut]:
     if channel_id is not None:
         params["channel_id"] = channel_id
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        return [ThreadOut(**item) for item in data]
+    client = get_client(BASE_URL)
+    resp = await client.get(url, params=params)
+    resp.raise_for_status()
+    return _THREAD_OUT_LIST.validate_json(resp.content)
 
 
 async def get_thread(thread_id: str) -> ThreadOut:
@@ -44,10 +47,10 @@ async def get_thread(thread_id: str) -> ThreadOut:
     GET /v1/{thread_id}
     """
     url = f"{THREADS_BASE}/{thread_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return ThreadOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return ThreadOut.model_validate_json(resp.content)
 
 
 async def update_thread(thread_id: str, payload: ThreadUpdate) -> ThreadOut:
@@ -55,13 +58,13 @@ async def update_thread(thread_id: str, payload: ThreadUpdate) -> ThreadOut:
     PATCH /v1/{thread_id}
     """
     url = f"{THREADS_BASE}/{thread_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.patch(
-            url,
-            json=payload.dict(exclude_unset=True),
-        )
-        resp.raise_for_status()
-        return ThreadOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.patch(
+        url,
+        json=payload.dict(exclude_unset=True),
+    )
+    resp.raise_for_status()
+    return ThreadOut.model_validate_json(resp.content)
 
 
 async def archive_thread(thread_id: str) -> ThreadOut:
@@ -69,10 +72,10 @@ async def archive_thread(thread_id: str) -> ThreadOut:
     POST /v1/{thread_id}:archive
     """
     url = f"{THREADS_BASE}/{thread_id}:archive"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url)
-        resp.raise_for_status()
-        return ThreadOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url)
+    resp.raise_for_status()
+    return ThreadOut.model_validate_json(resp.content)
 
 
 async def delete_thread(thread_id: str) -> None:
@@ -80,10 +83,10 @@ async def delete_thread(thread_id: str) -> None:
     DELETE /v1/{thread_id}  -> 204 No Content
     """
     url = f"{THREADS_BASE}/{thread_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.delete(url)
-        resp.raise_for_status()
-        return None
+    client = get_client(BASE_URL)
+    resp = await client.delete(url)
+    resp.raise_for_status()
+    return None
 
 
 async def get_threads_by_channel(channel_id: str) -> List[ThreadBasicInfo]:
@@ -91,8 +94,7 @@ async def get_threads_by_channel(channel_id: str) -> List[ThreadBasicInfo]:
     GET /v1/channel/{channel_id}/threads  -> lista hilos de un canal específico.
     """
     url = f"{CHANNELS_BASE}/get_threads?channel_id={channel_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        data = resp.json()
-        return [ThreadBasicInfo(**item) for item in data]
\ No newline at end of file
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return _THREAD_BASIC_INFO_LIST.validate_json(resp.content)
\ No newline at end of file
@@ -2,9 +2,8 @@
 from typing import Optional
 from uuid import UUID
 
-import httpx
-
 from app.core.config import settings
+from app.core.upstream import get_client
 from app.services.mensajes.schemas import (
     MessageCreateIn,
     MessageUpdateIn,
@@ -23,10 +22,10 @@ async def create_message(
     url = f"{BASE_URL}/threads/{thread_id}/messages"
     headers = {"X-User-Id": x_user_id}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=payload.dict(), headers=headers)
-        resp.raise_for_status()
-        return MessageOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, json=payload.dict(), headers=headers)
+    resp.raise_for_status()
+    return MessageOut.model_validate_json(resp.content)
 
 
 async def update_message(
@@ -38,14 +37,14 @@ async def update_message(
     url = f"{BASE_URL}/threads/{thread_id}/messages/{message_id}"
     headers = {"X-User-Id": x_user_id}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.put(
-            url,
-            json=payload.dict(exclude_unset=True),
-            headers=headers,
-        )
-        resp.raise_for_status()
-        return MessageOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.put(
+        url,
+        json=payload.dict(exclude_unset=True),
+        headers=headers,
+    )
+    resp.raise_for_status()
+    return MessageOut.model_validate_json(resp.content)
 
 
 async def delete_message(
@@ -56,11 +55,11 @@ async def delete_message(
     url = f"{BASE_URL}/threads/{thread_id}/messages/{message_id}"
     headers = {"X-User-Id": x_user_id}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.delete(url, headers=headers)
-        resp.raise_for_status()
-        # 204 No Content => no body
-        return None
+    client = get_client(BASE_URL)
+    resp = await client.delete(url, headers=headers)
+    resp.raise_for_status()
+    # 204 No Content => no body
+    return None
 
 
 async def list_messages(
@@ -68,12 +67,24 @@ async def list_messages(
     limit: int = 50,
     cursor: Optional[str] = None,
 ) -> MessagesPageOut:
+    raw = await list_messages_raw(thread_id=thread_id, limit=limit, cursor=cursor)
+    return MessagesPageOut.model_validate_json(raw)
+
+
+async def list_messages_raw(
+    thread_id: UUID,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> bytes:
+    """
+    Igual que list_messages, pero devuelve el JSON del MS sin parsear.
+    """
     url = f"{BASE_URL}/threads/{thread_id}/messages"
     params = {"limit": limit}
     if cursor is not None:
         params["cursor"] = cursor
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, params=params)
-        resp.raise_for_status()
-        return MessagesPageOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url, params=params)
+    resp.raise_for_status()
+    return resp.content
@@ -0,0 +1,175 @@
+"""
+Cambios de un hilo desde un checkpoint del cliente (sincronización delta).
+
+Un checkpoint es un token opaco con el epoch y la secuencia del journal de
+escrituras (ver mensajes.journal) y el mensaje más reciente que el cliente
+ya conoce (según los timestamps del MS). A partir de él:
+
+- creados: se recorren las páginas más recientes del MS hasta llegar a lo
+  ya conocido (las páginas con cursor salen de la caché de páginas cuando
+  están); si no se llega en MESSAGES_DELTA_MAX_PAGES páginas, se pide al
+  cliente recargar (`reset`);
+- editados: los de esas páginas con updated_at posterior al checkpoint, más
+  los editados a través del gateway según el journal;
+- eliminados: los eliminados a través del gateway según el journal.
+
+`journal_complete` es False si el journal no cubre el checkpoint (otra
+réplica, reinicio o journal desbordado): pueden faltar ediciones o borrados
+de mensajes antiguos.
+"""
+import base64
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.serialization import dumps, loads
+from app.services.mensajes import client as mensajes_client
+from app.services.mensajes.journal import journal
+from app.services.mensajes.page_cache import page_cache
+from app.services.mensajes.schemas import MessageOut, MessagesPageOut
+from app.services.mensajes.stream import MESSAGE_DELETED, MESSAGE_UPDATED
+
+
+@dataclass
+class Checkpoint:
+    epoch: str
+    seq: int
+    newest_created: Optional[datetime] = None
+    newest_id: Optional[str] = None
+    newest_change: Optional[datetime] = None
+
+    def encode(self) -> str:
+        payload = {
+            "e": self.epoch,
+            "s": self.seq,
+            "c": self.newest_created.isoformat() if self.newest_created else None,
+            "m": self.newest_id,
+            "u": self.newest_change.isoformat() if self.newest_change else None,
+        }
+        return base64.urlsafe_b64encode(dumps(payload)).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "Checkpoint":
+        """ValueError si el token no es un checkpoint válido."""
+        try:
+            payload = loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            return cls(
+                epoch=str(payload["e"]),
+                seq=int(payload["s"]),
+                newest_created=datetime.fromisoformat(payload["c"]) if payload.get("c") else None,
+                newest_id=payload.get("m"),
+                newest_change=datetime.fromisoformat(payload["u"]) if payload.get("u") else None,
+            )
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            raise ValueError("Checkpoint inválido") from e
+
+    def is_new(self, message: MessageOut) -> bool:
+        if self.newest_created is None:
+            return True  # el hilo estaba vacío
+        if message.created_at is None:
+            return False
+        if message.created_at != self.newest_created:
+            return message.created_at > self.newest_created
+        return str(message.id) != self.newest_id
+
+    def is_changed(self, message: MessageOut) -> bool:
+        return (
+            message.updated_at is not None
+            and self.newest_change is not None
+            and message.updated_at > self.newest_change
+        )
+
+
+@dataclass
+class Delta:
+    checkpoint: str
+    created: List[MessageOut] = field(default_factory=list)
+    updated: List[MessageOut] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    reset: bool = False
+    journal_complete: bool = True
+
+
+def _checkpoint_for(items: List[MessageOut], seq: int) -> Checkpoint:
+    checkpoint = Checkpoint(epoch=journal.epoch, seq=seq)
+    dated = [m for m in items if m.created_at is not None]
+    if dated:
+        newest = max(dated, key=lambda m: m.created_at)
+        checkpoint.newest_created = newest.created_at
+        checkpoint.newest_id = str(newest.id)
+        checkpoint.newest_change = max(max(m.created_at, m.updated_at or m.created_at) for m in dated)
+    return checkpoint
+
+
+async def _page(thread_id: str, limit: int, cursor: str) -> MessagesPageOut:
+    raw = page_cache.get(thread_id, cursor, limit) if settings.messages_page_cache_ttl > 0 else None
+    if raw is None:
+        version = page_cache.version
+        raw = await mensajes_client.list_messages_raw(thread_id=thread_id, limit=limit, cursor=cursor)
+        if settings.messages_page_cache_ttl > 0:
+            page_cache.put(thread_id, cursor, limit, raw, version)
+    return MessagesPageOut.model_validate_json(raw)
+
+
+async def compute_delta(
+    thread_id: Union[UUID, str],
+    since: Optional[Checkpoint],
+    limit: int,
+    max_pages: int,
+) -> Delta:
+    """
+    Sin `since` (o si no se alcanza lo conocido) devuelve la primera página
+    en `created` con reset=True, como una carga inicial.
+    """
+    thread = str(thread_id)
+    # la secuencia se toma antes de leer: una escritura concurrente puede
+    # repetirse en el próximo delta, pero no perderse
+    seq = journal.seq
+    head = MessagesPageOut.model_validate_json(
+        await mensajes_client.list_messages_raw(thread_id=thread, limit=limit)
+    )
+    checkpoint = _checkpoint_for(head.items, seq).encode()
+    if since is None:
+        return Delta(checkpoint=checkpoint, created=head.items, reset=True)
+
+    created: Dict[str, MessageOut] = {}
+    updated: Dict[str, MessageOut] = {}
+    page, reached = head, False
+    for page_number in range(max_pages):
+        if page_number > 0:
+            page = await _page(thread, limit, page.next_cursor)
+        for message in page.items:
+            if since.is_new(message):
+                created[str(message.id)] = message
+            else:
+                reached = True
+                if since.is_changed(message):
+                    updated[str(message.id)] = message
+        if reached or not page.has_more or not page.next_cursor:
+            break
+    if not reached and page.has_more:
+        return Delta(checkpoint=checkpoint, created=head.items, reset=True)
+
+    entries, complete = journal.since(thread, since.epoch, since.seq)
+    deleted: Dict[str, None] = {}
+    for entry in entries:
+        if entry.event == MESSAGE_DELETED:
+            created.pop(entry.message_id, None)
+            updated.pop(entry.message_id, None)
+            deleted[entry.message_id] = None
+        elif entry.message_id in created or entry.event != MESSAGE_UPDATED:
+            created[entry.message_id] = entry.message
+            deleted.pop(entry.message_id, None)
+        else:
+            updated[entry.message_id] = entry.message
+            deleted.pop(entry.message_id, None)
+
+    return Delta(
+        checkpoint=checkpoint,
+        created=list(created.values()),
+        updated=list(updated.values()),
+        deleted=list(deleted),
+        journal_complete=complete,
+    )
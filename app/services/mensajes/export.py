@@ -0,0 +1,85 @@
+# app/services/mensajes/export.py
+"""
+Exportación del historial completo de un hilo.
+
+Recorre los cursores del MS de mensajes con una página de adelanto: mientras
+se envía al cliente una página, la siguiente ya se está pidiendo. Así el
+ritmo lo marca el MS y no los round-trips del cliente, y en memoria hay a lo
+más dos páginas.
+
+El orden es el del MS (la primera página es la más reciente).
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
+from uuid import UUID
+
+import httpx
+
+from app.core.serialization import dumps, loads
+from app.core.upstream import translate_httpx_error
+from app.services.mensajes import client as mensajes_client
+
+logger = logging.getLogger(__name__)
+
+Page = Dict[str, Any]
+
+
+async def fetch_page(thread_id: Union[UUID, str], limit: int, cursor: Optional[str] = None) -> Page:
+    raw = await mensajes_client.list_messages_raw(thread_id=thread_id, limit=limit, cursor=cursor)
+    return loads(raw)
+
+
+async def iter_pages(thread_id: Union[UUID, str], limit: int, first: Page) -> AsyncIterator[List[Any]]:
+    """
+    Entrega los mensajes de cada página empezando por `first`, pidiendo la
+    siguiente antes de entregar la actual.
+    """
+    page = first
+    seen: Set[str] = set()
+    pending: Optional[asyncio.Task] = None
+    try:
+        while True:
+            next_cursor = page.get("next_cursor") if page.get("has_more") else None
+            if next_cursor and next_cursor not in seen:  # un cursor repetido cortaría un ciclo
+                seen.add(next_cursor)
+                pending = asyncio.create_task(fetch_page(thread_id, limit, next_cursor))
+            yield page.get("items") or []
+            if pending is None:
+                return
+            page = await pending
+            pending = None
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def ndjson_lines(pages: AsyncIterator[List[Any]]) -> AsyncIterator[bytes]:
+    """
+    Un mensaje por línea. Si el MS falla a mitad de camino, la última línea
+    es {"error": {...}}: el status HTTP ya se envió.
+    """
+    try:
+        async for items in pages:
+            if items:
+                yield b"".join(dumps(item) + b"\n" for item in items)
+    except httpx.HTTPError as e:
+        error = translate_httpx_error(e, "Error al exportar mensajes del hilo")
+        logger.warning("Exportación interrumpida: %r", e)
+        yield dumps({"error": {"status_code": error.status_code, "detail": error.detail}}) + b"\n"
+
+
+async def json_array(pages: AsyncIterator[List[Any]]) -> AsyncIterator[bytes]:
+    """
+    Un arreglo JSON transmitido por partes. Si el MS falla a mitad de camino
+    se corta la conexión y el cliente recibe un JSON incompleto.
+    """
+    yield b"["
+    first = True
+    async for items in pages:
+        if not items:
+            continue
+        chunk = b",".join(dumps(item) for item in items)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
@@ -0,0 +1,174 @@
+"""
+Importación masiva de mensajes.
+
+Recibe las líneas de un NDJSON a medida que llegan y crea los mensajes en el
+MS con concurrencia acotada (MESSAGES_IMPORT_CONCURRENCY llamadas en vuelo
+entre todos los hilos) respetando el orden dentro de cada hilo: cada hilo
+tiene una cola y un único worker que la recorre en orden.
+
+El resultado de cada línea se entrega apenas se conoce (orden de término,
+no de entrada). Como mucho MESSAGES_IMPORT_MAX_PENDING líneas pueden estar
+leídas y sin resultado: si el MS va más lento, se deja de leer el body.
+"""
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple, Union
+from uuid import UUID
+
+import httpx
+
+from app.core.upstream import translate_httpx_error
+from app.services.mensajes import client as mensajes_client
+from app.services.mensajes.schemas import MessageCreateIn, MessageOut
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportItem:
+    line: int
+    thread_id: UUID
+    user_id: str
+    payload: MessageCreateIn
+
+
+@dataclass
+class ImportResult:
+    line: int
+    status_code: int
+    thread_id: Optional[str] = None
+    id: Optional[str] = None
+    error: Any = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"line": self.line, "status_code": self.status_code}
+        if self.thread_id is not None:
+            result["thread_id"] = self.thread_id
+        if self.id is not None:
+            result["id"] = self.id
+        if self.error is not None:
+            result["error"] = self.error
+        return result
+
+
+# Convierte una línea del NDJSON en un item, o en un resultado de error
+LineParser = Callable[[int, bytes], Union[ImportItem, ImportResult]]
+OnCreated = Callable[[UUID, MessageOut], None]
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, bytes]]:
+    """(número de línea, contenido) de un body NDJSON que llega por trozos; omite líneas vacías."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+        if len(buffer) > max_line_bytes:
+            raise ValueError(f"La línea {number + 1} supera {max_line_bytes} bytes")
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+class _Import:
+    def __init__(self, concurrency: int, max_pending: int, on_created: Optional[OnCreated]) -> None:
+        self.upstream = asyncio.Semaphore(max(concurrency, 1))
+        self.pending = asyncio.Semaphore(max(max_pending, 1))
+        self.results: "asyncio.Queue[Optional[ImportResult]]" = asyncio.Queue()
+        self.on_created = on_created
+        self.queues: Dict[UUID, Deque[ImportItem]] = {}
+        self.workers: Dict[UUID, asyncio.Task] = {}
+
+    def emit(self, result: ImportResult) -> None:
+        self.results.put_nowait(result)
+
+    async def create(self, item: ImportItem) -> ImportResult:
+        async with self.upstream:
+            try:
+                created = await mensajes_client.create_message(
+                    thread_id=item.thread_id,
+                    payload=item.payload,
+                    x_user_id=item.user_id,
+                )
+            except httpx.HTTPError as e:
+                error = translate_httpx_error(e, "Error al crear el mensaje")
+                return ImportResult(item.line, error.status_code, str(item.thread_id), error=error.detail)
+            except Exception:
+                logger.exception("Error inesperado al importar la línea %d", item.line)
+                return ImportResult(item.line, 502, str(item.thread_id), error="Respuesta inválida del servicio de mensajes")
+        if self.on_created is not None:
+            self.on_created(item.thread_id, created)
+        return ImportResult(item.line, 201, str(item.thread_id), id=str(created.id))
+
+    async def worker(self, thread_id: UUID) -> None:
+        queue = self.queues[thread_id]
+        try:
+            while queue:
+                self.emit(await self.create(queue.popleft()))
+        finally:
+            # cola vacía: el próximo item del hilo crea un worker nuevo
+            del self.queues[thread_id]
+            del self.workers[thread_id]
+
+    def submit(self, item: ImportItem) -> None:
+        queue = self.queues.get(item.thread_id)
+        if queue is None:
+            queue = self.queues[item.thread_id] = deque()
+        queue.append(item)
+        if item.thread_id not in self.workers:
+            self.workers[item.thread_id] = asyncio.create_task(self.worker(item.thread_id))
+
+    async def read(self, lines: AsyncIterator[Tuple[int, bytes]], parse: LineParser) -> None:
+        try:
+            async for number, raw in lines:
+                await self.pending.acquire()
+                parsed = parse(number, raw)
+                if isinstance(parsed, ImportResult):
+                    self.emit(parsed)
+                else:
+                    self.submit(parsed)
+        finally:
+            # los workers en curso terminan; luego se marca el fin
+            while self.workers:
+                await asyncio.gather(*self.workers.values(), return_exceptions=True)
+            self.results.put_nowait(None)
+
+
+async def run_import(
+    lines: AsyncIterator[Tuple[int, bytes]],
+    parse: LineParser,
+    concurrency: int,
+    max_pending: int,
+    on_created: Optional[OnCreated] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Entrega un dict por línea procesada y, al final, {"summary": {...}}. Si
+    la lectura del body falla, el summary incluye el error.
+    """
+    state = _Import(concurrency, max_pending, on_created)
+    reader = asyncio.create_task(state.read(lines, parse))
+    total = created = 0
+    try:
+        while True:
+            result = await state.results.get()
+            if result is None:
+                break
+            state.pending.release()
+            total += 1
+            created += result.status_code == 201
+            yield result.as_dict()
+    finally:
+        for task in (reader, *state.workers.values()):
+            task.cancel()
+
+    summary: Dict[str, Any] = {"lines": total, "created": created, "failed": total - created}
+    error = reader.exception() if reader.done() and not reader.cancelled() else None
+    if error is not None:
+        logger.warning("Importación interrumpida: %r", error)
+        summary["error"] = str(error)
+    yield {"summary": summary}
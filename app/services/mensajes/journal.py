@@ -0,0 +1,94 @@
+"""
+Journal de escrituras de mensajes hechas a través del gateway.
+
+Guarda, por hilo, las últimas MESSAGES_JOURNAL_PER_THREAD escrituras
+(creado / editado / eliminado) con un número de secuencia global. El
+endpoint de delta lo usa para saber qué cambió desde un checkpoint sin
+recorrer el historial en el MS: las ediciones y borrados de mensajes
+antiguos no se pueden detectar mirando solo las primeras páginas.
+
+El journal vive en memoria y es por réplica: `epoch` cambia en cada
+arranque, y un checkpoint de otro epoch (u otra réplica) no se puede
+completar con este journal. Las escrituras que no pasan por este gateway
+tampoco quedan registradas.
+"""
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, List, Tuple, Union
+from uuid import UUID
+
+from app.core.config import settings
+
+
+@dataclass
+class JournalEntry:
+    seq: int
+    event: str
+    message_id: str
+    message: Any    # MessageOut para creados / editados, None para eliminados
+
+
+class _ThreadJournal:
+    __slots__ = ("entries", "dropped_seq")
+
+    def __init__(self, size: int) -> None:
+        self.entries: Deque[JournalEntry] = deque(maxlen=size)
+        # seq de la última entrada descartada por tamaño
+        self.dropped_seq = 0
+
+
+class MessageJournal:
+    def __init__(self, per_thread: int, max_threads: int) -> None:
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.per_thread = per_thread
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, _ThreadJournal]" = OrderedDict()
+        # seq más alta entre los hilos descartados completos
+        self._evicted_seq = 0
+
+    def record(self, thread_id: Union[UUID, str], event: str, message_id: Union[UUID, str], message: Any = None) -> int:
+        key = str(thread_id)
+        journal = self._threads.get(key)
+        if journal is None:
+            journal = self._threads[key] = _ThreadJournal(self.per_thread)
+            while len(self._threads) > self.max_threads:
+                _, evicted = self._threads.popitem(last=False)
+                if evicted.entries:
+                    self._evicted_seq = max(self._evicted_seq, evicted.entries[-1].seq)
+        else:
+            self._threads.move_to_end(key)
+
+        self.seq += 1
+        if len(journal.entries) == journal.entries.maxlen:
+            journal.dropped_seq = journal.entries[0].seq
+        journal.entries.append(JournalEntry(self.seq, event, str(message_id), message))
+        return self.seq
+
+    def since(self, thread_id: Union[UUID, str], epoch: str, seq: int) -> Tuple[List[JournalEntry], bool]:
+        """
+        Escrituras del hilo posteriores a `seq`. El segundo valor indica si
+        el journal las tiene todas (mismo epoch y nada descartado desde seq).
+        """
+        if epoch != self.epoch:
+            return [], False
+        journal = self._threads.get(str(thread_id))
+        if journal is None:
+            return [], seq >= self._evicted_seq
+        complete = seq >= journal.dropped_seq
+        return [entry for entry in journal.entries if entry.seq > seq], complete
+
+    def snapshot(self) -> dict:
+        return {
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "threads": len(self._threads),
+            "entries": sum(len(j.entries) for j in self._threads.values()),
+        }
+
+
+journal = MessageJournal(
+    per_thread=settings.messages_journal_per_thread,
+    max_threads=settings.messages_journal_max_threads,
+)
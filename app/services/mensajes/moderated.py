@@ -0,0 +1,198 @@
+"""
+Publicación moderada de mensajes con creación especulativa.
+
+El flujo secuencial (moderar y recién entonces crear) suma las dos
+latencias. Aquí ambas llamadas salen a la vez: el mensaje se crea en el MS
+de mensajes mientras el MS de moderación lo revisa, y solo se da por
+publicado (caché de páginas, journal, streams) si la moderación lo aprueba.
+La latencia queda cerca de max(moderación, creación).
+
+Si la moderación lo rechaza o falla, se responde apenas se sabe y el
+mensaje ya creado se elimina en segundo plano (compensación). El MS de
+mensajes no tiene borradores: el stream del gateway (SSE y long-poll)
+retiene el mensaje hasta el veredicto y nunca emite uno rechazado (ver
+`message_stream.hold`), pero quien lea el hilo directamente del MS en ese
+intervalo puede verlo un instante; por eso la compensación se avisa como un
+borrado normal (`on_compensated`).
+
+El MS de moderación pide un message_id, y el real aún no existe: se le
+envía uno estable derivado del mensaje (ver `moderation_message_id`), y el
+hilo va en metadata.
+"""
+import asyncio
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional, Set, Tuple
+from uuid import UUID
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.core.upstream import translate_httpx_error
+from app.services.mensajes import client as mensajes_client
+from app.services.mensajes.schemas import MessageCreateIn, MessageOut
+from app.services.mensajes.stream import message_stream
+from app.services.moderacion import client as moderacion_client
+from app.services.moderacion.schemas import ModerateMessageRequest, ModerateMessageResponse
+
+logger = logging.getLogger(__name__)
+
+OnWritten = Callable[[UUID, MessageOut], None]
+
+# espacio de nombres de los message_id que se envían a moderación
+_MODERATION_NAMESPACE = uuid.UUID("6f1c7a52-2f0e-4d43-9a43-5b1f3c0d8e21")
+
+
+def moderation_message_id(thread_id: UUID, x_user_id: str, content: str) -> str:
+    """
+    message_id estable para el MS de moderación: la moderación corre antes
+    de que exista el id real. Es un UUIDv5 de (hilo, autor, sha256 del
+    contenido), así que una violación registrada en el MS se puede
+    relacionar con el mensaje recalculándolo. Dos mensajes idénticos del
+    mismo autor en el mismo hilo comparten este id.
+    """
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(_MODERATION_NAMESPACE, f"{thread_id}:{x_user_id}:{digest}"))
+
+
+@dataclass
+class ModeratedPostStats:
+    posts: int = 0
+    approved: int = 0
+    rejected: int = 0
+    moderation_errors: int = 0
+    create_errors: int = 0
+    compensated: int = 0            # mensajes creados y luego eliminados
+    compensation_failures: int = 0  # no se pudieron eliminar (quedan en el MS)
+
+
+class ModeratedPoster:
+    def __init__(self) -> None:
+        self.stats = ModeratedPostStats()
+        self._compensations: Set[asyncio.Task] = set()
+
+    async def _create(self, thread_id: UUID, payload: MessageCreateIn, x_user_id: str) -> MessageOut:
+        # el stream del hilo retiene el mensaje hasta conocer el veredicto
+        message_stream.hold(thread_id)
+        created = None
+        try:
+            created = await mensajes_client.create_message(
+                thread_id=thread_id, payload=payload, x_user_id=x_user_id
+            )
+            return created
+        finally:
+            message_stream.resolve(thread_id, created.id if created is not None else None)
+
+    async def post(
+        self,
+        thread_id: UUID,
+        channel_id: str,
+        payload: MessageCreateIn,
+        x_user_id: str,
+        on_approved: Optional[OnWritten] = None,
+        on_compensated: Optional[OnWritten] = None,
+    ) -> Tuple[MessageOut, ModerateMessageResponse]:
+        """
+        Crea el mensaje si la moderación lo aprueba y llama `on_approved`
+        (aunque el cliente se desconecte mientras tanto). Lanza
+        HTTPException 422 (con el veredicto en el detail) si lo rechaza, o
+        el error traducido del MS que falló.
+        """
+        self.stats.posts += 1
+        create = asyncio.ensure_future(self._create(thread_id, payload, x_user_id))
+        try:
+            verdict = await moderacion_client.moderate_message(
+                ModerateMessageRequest(
+                    message_id=moderation_message_id(thread_id, x_user_id, payload.content),
+                    user_id=x_user_id,
+                    channel_id=channel_id,
+                    content=payload.content,
+                    metadata={"thread_id": str(thread_id)},
+                )
+            )
+        except httpx.HTTPError as e:
+            self.stats.moderation_errors += 1
+            self._compensate(create, thread_id, x_user_id, on_compensated)
+            raise translate_httpx_error(e, "Error al moderar el mensaje")
+        except BaseException:
+            # cancelado (cliente desconectado) o respuesta inválida: sin veredicto
+            self._compensate(create, thread_id, x_user_id, on_compensated)
+            raise
+
+        if not verdict.is_approved:
+            self.stats.rejected += 1
+            self._compensate(create, thread_id, x_user_id, on_compensated)
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={"message": verdict.message, "moderation": verdict.model_dump(mode="json")},
+            )
+
+        # aprobado: se publica al terminar la creación, aunque este request
+        # se cancele mientras la espera
+        create.add_done_callback(lambda done: self._approved(done, thread_id, on_approved))
+        try:
+            created = await asyncio.shield(create)
+        except httpx.HTTPError as e:
+            raise translate_httpx_error(e, "Error al crear el mensaje")
+        return created, verdict
+
+    def _approved(self, create: "asyncio.Future[MessageOut]", thread_id: UUID, on_approved: Optional[OnWritten]) -> None:
+        if create.cancelled() or create.exception() is not None:
+            self.stats.create_errors += 1
+            return
+        created = create.result()
+        self.stats.approved += 1
+        message_stream.release(thread_id, created.id)
+        if on_approved is not None:
+            on_approved(thread_id, created)
+
+    def _compensate(
+        self,
+        create: "asyncio.Future[MessageOut]",
+        thread_id: UUID,
+        x_user_id: str,
+        on_compensated: Optional[OnWritten],
+    ) -> None:
+        task = asyncio.create_task(self._undo(create, thread_id, x_user_id, on_compensated))
+        self._compensations.add(task)
+        task.add_done_callback(self._compensations.discard)
+
+    async def _undo(
+        self,
+        create: "asyncio.Future[MessageOut]",
+        thread_id: UUID,
+        x_user_id: str,
+        on_compensated: Optional[OnWritten],
+    ) -> None:
+        # no se cancela la creación: la request ya pudo llegar al MS, y solo
+        # esperando la respuesta se sabe qué mensaje eliminar
+        try:
+            created = await create
+        except Exception:
+            return  # no se creó: nada que compensar
+        try:
+            await mensajes_client.delete_message(
+                thread_id=thread_id, message_id=created.id, x_user_id=x_user_id
+            )
+        except httpx.HTTPError as e:
+            # queda retenido: el stream nunca lo emite
+            self.stats.compensation_failures += 1
+            logger.error("No se pudo eliminar el mensaje %s no aprobado: %r", created.id, e)
+            return
+        self.stats.compensated += 1
+        message_stream.release(thread_id, created.id)
+        if on_compensated is not None:
+            on_compensated(thread_id, created)
+
+    async def drain(self, timeout: float) -> None:
+        """Espera las compensaciones pendientes (shutdown)."""
+        if self._compensations:
+            await asyncio.wait(set(self._compensations), timeout=timeout)
+
+    def snapshot(self) -> dict:
+        return {**vars(self.stats), "pending_compensations": len(self._compensations)}
+
+
+moderated_poster = ModeratedPoster()
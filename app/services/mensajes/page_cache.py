@@ -0,0 +1,153 @@
+"""
+Caché de páginas de mensajes por cursor.
+
+Las páginas antiguas de un hilo (las que se piden con `cursor`) casi no
+cambian: solo por ediciones o borrados. Se guardan tal como las entrega el
+MS (bytes) por (thread_id, cursor, limit) durante MESSAGES_PAGE_CACHE_TTL
+segundos, así recorrer hacia atrás un hilo largo se sirve desde memoria.
+
+La página más reciente (sin cursor) no se guarda: cambia con cada mensaje
+nuevo, y para esperarlos están el stream y el long-poll. Sí se comparte la
+consulta en curso (`head`): los long-polls que despiertan con el mismo
+mensaje hacen una sola request al MS.
+
+Invalidación, cuando la escritura pasa por el gateway:
+- edición o borrado: las páginas que contienen ese mensaje;
+- mensaje nuevo: ninguna página si los cursores son estables (keyset,
+  MESSAGES_PAGE_CACHE_KEYSET_CURSORS=true); si no, todas las del hilo, porque
+  un cursor por offset corre todas las páginas.
+Las escrituras que no pasan por el gateway quedan acotadas por el TTL.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.serialization import loads
+
+PageKey = Tuple[str, str, int]
+
+
+class MessagePageCache:
+    def __init__(self, ttl: float, max_entries: int, keyset_cursors: bool) -> None:
+        self.keyset_cursors = keyset_cursors
+        self._pages: TTLCache[bytes] = TTLCache(max_entries=max_entries, ttl=ttl, on_evict=self._forget)
+        # índices para invalidar sin recorrer toda la caché
+        self._by_thread: Dict[str, Set[PageKey]] = {}
+        self._by_message: Dict[str, Set[PageKey]] = {}
+        # mensajes de cada página, para limpiar _by_message al expulsarla
+        self._messages: Dict[PageKey, Tuple[str, ...]] = {}
+        # sube con cada invalidación: una página pedida antes no se guarda
+        self.version = 0
+        self.invalidated = 0
+        # consultas en curso de la página más reciente, por (thread_id, limit)
+        self._heads: Dict[Tuple[str, int], "asyncio.Future[bytes]"] = {}
+        self.shared_heads = 0
+
+    @property
+    def hits(self) -> int:
+        return self._pages.hits
+
+    @property
+    def misses(self) -> int:
+        return self._pages.misses
+
+    def get(self, thread_id: Union[UUID, str], cursor: str, limit: int) -> Optional[bytes]:
+        return self._pages.get((str(thread_id), cursor, limit))
+
+    def has(self, thread_id: Union[UUID, str], cursor: str, limit: int) -> bool:
+        return (str(thread_id), cursor, limit) in self._pages
+
+    def put(self, thread_id: Union[UUID, str], cursor: str, limit: int, raw: bytes, version: int) -> bool:
+        """Guarda una página obtenida cuando la caché estaba en `version`; True si quedó guardada."""
+        if version != self.version:
+            return False  # hubo una escritura mientras se pedía la página
+        try:
+            items = loads(raw)["items"]
+            message_ids = tuple(str(item["id"]) for item in items)
+        except (ValueError, KeyError, TypeError):
+            return False  # respuesta inesperada: no se guarda
+        key = (str(thread_id), cursor, limit)
+        if key in self._messages:
+            self._unindex(key)
+        self._pages.set(key, raw)
+        self._messages[key] = message_ids
+        self._by_thread.setdefault(key[0], set()).add(key)
+        for message_id in message_ids:
+            self._by_message.setdefault(message_id, set()).add(key)
+        return True
+
+    async def head(
+        self,
+        thread_id: Union[UUID, str],
+        limit: int,
+        fetch: Callable[[], Awaitable[bytes]],
+    ) -> bytes:
+        """
+        Página más reciente: no se guarda, pero quien la pide mientras otra
+        consulta igual está en curso espera esa en vez de repetirla.
+        """
+        key = (str(thread_id), limit)
+        pending = self._heads.get(key)
+        if pending is None:
+            pending = self._heads[key] = asyncio.ensure_future(fetch())
+            pending.add_done_callback(lambda _: self._heads.pop(key, None))
+        else:
+            self.shared_heads += 1
+        # si esta request se cancela, la consulta sigue para las demás
+        return await asyncio.shield(pending)
+
+    def on_created(self, thread_id: Union[UUID, str]) -> None:
+        if not self.keyset_cursors:
+            self.invalidate_thread(thread_id)
+
+    def on_changed(self, message_id: Union[UUID, str]) -> None:
+        """Mensaje editado o eliminado: se descartan las páginas que lo contienen."""
+        self.version += 1
+        for key in list(self._by_message.get(str(message_id), ())):
+            self._drop(key)
+
+    def invalidate_thread(self, thread_id: Union[UUID, str]) -> None:
+        self.version += 1
+        for key in list(self._by_thread.get(str(thread_id), ())):
+            self._drop(key)
+
+    def _drop(self, key: PageKey) -> None:
+        self._pages.pop(key)
+        self._unindex(key)
+        self.invalidated += 1
+
+    def _forget(self, key: Hashable, _value: bytes) -> None:
+        # expulsada por TTL o por tamaño
+        self._unindex(key)
+
+    def _unindex(self, key: PageKey) -> None:
+        for message_id in self._messages.pop(key, ()):
+            keys = self._by_message.get(message_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_message[message_id]
+        keys = self._by_thread.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_thread[key[0]]
+
+    def snapshot(self) -> dict:
+        return {
+            "pages": len(self._pages),
+            "threads": len(self._by_thread),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "shared_heads": self.shared_heads,
+        }
+
+
+page_cache = MessagePageCache(
+    ttl=settings.messages_page_cache_ttl,
+    max_entries=settings.messages_page_cache_max_entries,
+    keyset_cursors=settings.messages_page_cache_keyset_cursors,
+)
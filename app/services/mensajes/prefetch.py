@@ -0,0 +1,164 @@
+"""
+Prefetch especulativo de la siguiente página de mensajes.
+
+Si una página trae `has_more`, lo más probable es que el cliente pida
+`next_cursor` al hacer scroll. Con MESSAGES_PREFETCH_ENABLED el gateway la
+pide al MS en segundo plano después de responder y la deja en la caché de
+páginas (ver mensajes.page_cache), de donde sale el siguiente request.
+
+Presupuestos, para que el prefetch nunca pase de una fracción del tráfico
+real hacia el MS:
+- global: un balde de tokens que gana MESSAGES_PREFETCH_SHARE tokens por
+  cada página pedida al MS por un cliente (hasta MESSAGES_PREFETCH_BURST);
+  cada prefetch gasta uno;
+- por hilo: a lo más MESSAGES_PREFETCH_PER_THREAD páginas prefetcheadas y
+  aún no usadas.
+
+Una página prefetcheada que nadie pide antes de que venza su TTL en la
+caché cuenta como desperdiciada, aunque su hilo no se vuelva a leer.
+"""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple, Union
+from uuid import UUID
+
+import httpx
+
+from app.core.config import settings
+from app.core.serialization import loads
+from app.services.mensajes import client as mensajes_client
+from app.services.mensajes.page_cache import page_cache
+
+logger = logging.getLogger(__name__)
+
+PageKey = Tuple[str, str, int]
+
+
+@dataclass
+class PrefetchStats:
+    demand_fetches: int = 0     # páginas pedidas al MS por clientes
+    prefetched: int = 0         # páginas pedidas al MS por el prefetch
+    used: int = 0               # prefetcheadas que luego pidió un cliente
+    wasted: int = 0             # prefetcheadas que expiraron sin usarse
+    failed: int = 0
+    skipped_budget: int = 0     # sin tokens globales
+    skipped_thread: int = 0     # hilo con demasiadas páginas sin usar
+
+
+class PagePrefetcher:
+    def __init__(self, share: float, burst: int, per_thread: int, ttl: float) -> None:
+        self.share = share
+        self.burst = burst
+        self.per_thread = per_thread
+        self.ttl = ttl
+        self._tokens = float(burst)
+        # hilo -> {página prefetcheada sin usar: momento del prefetch}
+        self._outstanding: Dict[str, Dict[PageKey, float]] = {}
+        # las mismas páginas por antigüedad, para vencerlas sin recorrer los hilos
+        self._by_age: "OrderedDict[PageKey, float]" = OrderedDict()
+        self._inflight: Set[PageKey] = set()
+        self.stats = PrefetchStats()
+
+    def _forget(self, key: PageKey) -> bool:
+        """Quita una página de las pendientes; False si no estaba."""
+        pages = self._outstanding.get(key[0])
+        if pages is None or pages.pop(key, None) is None:
+            return False
+        self._by_age.pop(key, None)
+        if not pages:
+            del self._outstanding[key[0]]
+        return True
+
+    def _expire(self, now: float) -> None:
+        # el TTL es fijo: las más antiguas vencen primero
+        while self._by_age:
+            key, at = next(iter(self._by_age.items()))
+            if now - at <= self.ttl:
+                break
+            self._forget(key)
+            self.stats.wasted += 1
+
+    def plan(
+        self,
+        thread_id: Union[UUID, str],
+        cursor: Optional[str],
+        limit: int,
+        raw: bytes,
+        from_cache: bool,
+    ) -> Optional[str]:
+        """
+        Registra la página recién servida y devuelve el cursor a prefetchear,
+        o None si no corresponde o no hay presupuesto.
+        """
+        thread = str(thread_id)
+        now = time.monotonic()
+        self._expire(now)
+        if from_cache:
+            if self._forget((thread, cursor, limit)):
+                self.stats.used += 1
+        else:
+            self.stats.demand_fetches += 1
+            self._tokens = min(float(self.burst), self._tokens + self.share)
+
+        try:
+            page = loads(raw)
+            next_cursor = page.get("next_cursor") if page.get("has_more") else None
+        except (ValueError, AttributeError):
+            return None
+        if not next_cursor:
+            return None
+        key = (thread, next_cursor, limit)
+        if key in self._inflight or page_cache.has(thread, next_cursor, limit):
+            return None
+
+        if len(self._outstanding.get(thread, ())) >= self.per_thread:
+            self.stats.skipped_thread += 1
+            return None
+        if self._tokens < 1:
+            self.stats.skipped_budget += 1
+            return None
+        self._tokens -= 1
+        self._inflight.add(key)
+        return next_cursor
+
+    async def prefetch(self, thread_id: Union[UUID, str], cursor: str, limit: int) -> None:
+        thread = str(thread_id)
+        key = (thread, cursor, limit)
+        version = page_cache.version
+        try:
+            raw = await mensajes_client.list_messages_raw(thread_id=thread, limit=limit, cursor=cursor)
+        except httpx.HTTPError as e:
+            self.stats.failed += 1
+            logger.debug("Prefetch de %s falló: %r", key, e)
+            return
+        finally:
+            self._inflight.discard(key)
+        if not page_cache.put(thread, cursor, limit, raw, version):
+            return  # hubo una escritura en el hilo mientras tanto: no quedó en la caché
+        now = time.monotonic()
+        self.stats.prefetched += 1
+        self._forget(key)
+        self._outstanding.setdefault(thread, {})[key] = now
+        self._by_age[key] = now
+        self._expire(now)
+
+    def snapshot(self) -> dict:
+        stats = self.stats
+        return {
+            **vars(stats),
+            "tokens": round(self._tokens, 2),
+            # fracción de las páginas prefetcheadas que se usaron
+            "usefulness": round(stats.used / stats.prefetched, 3) if stats.prefetched else 0.0,
+            # tráfico extra hacia el MS por el prefetch
+            "upstream_share": round(stats.prefetched / stats.demand_fetches, 3) if stats.demand_fetches else 0.0,
+        }
+
+
+prefetcher = PagePrefetcher(
+    share=settings.messages_prefetch_share,
+    burst=settings.messages_prefetch_burst,
+    per_thread=settings.messages_prefetch_per_thread,
+    ttl=settings.messages_page_cache_ttl,
+)
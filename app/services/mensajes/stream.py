@@ -0,0 +1,353 @@
+"""
+Stream en tiempo real de mensajes por hilo (SSE).
+
+Cada hilo con al menos un suscriptor tiene UN poller en segundo plano que
+consulta la página más reciente del MS de mensajes cada
+MESSAGES_STREAM_POLL_INTERVAL segundos y reparte los mensajes nuevos a todos
+los suscriptores. Así la carga sobre el MS crece con la cantidad de hilos
+abiertos y no con la cantidad de personas mirando cada uno.
+
+Los mensajes que se crean, editan o eliminan a través del gateway se
+publican de inmediato (`publish`), sin esperar al siguiente poll; el poller
+los reconoce por id y no los vuelve a emitir.
+
+Los mensajes creados de forma especulativa (ver mensajes.moderated) quedan
+retenidos: mientras hay una creación especulativa sin respuesta en el hilo
+el poller no emite nada nuevo (aún no se sabe qué id ignorar), y los ids
+retenidos no se emiten hasta que `release` los libera. Un mensaje aprobado
+se publica con `publish`; uno rechazado se elimina antes de liberarlo.
+
+Cuando el último suscriptor se va, el hilo se sigue consultando
+MESSAGES_STREAM_LINGER segundos: los long-polls consecutivos de un mismo
+cliente reutilizan el feed (y lo ya visto) en vez de abrir uno nuevo.
+
+Se asume, como en el resto del gateway, que la primera página (sin cursor)
+contiene los mensajes más recientes y que `next_cursor` avanza hacia los
+más antiguos.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Set, Union
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.serialization import dumps
+from app.services.mensajes import client as mensajes_client
+from app.services.mensajes.schemas import MessageOut
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_CREATED = "message.created"
+MESSAGE_UPDATED = "message.updated"
+MESSAGE_DELETED = "message.deleted"
+
+
+@dataclass
+class StreamEvent:
+    event: str
+    id: str
+    data: bytes
+
+    def encode(self) -> bytes:
+        return b"id: %s\nevent: %s\ndata: %s\n\n" % (
+            self.id.encode("utf-8"),
+            self.event.encode("utf-8"),
+            self.data,
+        )
+
+
+class Subscription:
+    __slots__ = ("queue",)
+
+    def __init__(self, size: int) -> None:
+        # None indica que el suscriptor quedó atrás y debe reconectarse
+        self.queue: "asyncio.Queue[Optional[StreamEvent]]" = asyncio.Queue(maxsize=size)
+
+    def offer(self, event: StreamEvent) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # suscriptor lento: se descarta lo pendiente y se le pide reconectar
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+
+class _ThreadFeed:
+    def __init__(self, thread_id: str, seen_max: int) -> None:
+        self.thread_id = thread_id
+        self.subscribers: Set[Subscription] = set()
+        self.task: Optional[asyncio.Task] = None
+        # ids de mensajes ya emitidos (o existentes al abrir el feed), del
+        # más antiguo al más reciente
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._seen_max = seen_max
+        self.primed = False
+        # se marca al terminar el primer poll (aunque falle)
+        self.ready = asyncio.Event()
+        # cierre diferido del feed sin suscriptores
+        self.expiry: Optional[asyncio.TimerHandle] = None
+        # consulta compartida del mensaje más reciente (ver MessageStreamHub._newest)
+        self.newest: Optional["asyncio.Future[Optional[str]]"] = None
+
+    def seen(self, message_id: str) -> bool:
+        return message_id in self._seen
+
+    def mark_seen(self, message_id: str) -> None:
+        self._seen[message_id] = None
+        self._seen.move_to_end(message_id)
+        while len(self._seen) > self._seen_max:
+            self._seen.popitem(last=False)
+
+    def newer_than(self, message_id: str) -> Optional[bool]:
+        """
+        True si el feed ya vio un mensaje posterior a `message_id`, False si
+        es el más reciente, None si no lo conoce.
+        """
+        if message_id not in self._seen:
+            return None
+        return next(reversed(self._seen)) != message_id
+
+
+@dataclass
+class StreamStats:
+    polls: int = 0
+    poll_errors: int = 0
+    polled_messages: int = 0    # mensajes nuevos detectados por los pollers
+    pushed_messages: int = 0    # eventos publicados por escrituras del gateway
+    delivered: int = 0          # eventos entregados (sumando suscriptores)
+    dropped_subscribers: int = 0
+    newest_checks: int = 0      # consultas de long-polls con un `after` desconocido
+
+
+class MessageStreamHub:
+    def __init__(
+        self,
+        poll_interval: float,
+        page_size: int,
+        max_pages: int,
+        queue_size: int,
+        linger: float = 0.0,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.queue_size = queue_size
+        self.linger = linger
+        self._feeds: Dict[str, _ThreadFeed] = {}
+        # por hilo: creaciones especulativas sin respuesta e ids retenidos
+        self._unresolved: Dict[str, int] = {}
+        self._held: Dict[str, Set[str]] = {}
+        self.stats = StreamStats()
+
+    def hold(self, thread_id: Union[UUID, str]) -> None:
+        """Se envió una creación especulativa al hilo (id aún desconocido)."""
+        key = str(thread_id)
+        self._unresolved[key] = self._unresolved.get(key, 0) + 1
+
+    def resolve(self, thread_id: Union[UUID, str], message_id: Optional[Union[UUID, str]]) -> None:
+        """La creación especulativa respondió: retener su id (None si falló)."""
+        key = str(thread_id)
+        remaining = self._unresolved.get(key, 0) - 1
+        if remaining > 0:
+            self._unresolved[key] = remaining
+        else:
+            self._unresolved.pop(key, None)
+        if message_id is not None:
+            self._held.setdefault(key, set()).add(str(message_id))
+
+    def release(self, thread_id: Union[UUID, str], message_id: Union[UUID, str]) -> None:
+        key = str(thread_id)
+        held = self._held.get(key)
+        if held is not None:
+            held.discard(str(message_id))
+            if not held:
+                del self._held[key]
+
+    @asynccontextmanager
+    async def subscribe(self, thread_id: Union[UUID, str]) -> AsyncIterator[Subscription]:
+        key = str(thread_id)
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = _ThreadFeed(key, seen_max=self.page_size * self.max_pages * 4)
+        if feed.expiry is not None:
+            feed.expiry.cancel()
+            feed.expiry = None
+        subscription = Subscription(self.queue_size)
+        feed.subscribers.add(subscription)
+        if feed.task is None:
+            feed.task = asyncio.create_task(self._run(feed))
+        try:
+            yield subscription
+        finally:
+            feed.subscribers.discard(subscription)
+            if not feed.subscribers and self._feeds.get(key) is feed:
+                # último suscriptor: el hilo deja de consultarse tras `linger`
+                if self.linger > 0:
+                    feed.expiry = asyncio.get_running_loop().call_later(self.linger, self._expire, feed)
+                else:
+                    self._expire(feed)
+
+    def _expire(self, feed: _ThreadFeed) -> None:
+        feed.expiry = None
+        if feed.subscribers or self._feeds.get(feed.thread_id) is not feed:
+            return
+        del self._feeds[feed.thread_id]
+        if feed.task is not None:
+            feed.task.cancel()
+
+    async def wait(self, thread_id: Union[UUID, str], timeout: float, after: Optional[str] = None) -> bool:
+        """
+        Espera hasta `timeout` segundos algún evento en el hilo (long-poll).
+        Comparte el poller del hilo con los streams abiertos; devuelve True
+        si hubo un evento.
+
+        `after` es el mensaje más reciente que tiene el cliente: si el hilo
+        ya tiene uno posterior (aunque el feed lo haya conocido en su primer
+        poll, como historia) devuelve True sin esperar.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        async with self.subscribe(thread_id) as subscription:
+            try:
+                if after is not None:
+                    feed = self._feeds[str(thread_id)]
+                    if await asyncio.wait_for(self._has_newer(feed, after), timeout):
+                        return True
+                await asyncio.wait_for(subscription.queue.get(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                return False
+            return True
+
+    async def _has_newer(self, feed: _ThreadFeed, after: str) -> bool:
+        await feed.ready.wait()
+        newer = feed.newer_than(after)
+        if newer is not None:
+            return newer
+        # el feed no conoce `after`: es más antiguo que todo lo visto o el
+        # poll va atrasado; decide el mensaje más reciente del MS
+        newest = await self._newest(feed)
+        return newest is not None and newest != after
+
+    async def _newest(self, feed: _ThreadFeed) -> Optional[str]:
+        """Id del mensaje más reciente del hilo; una consulta a la vez por hilo."""
+        if feed.newest is None or feed.newest.done():
+            feed.newest = asyncio.ensure_future(self._fetch_newest(feed.thread_id))
+        return await asyncio.shield(feed.newest)
+
+    async def _fetch_newest(self, thread_id: str) -> Optional[str]:
+        page = await mensajes_client.list_messages(thread_id=thread_id, limit=1)
+        self.stats.newest_checks += 1
+        return str(page.items[0].id) if page.items else None
+
+    def _fan_out(self, feed: _ThreadFeed, event: StreamEvent) -> None:
+        for subscription in list(feed.subscribers):
+            if subscription.offer(event):
+                self.stats.delivered += 1
+            else:
+                self.stats.dropped_subscribers += 1
+
+    def publish(self, thread_id: Union[UUID, str], event: str, message: Union[MessageOut, dict]) -> None:
+        """
+        Publica una escritura hecha a través del gateway. No bloquea: si nadie
+        sigue el hilo no hace nada.
+        """
+        feed = self._feeds.get(str(thread_id))
+        if feed is None:
+            return
+        message_id = str(message.id if isinstance(message, MessageOut) else message["id"])
+        if event == MESSAGE_CREATED:
+            if feed.seen(message_id):
+                return
+            feed.mark_seen(message_id)
+        self.stats.pushed_messages += 1
+        self._fan_out(feed, StreamEvent(event=event, id=message_id, data=dumps(message)))
+
+    async def _poll(self, feed: _ThreadFeed) -> None:
+        fresh: List[MessageOut] = []
+        cursor: Optional[str] = None
+        for _ in range(self.max_pages):
+            page = await mensajes_client.list_messages(
+                thread_id=feed.thread_id,
+                limit=self.page_size,
+                cursor=cursor,
+            )
+            new = [m for m in page.items if not feed.seen(str(m.id))]
+            fresh.extend(new)
+            # si toda la página era nueva, puede haber más en la siguiente
+            if not feed.primed or len(new) < len(page.items) or not page.has_more or not page.next_cursor:
+                break
+            cursor = page.next_cursor
+        self.stats.polls += 1
+
+        if self._unresolved.get(feed.thread_id):
+            # puede haber un mensaje especulativo sin id conocido: se espera
+            # al próximo poll (lo nuevo no se marca como visto)
+            return
+        held = self._held.get(feed.thread_id, ())
+        fresh = [m for m in fresh if str(m.id) not in held]
+        fresh.sort(key=lambda m: m.created_at.timestamp() if m.created_at else 0.0)
+
+        if not feed.primed:
+            # primer poll: lo existente es historia, no se emite (los
+            # long-polls con `after` lo comparan con `newer_than`)
+            for message in fresh:
+                feed.mark_seen(str(message.id))
+            feed.primed = True
+            return
+
+        for message in fresh:
+            message_id = str(message.id)
+            if feed.seen(message_id):  # publicado por el gateway durante el poll
+                continue
+            feed.mark_seen(message_id)
+            self.stats.polled_messages += 1
+            self._fan_out(feed, StreamEvent(event=MESSAGE_CREATED, id=message_id, data=dumps(message)))
+
+    async def _run(self, feed: _ThreadFeed) -> None:
+        while True:
+            try:
+                await self._poll(feed)
+            except Exception as e:  # el poller no debe morir por un poll fallido
+                self.stats.poll_errors += 1
+                logger.warning("Error al consultar mensajes del hilo %s: %r", feed.thread_id, e)
+            feed.ready.set()
+            await asyncio.sleep(self.poll_interval)
+
+    async def close(self) -> None:
+        """Detiene todos los pollers (shutdown)."""
+        feeds, self._feeds = list(self._feeds.values()), {}
+        for feed in feeds:
+            if feed.expiry is not None:
+                feed.expiry.cancel()
+            if feed.task is not None:
+                feed.task.cancel()
+        await asyncio.gather(*(f.task for f in feeds if f.task is not None), return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        return {
+            "threads": len(self._feeds),
+            "held": sum(len(ids) for ids in self._held.values()),
+            "subscribers": sum(len(feed.subscribers) for feed in self._feeds.values()),
+            "polls": self.stats.polls,
+            "poll_errors": self.stats.poll_errors,
+            "polled_messages": self.stats.polled_messages,
+            "pushed_messages": self.stats.pushed_messages,
+            "delivered": self.stats.delivered,
+            "dropped_subscribers": self.stats.dropped_subscribers,
+            "newest_checks": self.stats.newest_checks,
+        }
+
+
+message_stream = MessageStreamHub(
+    poll_interval=settings.messages_stream_poll_interval,
+    page_size=settings.messages_stream_page_size,
+    max_pages=settings.messages_stream_max_pages,
+    queue_size=settings.messages_stream_queue_size,
+    linger=settings.messages_stream_linger,
+)
@@ -0,0 +1,127 @@
+"""
+Análisis de textos (POST /analyze) con caché y en lote.
+
+/analyze no aplica strikes ni bans, así que su resultado depende solo del
+texto, el idioma y la lista negra. Con MODERATION_ANALYZE_CACHE_TTL > 0 se
+cachea por (texto, idioma) durante ese número de segundos (por defecto no
+se cachea: un cambio de la lista negra hecho sin pasar por el gateway, o
+del modelo del MS, no se vería hasta que expire). La caché se vacía cuando
+la lista negra cambia a través del gateway, y un análisis que estaba en
+curso en ese momento no se guarda.
+
+`analyze_many` resuelve un lote: agrupa los textos repetidos, responde lo
+cacheado y lo que el prefiltro de lista negra da por limpio (ver
+moderacion.blacklist), y envía el resto al MS con concurrencia acotada.
+Los resultados salen en el orden de entrada.
+"""
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.core.cache import TTLCache
+from app.core.concurrency import gather_limited
+from app.core.config import settings
+from app.core.upstream import translate_httpx_error
+from app.services.moderacion import client as moderacion_client
+from app.services.moderacion.blacklist import blacklist_mirror, clean_analysis
+from app.services.moderacion.schemas import AnalyzeTextRequest, AnalyzeTextResponse
+
+logger = logging.getLogger(__name__)
+
+AnalysisKey = Tuple[bytes, Optional[str]]
+
+
+def _key(payload: AnalyzeTextRequest) -> AnalysisKey:
+    # un digest en vez del texto: la caché no guarda textos largos como llaves
+    return hashlib.blake2b(payload.text.encode(), digest_size=16).digest(), payload.language
+
+
+class AnalysisCache:
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.enabled = ttl > 0
+        self._entries: TTLCache[AnalyzeTextResponse] = TTLCache(max_entries=max_entries, ttl=ttl)
+        # sube con cada clear(): un análisis pedido antes no se guarda
+        self.version = 0
+
+    def get(self, key: AnalysisKey) -> Optional[AnalyzeTextResponse]:
+        return self._entries.get(key) if self.enabled else None
+
+    def put(self, key: AnalysisKey, result: AnalyzeTextResponse, version: int) -> None:
+        """Guarda un análisis pedido cuando la caché estaba en `version`."""
+        if self.enabled and version == self.version:
+            self._entries.set(key, result)
+
+    def clear(self) -> None:
+        self.version += 1
+        self._entries.clear()
+
+
+analysis_cache = AnalysisCache(
+    ttl=settings.moderation_analyze_cache_ttl,
+    max_entries=settings.moderation_analyze_cache_max_entries,
+)
+
+
+def cached(payload: AnalyzeTextRequest) -> Optional[AnalyzeTextResponse]:
+    return analysis_cache.get(_key(payload))
+
+
+def remember(payload: AnalyzeTextRequest, result: AnalyzeTextResponse, version: int) -> None:
+    analysis_cache.put(_key(payload), result, version)
+
+
+@dataclass
+class Analysis:
+    status_code: int
+    result: Optional[AnalyzeTextResponse] = None
+    error: Optional[str] = None
+    source: Optional[str] = None    # "cache", "prefilter" o "service"
+
+
+async def _analyze(key: AnalysisKey, payload: AnalyzeTextRequest) -> Analysis:
+    version = analysis_cache.version
+    try:
+        result = await moderacion_client.analyze_text(payload)
+    except httpx.HTTPError as e:
+        error = translate_httpx_error(e, "Error al analizar el texto")
+        return Analysis(error.status_code, error=error.detail)
+    except Exception:
+        # una respuesta inválida falla solo este texto, no el lote
+        logger.exception("Respuesta inesperada del servicio de moderación en /analyze")
+        return Analysis(502, error="Respuesta inválida del servicio de moderación")
+    analysis_cache.put(key, result, version)
+    return Analysis(200, result=result, source="service")
+
+
+async def analyze_many(items: Sequence[AnalyzeTextRequest], concurrency: int) -> Tuple[List[Analysis], int]:
+    """
+    Un Analysis por item, en el mismo orden. También devuelve cuántos
+    textos distintos había en el lote.
+    """
+    keys = [_key(item) for item in items]
+    unique: Dict[AnalysisKey, AnalyzeTextRequest] = {}
+    for key, item in zip(keys, items):
+        unique.setdefault(key, item)
+
+    answers: Dict[AnalysisKey, Analysis] = {}
+    pending: List[Tuple[AnalysisKey, AnalyzeTextRequest]] = []
+    prefilter = settings.moderation_prefilter_enabled
+    for key, payload in unique.items():
+        hit = analysis_cache.get(key)
+        if hit is not None:
+            answers[key] = Analysis(200, result=hit, source="cache")
+        elif prefilter and blacklist_mirror.check(payload.text):
+            answers[key] = Analysis(200, result=clean_analysis(payload), source="prefilter")
+        else:
+            pending.append((key, payload))
+
+    results = await gather_limited(
+        (lambda key=key, payload=payload: _analyze(key, payload) for key, payload in pending),
+        limit=concurrency,
+    )
+    for (key, _), analysis in zip(pending, results):
+        answers[key] = analysis
+    return [answers[key] for key in keys], len(unique)
@@ -0,0 +1,293 @@
+"""
+Espejo de la lista negra del MS de moderación para prefiltrar textos.
+
+La mayoría de los textos no contiene ninguna palabra de la lista negra. Con
+MODERATION_PREFILTER_ENABLED el gateway mantiene una copia de las palabras
+activas (paginando GET /words) compilada en un autómata Aho-Corasick, que
+encuentra cualquiera de ellas en una sola pasada por el texto sin importar
+cuántas sean. Un texto sin coincidencias se responde sin llamar al MS; uno
+con coincidencias se reenvía igual que antes.
+
+Para no dejar pasar algo que el MS sí detectaría, la búsqueda es más
+amplia que la del MS: compara por subcadena (no por palabra completa)
+sobre el texto sin mayúsculas, tildes ni espacios repetidos, y las
+palabras con is_regex se prueban con `re` sobre el texto original y el
+normalizado. Aun así el fast path omite el puntaje del modelo de
+toxicidad del MS, por eso es opcional.
+
+La copia se recarga cada MODERATION_BLACKLIST_REFRESH_INTERVAL segundos y
+cuando la lista cambia a través del gateway (add_word, delete_word,
+refresh-cache). Mientras se recarga después de un cambio, o si la copia
+es más vieja que dos intervalos, todo se reenvía al MS.
+"""
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+from app.core.config import settings
+from app.services.moderacion import client as moderacion_client
+from app.services.moderacion.schemas import AnalyzeTextRequest, AnalyzeTextResponse, WordResponse
+
+logger = logging.getLogger(__name__)
+
+_COMBINING = re.compile(r"[\u0300-\u036f]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes ni diacríticos y con los espacios colapsados."""
+    if text.isascii():
+        text = text.lower()  # sin diacríticos que quitar
+    else:
+        text = _COMBINING.sub("", unicodedata.normalize("NFKD", text.casefold()))
+    return _SPACES.sub(" ", text)
+
+
+class AhoCorasick:
+    """
+    Autómata de búsqueda de múltiples patrones (Aho-Corasick).
+
+    Cada nodo es un dict carácter -> nodo; `fail` apunta al sufijo propio
+    más largo que también es prefijo de algún patrón y `out` guarda los
+    patrones que terminan en el nodo (incluidos los que llegan por `fail`).
+    Buscar cuesta O(largo del texto + coincidencias).
+    """
+
+    __slots__ = ("goto", "fail", "out", "patterns")
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: List[str] = sorted({p for p in patterns if p})
+        self.goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = self.goto[node][char] = len(self.goto)
+                    self.goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(index)
+
+        # BFS: el fail de un nodo depende de nodos menos profundos
+        self.fail: List[int] = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                out[child].extend(out[self.fail[child]])
+        self.out: List[Tuple[int, ...]] = [tuple(o) for o in out]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def search(self, text: str) -> Optional[str]:
+        """Primer patrón encontrado en `text` (o None)."""
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                return self.patterns[out[node][0]]
+        return None
+
+    def find_all(self, text: str) -> List[str]:
+        """Todos los patrones distintos presentes en `text`, en orden de aparición."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found: Dict[str, None] = {}
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in out[node]:
+                found.setdefault(self.patterns[index])
+        return list(found)
+
+
+class BlacklistMatcher:
+    """Palabras literales en un Aho-Corasick y las expresiones regulares aparte."""
+
+    def __init__(self, words: Iterable[WordResponse]) -> None:
+        literals: List[str] = []
+        self.regexes: List[Pattern[str]] = []
+        for word in words:
+            if not word.is_active:
+                continue
+            if word.is_regex:
+                # ValueError si el MS tiene un patrón que `re` no entiende
+                try:
+                    self.regexes.append(re.compile(word.word, re.IGNORECASE))
+                except re.error as e:
+                    raise ValueError(f"Patrón de la lista negra no compilable: {word.word!r}") from e
+            else:
+                literals.append(normalize(word.word).strip())
+        self.automaton = AhoCorasick(literals)
+
+    def search(self, text: str) -> Optional[str]:
+        normalized = normalize(text)
+        hit = self.automaton.search(normalized)
+        if hit is not None:
+            return hit
+        for regex in self.regexes:
+            if regex.search(text) or regex.search(normalized):
+                return regex.pattern
+        return None
+
+
+def clean_analysis(payload: AnalyzeTextRequest) -> AnalyzeTextResponse:
+    """Respuesta de /analyze para un texto que el prefiltro dejó pasar."""
+    return AnalyzeTextResponse(
+        is_toxic=False,
+        toxicity_score=0.0,
+        severity="none",
+        language=payload.language or "unknown",
+        detected_words=[],
+        categories=[],
+        detoxify_scores={},
+    )
+
+
+@dataclass
+class BlacklistStats:
+    checks: int = 0
+    clean: int = 0          # respondidos sin llamar al MS
+    hits: int = 0           # con coincidencias: se reenvían
+    unready: int = 0        # sin copia vigente: se reenvían
+    loads: int = 0
+    load_errors: int = 0
+
+
+class BlacklistMirror:
+    def __init__(self, refresh_interval: float, page_size: int) -> None:
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        self.matcher: Optional[BlacklistMatcher] = None
+        self.loaded_at = 0.0
+        self.stats = BlacklistStats()
+        self._task: Optional[asyncio.Task] = None
+        self._reload: Optional[asyncio.Task] = None
+        # cambia en cada invalidate(): una carga que empezó antes se descarta
+        self._generation = 0
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self.matcher is not None
+            and time.monotonic() - self.loaded_at < 2 * self.refresh_interval
+        )
+
+    async def _fetch_words(self) -> List[WordResponse]:
+        words: List[WordResponse] = []
+        skip = 0
+        while True:
+            page = await moderacion_client.list_words(limit=self.page_size, skip=skip)
+            words.extend(page.words)
+            skip += len(page.words)
+            if not page.words or skip >= page.total:
+                return words
+
+    async def load(self) -> None:
+        started = time.monotonic()
+        generation = self._generation
+        words = await self._fetch_words()
+        matcher = BlacklistMatcher(words)
+        if generation != self._generation:
+            return  # la lista cambió mientras se leía; la recarga nueva la trae
+        self.matcher = matcher
+        # vigente desde que se empezó a leer
+        self.loaded_at = started
+        self.stats.loads += 1
+        logger.info(
+            "Lista negra cargada: %d palabras, %d expresiones regulares",
+            len(self.matcher.automaton), len(self.matcher.regexes),
+        )
+
+    async def _load_logged(self) -> None:
+        try:
+            await self.load()
+        except Exception:
+            self.stats.load_errors += 1
+            logger.exception("Error al cargar la lista negra de moderación")
+
+    def invalidate(self) -> None:
+        """La lista cambió en el MS: no usar la copia hasta recargarla."""
+        self.matcher = None
+        self._generation += 1
+        if self._task is None:
+            return  # prefiltro desactivado
+        if self._reload is not None and not self._reload.done():
+            self._reload.cancel()
+        self._reload = asyncio.create_task(self._load_logged())
+
+    def check(self, text: str) -> Optional[bool]:
+        """
+        True si el texto no tiene nada de la lista negra, False si tiene
+        alguna coincidencia, None si no hay copia vigente.
+        """
+        self.stats.checks += 1
+        matcher = self.matcher
+        if matcher is None or not self.ready:
+            self.stats.unready += 1
+            return None
+        hit = matcher.search(text)
+        if hit is None:
+            self.stats.clean += 1
+            return True
+        self.stats.hits += 1
+        return False
+
+    async def _run(self) -> None:
+        while True:
+            await self._load_logged()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._reload):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._reload = None
+
+    def snapshot(self) -> dict:
+        matcher = self.matcher
+        stats = self.stats
+        return {
+            "ready": self.ready,
+            "words": len(matcher.automaton) if matcher else 0,
+            "regexes": len(matcher.regexes) if matcher else 0,
+            "age_s": round(time.monotonic() - self.loaded_at, 1) if matcher else None,
+            "checks": stats.checks,
+            "clean": stats.clean,
+            "hits": stats.hits,
+            "unready": stats.unready,
+            "loads": stats.loads,
+            "load_errors": stats.load_errors,
+        }
+
+
+blacklist_mirror = BlacklistMirror(
+    refresh_interval=settings.moderation_blacklist_refresh_interval,
+    page_size=settings.moderation_blacklist_page_size,
+)
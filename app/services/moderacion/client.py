@@ -1,8 +1,7 @@
 from typing import Optional
 
-import httpx
-
 from app.core.config import settings
+from app.core.upstream import get_client
 from app.services.moderacion.schemas import (
     ModerateMessageRequest,
     ModerateMessageResponse,
@@ -37,20 +36,20 @@ async def moderate_message(
     payload: ModerateMessageRequest,
 ) -> ModerateMessageResponse:
     url = f"{MODERATION_BASE}/check"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=payload.dict())
-        resp.raise_for_status()
-        return ModerateMessageResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, json=payload.dict())
+    resp.raise_for_status()
+    return ModerateMessageResponse.model_validate_json(resp.content)
 
 
 async def analyze_text(
     payload: AnalyzeTextRequest,
 ) -> AnalyzeTextResponse:
     url = f"{MODERATION_BASE}/analyze"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=payload.dict())
-        resp.raise_for_status()
-        return AnalyzeTextResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, json=payload.dict())
+    resp.raise_for_status()
+    return AnalyzeTextResponse.model_validate_json(resp.content)
 
 
 async def get_status(
@@ -58,10 +57,10 @@ async def get_status(
     channel_id: str,
 ) -> ModerationStatusResponse:
     url = f"{MODERATION_BASE}/status/{user_id}/{channel_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return ModerationStatusResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return ModerationStatusResponse.model_validate_json(resp.content)
 
 
 # --- PALABRAS (BLACKLIST) ---
@@ -72,10 +71,10 @@ async def add_word(
 ) -> SuccessResponse:
     url = f"{BLACKLIST_BASE}/words"
     headers = _api_key_header(api_key)
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=payload.dict(), headers=headers)
-        resp.raise_for_status()
-        return SuccessResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, json=payload.dict(), headers=headers)
+    resp.raise_for_status()
+    return SuccessResponse.model_validate_json(resp.content)
 
 
 async def list_words(
@@ -97,10 +96,10 @@ async def list_words(
     if severity is not None:
         params["severity"] = severity
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, params=params)
-        resp.raise_for_status()
-        return BlacklistWordsResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url, params=params)
+    resp.raise_for_status()
+    return BlacklistWordsResponse.model_validate_json(resp.content)
 
 
 async def delete_word(
@@ -109,27 +108,27 @@ async def delete_word(
 ) -> SuccessResponse:
     url = f"{BLACKLIST_BASE}/words/{word_id}"
     headers = _api_key_header(api_key)
-    async with httpx.AsyncClient() as client:
-        resp = await client.delete(url, headers=headers)
-        resp.raise_for_status()
-        return SuccessResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.delete(url, headers=headers)
+    resp.raise_for_status()
+    return SuccessResponse.model_validate_json(resp.content)
 
 
 async def get_blacklist_stats() -> BlacklistStatsResponse:
     url = f"{BLACKLIST_BASE}/stats"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return BlacklistStatsResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return BlacklistStatsResponse.model_validate_json(resp.content)
 
 
 async def refresh_cache(api_key: str) -> SuccessResponse:
     url = f"{BLACKLIST_BASE}/refresh-cache"
     headers = _api_key_header(api_key)
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, headers=headers)
-        resp.raise_for_status()
-        return SuccessResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, headers=headers)
+    resp.raise_for_status()
+    return SuccessResponse.model_validate_json(resp.content)
 
 
 # --- BANS Y VIOLACIONES ---
@@ -144,10 +143,10 @@ async def get_banned_users(
     if channel_id is not None:
         params["channel_id"] = channel_id
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers, params=params)
-        resp.raise_for_status()
-        return BannedUsersResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url, headers=headers, params=params)
+    resp.raise_for_status()
+    return BannedUsersResponse.model_validate_json(resp.content)
 
 
 async def get_user_violations(
@@ -160,10 +159,10 @@ async def get_user_violations(
     headers = _api_key_header(api_key)
     params = {"channel_id": channel_id, "limit": limit}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers, params=params)
-        resp.raise_for_status()
-        return UserViolationsResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url, headers=headers, params=params)
+    resp.raise_for_status()
+    return UserViolationsResponse.model_validate_json(resp.content)
 
 
 async def unban_user(
@@ -174,10 +173,10 @@ async def unban_user(
     url = f"{ADMIN_BASE}/users/{user_id}/unban"
     headers = _api_key_header(api_key)
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.put(url, headers=headers, json=payload.dict())
-        resp.raise_for_status()
-        return SuccessResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.put(url, headers=headers, json=payload.dict())
+    resp.raise_for_status()
+    return SuccessResponse.model_validate_json(resp.content)
 
 
 async def get_user_status(
@@ -189,10 +188,10 @@ async def get_user_status(
     headers = _api_key_header(api_key)
     params = {"channel_id": channel_id}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers, params=params)
-        resp.raise_for_status()
-        return UserStatusResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url, headers=headers, params=params)
+    resp.raise_for_status()
+    return UserStatusResponse.model_validate_json(resp.content)
 
 
 async def reset_strikes(
@@ -204,10 +203,10 @@ async def reset_strikes(
     headers = _api_key_header(api_key)
     params = {"channel_id": channel_id}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, headers=headers, params=params)
-        resp.raise_for_status()
-        return SuccessResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, headers=headers, params=params)
+    resp.raise_for_status()
+    return SuccessResponse.model_validate_json(resp.content)
 
 
 async def get_channel_stats(
@@ -217,17 +216,17 @@ async def get_channel_stats(
     url = f"{ADMIN_BASE}/channels/{channel_id}/stats"
     headers = _api_key_header(api_key)
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers)
-        resp.raise_for_status()
-        return ChannelStatsResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url, headers=headers)
+    resp.raise_for_status()
+    return ChannelStatsResponse.model_validate_json(resp.content)
 
 
 async def expire_bans(api_key: str) -> SuccessResponse:
     url = f"{ADMIN_BASE}/maintenance/expire-bans"
     headers = _api_key_header(api_key)
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, headers=headers)
-        resp.raise_for_status()
-        return SuccessResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, headers=headers)
+    resp.raise_for_status()
+    return SuccessResponse.model_validate_json(resp.content)
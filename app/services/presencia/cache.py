@@ -0,0 +1,142 @@
+"""
+Caché local de presencia por usuario.
+
+Guarda la presencia más relevante de cada usuario (ver `more_relevant`) por
+PRESENCE_CACHE_TTL segundos. También recuerda por el mismo tiempo los
+usuarios que el MS no conoce, para no volver a preguntar por ellos en cada
+render de una lista de miembros.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.core.cache import TTLCache
+from app.core.concurrency import gather_limited
+from app.core.config import settings
+from app.services.presencia import client as presencia_client
+from app.services.presencia.schemas import StatusEnum, UserPresence
+
+_MISSING = object()
+
+
+def more_relevant(candidate: UserPresence, current: Optional[UserPresence]) -> bool:
+    """
+    True si `candidate` describe mejor al usuario que `current` cuando tiene
+    varias sesiones (dispositivos): online antes que offline y, entre
+    iguales, la de lastSeen más reciente.
+    """
+    if current is None:
+        return True
+    return (candidate.status == StatusEnum.online, candidate.lastSeen) > (
+        current.status == StatusEnum.online,
+        current.lastSeen,
+    )
+
+
+def best_by_user(presences: Iterable[UserPresence]) -> Dict[str, UserPresence]:
+    by_user: Dict[str, UserPresence] = {}
+    for presence in presences:
+        if more_relevant(presence, by_user.get(presence.userId)):
+            by_user[presence.userId] = presence
+    return by_user
+
+
+class PresenceCache:
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        # userId -> UserPresence, o None si el MS no conoce al usuario
+        self._entries: TTLCache[Optional[UserPresence]] = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    @property
+    def hits(self) -> int:
+        return self._entries.hits
+
+    @property
+    def misses(self) -> int:
+        return self._entries.misses
+
+    def lookup(self, user_ids: Iterable[str]) -> Tuple[Dict[str, Optional[UserPresence]], List[str]]:
+        """Devuelve (encontrados, faltantes). Un encontrado puede ser None (usuario desconocido)."""
+        found: Dict[str, Optional[UserPresence]] = {}
+        misses: List[str] = []
+        for user_id in user_ids:
+            entry = self._entries.get(user_id, _MISSING)
+            if entry is _MISSING:
+                misses.append(user_id)
+            else:
+                found[user_id] = entry
+        return found, misses
+
+    def put(self, presence: UserPresence) -> None:
+        self._entries.set(presence.userId, presence)
+
+    def put_unknown(self, user_id: str) -> None:
+        self._entries.set(user_id, None)
+
+    def put_all(self, presences: Iterable[UserPresence], requested: Iterable[str] = ()) -> Dict[str, UserPresence]:
+        """
+        Carga un listado completo del MS. Los `requested` que no aparecen en
+        el listado quedan marcados como desconocidos.
+        """
+        by_user = best_by_user(presences)
+        for presence in by_user.values():
+            self.put(presence)
+        for user_id in requested:
+            if user_id not in by_user:
+                self.put_unknown(user_id)
+        return by_user
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id)
+
+
+presence_cache = PresenceCache(
+    ttl=settings.presence_cache_ttl,
+    max_entries=settings.presence_cache_max_entries,
+)
+
+
+async def resolve_presence(user_ids: List[str]) -> Tuple[Dict[str, Optional[UserPresence]], List[str]]:
+    """
+    Presencia de `user_ids` desde la caché, completando los faltantes con el
+    MS: consultas individuales en paralelo (acotadas) o, desde
+    PRESENCE_BULK_LIST_THRESHOLD faltantes, un único listado completo.
+
+    Devuelve (presencias, no_resueltos). Una presencia None indica que el
+    MS no conoce al usuario; los no resueltos son usuarios cuya consulta
+    individual falló. Si falla el listado completo se propaga el error httpx.
+    """
+    found, misses = presence_cache.lookup(user_ids)
+    unresolved: List[str] = []
+
+    if len(misses) >= settings.presence_bulk_list_threshold:
+        listing = await presencia_client.list_presence()
+        by_user = presence_cache.put_all(listing.data.users, requested=misses)
+        for user_id in misses:
+            found[user_id] = by_user.get(user_id)
+
+    elif misses:
+        async def fetch(user_id: str) -> Optional[UserPresence]:
+            try:
+                presence = (await presencia_client.get_user_presence(user_id=user_id)).data
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404:
+                    raise
+                presence_cache.put_unknown(user_id)
+                return None
+            presence_cache.put(presence)
+            return presence
+
+        results = await gather_limited(
+            (lambda user_id=user_id: fetch(user_id) for user_id in misses),
+            limit=settings.presence_bulk_concurrency,
+            return_exceptions=True,
+        )
+        for user_id, result in zip(misses, results):
+            if isinstance(result, httpx.HTTPError):
+                unresolved.append(user_id)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                found[user_id] = result
+
+    return found, unresolved
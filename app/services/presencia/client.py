@@ -1,8 +1,7 @@
 from typing import Optional
 
-import httpx
-
 from app.core.config import settings
+from app.core.upstream import get_client
 from app.services.presencia.schemas import (
     HealthResponse,
     PresenceCreateResponse,
@@ -21,48 +20,58 @@ PRESENCE_BASE = f"{BASE_URL}/api/v1.0.0/presence"
 
 async def health() -> HealthResponse:
     url = f"{PRESENCE_BASE}/health"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return HealthResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return HealthResponse.model_validate_json(resp.content)
 
 
 async def connect_user(payload: UserConnection) -> PresenceCreateResponse:
     url = PRESENCE_BASE
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=payload.dict())
-        resp.raise_for_status()
-        return PresenceCreateResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, json=payload.dict())
+    resp.raise_for_status()
+    return PresenceCreateResponse.model_validate_json(resp.content)
 
 
 async def list_presence(
     status: Optional[StatusEnum] = None,
 ) -> PresenceListResponse:
+    raw = await list_presence_raw(status=status)
+    return PresenceListResponse.model_validate_json(raw)
+
+
+async def list_presence_raw(
+    status: Optional[StatusEnum] = None,
+) -> bytes:
+    """
+    Igual que list_presence, pero devuelve el JSON del MS sin parsear.
+    """
     url = PRESENCE_BASE
     params = {}
     if status is not None:
         params["status"] = status.value
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, params=params)
-        resp.raise_for_status()
-        return PresenceListResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url, params=params)
+    resp.raise_for_status()
+    return resp.content
 
 
 async def get_stats() -> PresenceStatsResponse:
     url = f"{PRESENCE_BASE}/stats"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return PresenceStatsResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return PresenceStatsResponse.model_validate_json(resp.content)
 
 
 async def get_user_presence(user_id: str) -> SinglePresenceResponse:
     url = f"{PRESENCE_BASE}/{user_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        return SinglePresenceResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return SinglePresenceResponse.model_validate_json(resp.content)
 
 
 async def update_user_presence(
@@ -70,15 +79,15 @@ async def update_user_presence(
     payload: StatusUpdateRequest,
 ) -> SimpleResponse:
     url = f"{PRESENCE_BASE}/{user_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.patch(url, json=payload.dict(exclude_unset=True))
-        resp.raise_for_status()
-        return SimpleResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.patch(url, json=payload.dict(exclude_unset=True))
+    resp.raise_for_status()
+    return SimpleResponse.model_validate_json(resp.content)
 
 
 async def delete_user_presence(user_id: str) -> SimpleResponse:
     url = f"{PRESENCE_BASE}/{user_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.delete(url)
-        resp.raise_for_status()
-        return SimpleResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.delete(url)
+    resp.raise_for_status()
+    return SimpleResponse.model_validate_json(resp.content)
@@ -0,0 +1,144 @@
+"""
+Agregador write-behind de heartbeats de presencia.
+
+Los clientes envían heartbeats cada pocos segundos. En vez de reenviar cada
+uno al MS de presencia, el gateway los confirma de inmediato, guarda solo el
+último por usuario y cada PRESENCE_HEARTBEAT_FLUSH_INTERVAL segundos envía
+un único heartbeat por usuario activo. Los cambios de estado (online /
+offline) no pasan por aquí: se envían al MS en el momento.
+
+El intervalo debe ser menor que el tiempo tras el cual el MS considera
+offline a un usuario sin heartbeats.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+from app.core.concurrency import gather_limited
+from app.core.config import settings
+from app.services.presencia import client as presencia_client
+from app.services.presencia.schemas import StatusUpdateRequest
+
+logger = logging.getLogger(__name__)
+
+_HEARTBEAT = StatusUpdateRequest(heartbeat=True)
+
+
+@dataclass
+class HeartbeatStats:
+    received: int = 0       # heartbeats recibidos de los clientes
+    forwarded: int = 0      # heartbeats enviados al MS
+    failed: int = 0         # envíos al MS que fallaron (se reintentan en el siguiente flush)
+    flushes: int = 0
+
+    def snapshot(self, pending: int) -> dict:
+        return {
+            "received": self.received,
+            "forwarded": self.forwarded,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "pending": pending,
+            # heartbeats recibidos por cada llamada al MS
+            "coalescing_ratio": round(self.received / self.forwarded, 2) if self.forwarded else 0.0,
+        }
+
+
+class HeartbeatAggregator:
+    def __init__(self, interval: float, concurrency: int) -> None:
+        self.interval = interval
+        self.concurrency = concurrency
+        # userId -> momento (time.time) del último heartbeat aún no enviado
+        self._pending: Dict[str, float] = {}
+        # usuarios descartados durante el flush en curso (None si no hay flush)
+        self._discarded: Optional[Set[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = HeartbeatStats()
+
+    def record(self, user_id: str) -> float:
+        """Registra un heartbeat; devuelve su timestamp."""
+        seen_at = time.time()
+        self._pending[user_id] = seen_at
+        self.stats.received += 1
+        return seen_at
+
+    def discard(self, user_id: str) -> None:
+        """
+        Descarta el heartbeat pendiente de un usuario (ej: pasó a offline o se
+        eliminó su presencia), para que un flush posterior no lo reviva.
+        """
+        self._pending.pop(user_id, None)
+        if self._discarded is not None:
+            # su heartbeat puede estar en el lote en curso: no reencolarlo si falla
+            self._discarded.add(user_id)
+
+    async def flush(self) -> int:
+        """Envía al MS un heartbeat por cada usuario pendiente; devuelve cuántos."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        user_ids: List[str] = list(batch)
+
+        discarded = self._discarded = set()
+        try:
+            results = await gather_limited(
+                (
+                    lambda user_id=user_id: presencia_client.update_user_presence(user_id=user_id, payload=_HEARTBEAT)
+                    for user_id in user_ids
+                ),
+                limit=self.concurrency,
+                return_exceptions=True,
+            )
+        finally:
+            self._discarded = None
+
+        self.stats.flushes += 1
+        for user_id, result in zip(user_ids, results):
+            if isinstance(result, httpx.HTTPStatusError) and result.response.status_code == 404:
+                # el MS ya no conoce al usuario: no tiene sentido reintentar
+                self.stats.failed += 1
+            elif isinstance(result, BaseException):
+                self.stats.failed += 1
+                # se reintenta en el próximo flush, salvo que ya llegó uno más
+                # nuevo o que el usuario se descartó mientras se enviaba
+                if user_id not in discarded:
+                    self._pending.setdefault(user_id, batch[user_id])
+                logger.warning("No se pudo enviar heartbeat de %s: %r", user_id, result)
+            else:
+                self.stats.forwarded += 1
+        return len(user_ids)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:  # el loop no debe morir por un flush fallido
+                logger.exception("Error al enviar heartbeats al servicio de presencia")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Detiene el loop y envía lo pendiente (shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def snapshot(self) -> dict:
+        return self.stats.snapshot(pending=len(self._pending))
+
+
+heartbeat_aggregator = HeartbeatAggregator(
+    interval=settings.presence_heartbeat_flush_interval,
+    concurrency=settings.presence_heartbeat_concurrency,
+)
@@ -0,0 +1,146 @@
+"""
+Hub de conexiones WebSocket de presencia.
+
+Mantiene, por pod, los sockets abiertos de cada usuario y quién observa a
+quién, para empujar los cambios de presencia a los observadores. Está
+pensado para muchos sockets mayormente inactivos: cada conexión es un
+objeto pequeño con __slots__ y no tiene tareas ni timers propios; solo se
+trabaja cuando llega un mensaje o hay un cambio que publicar.
+
+Los cambios llegan de los handlers de este pod y del índice de presencia
+(expiraciones por falta de heartbeats y correcciones del resync, que
+traen lo que pasó por otros pods). Se publican con `notify`, que no espera
+a los sockets: un observador lento no retrasa el request ni el loop que
+detectó el cambio.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from starlette.websockets import WebSocket
+
+from app.core.config import settings
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceConnection:
+    __slots__ = ("websocket", "user_id", "watching")
+
+    def __init__(self, websocket: WebSocket, user_id: str) -> None:
+        self.websocket = websocket
+        self.user_id = user_id
+        self.watching: Set[str] = set()
+
+    async def send(self, payload: bytes) -> None:
+        await self.websocket.send_text(payload.decode("utf-8"))
+
+
+class PresenceHub:
+    def __init__(self, max_watch: int, send_timeout: float) -> None:
+        self.max_watch = max_watch
+        self.send_timeout = send_timeout
+        # userId -> sockets abiertos de ese usuario (pestañas, dispositivos)
+        self._connections: Dict[str, Set[PresenceConnection]] = {}
+        # userId observado -> conexiones que lo observan
+        self._watchers: Dict[str, Set[PresenceConnection]] = {}
+        # publicaciones en curso lanzadas por `notify`
+        self._publishing: Set[asyncio.Task] = set()
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(conns) for conns in self._connections.values())
+
+    def is_connected(self, user_id: str) -> bool:
+        return user_id in self._connections
+
+    def register(self, connection: PresenceConnection) -> bool:
+        """Agrega la conexión; True si es la primera del usuario en este pod."""
+        conns = self._connections.get(connection.user_id)
+        if conns is None:
+            conns = self._connections[connection.user_id] = set()
+        conns.add(connection)
+        return len(conns) == 1
+
+    def unregister(self, connection: PresenceConnection) -> bool:
+        """Quita la conexión; True si era la última del usuario en este pod."""
+        self.unwatch(connection, list(connection.watching))
+        conns = self._connections.get(connection.user_id)
+        if conns is None:
+            return False
+        conns.discard(connection)
+        if conns:
+            return False
+        del self._connections[connection.user_id]
+        return True
+
+    def watch(self, connection: PresenceConnection, user_ids: Iterable[str]) -> List[str]:
+        """Suscribe la conexión a los cambios de `user_ids`; devuelve los agregados."""
+        added = []
+        for user_id in user_ids:
+            if len(connection.watching) >= self.max_watch:
+                break
+            if user_id in connection.watching:
+                continue
+            connection.watching.add(user_id)
+            self._watchers.setdefault(user_id, set()).add(connection)
+            added.append(user_id)
+        return added
+
+    def unwatch(self, connection: PresenceConnection, user_ids: Iterable[str]) -> None:
+        for user_id in user_ids:
+            connection.watching.discard(user_id)
+            watchers = self._watchers.get(user_id)
+            if watchers is None:
+                continue
+            watchers.discard(connection)
+            if not watchers:
+                del self._watchers[user_id]
+
+    async def publish(self, user_id: str, status: str, last_seen: Optional[datetime] = None) -> int:
+        """
+        Envía el cambio de presencia de `user_id` a quienes lo observan en este
+        pod. Un observador lento o caído no bloquea a los demás.
+        """
+        watchers = self._watchers.get(user_id)
+        if not watchers:
+            return 0
+        payload = dumps({
+            "type": "presence",
+            "userId": user_id,
+            "status": status,
+            "lastSeen": last_seen or datetime.now(timezone.utc),
+        })
+        targets = list(watchers)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(conn.send(payload), self.send_timeout) for conn in targets),
+            return_exceptions=True,
+        )
+        for conn, result in zip(targets, results):
+            if isinstance(result, BaseException):
+                logger.debug("No se pudo notificar presencia a %s: %r", conn.user_id, result)
+        return len(targets)
+
+    def notify(self, user_id: str, status: str, last_seen: Optional[datetime] = None) -> None:
+        """`publish` en segundo plano; no hace nada si nadie observa al usuario."""
+        if user_id not in self._watchers:
+            return
+        task = asyncio.create_task(self.publish(user_id, status, last_seen))
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    def snapshot(self) -> dict:
+        return {
+            "users": len(self._connections),
+            "connections": self.connection_count,
+            "watched_users": len(self._watchers),
+            "publishing": len(self._publishing),
+        }
+
+
+presence_hub = PresenceHub(
+    max_watch=settings.presence_ws_max_watch,
+    send_timeout=settings.presence_ws_send_timeout,
+)
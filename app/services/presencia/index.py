@@ -0,0 +1,373 @@
+"""
+Índice local de presencia.
+
+Permite responder GET /presencia/stats y GET /presencia/?status=online sin
+pedirle al MS la lista completa de usuarios. Se alimenta del tráfico que
+pasa por el gateway (conexiones, heartbeats, cambios de estado, borrados) y
+cada PRESENCE_INDEX_RESYNC_INTERVAL segundos se compara con el listado del
+MS, que es la fuente de verdad: se registra la diferencia encontrada
+(drift) y se adopta el estado del MS.
+
+Guarda la presencia más relevante de cada usuario (ver cache.more_relevant)
+y un set con los userId online. Un usuario online sin heartbeats durante
+PRESENCE_INDEX_OFFLINE_AFTER segundos pasa a offline localmente; para eso
+se usa una rueda de tiempo (TimingWheel), que expira en O(1) por usuario en
+vez de recorrer todo el índice en cada tick.
+
+Con varias réplicas del gateway, cada una ve solo su propio tráfico: entre
+resyncs el índice puede desviarse, y ese desvío es lo que mide el drift.
+
+Los cambios que el índice detecta por su cuenta (expiraciones y usuarios
+que el resync pasa de online a offline o al revés) se avisan a `on_change`
+(el hub de WebSockets), porque no pasan por ningún handler.
+"""
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.presencia import client as presencia_client
+from app.services.presencia.cache import best_by_user
+from app.services.presencia.schemas import (
+    PresenceListData,
+    PresenceListResponse,
+    PresenceStatsData,
+    PresenceStatsResponse,
+    StatusEnum,
+    UserPresence,
+)
+
+logger = logging.getLogger(__name__)
+
+# (userId, estado, lastSeen): no debe bloquear
+OnChange = Callable[[str, str, Optional[datetime]], None]
+
+
+class TimingWheel:
+    """
+    Rueda de tiempo con `slots` casillas de `slot` segundos. Cada clave vive
+    en la casilla de su deadline; reprogramarla solo la cambia de casilla.
+    `advance` revisa únicamente las casillas por las que pasó el tiempo.
+    """
+
+    def __init__(self, slot: float, slots: int) -> None:
+        self.slot = slot
+        self._buckets: List[Set[str]] = [set() for _ in range(slots)]
+        # clave -> (casilla, deadline)
+        self._deadlines: Dict[str, Tuple[int, float]] = {}
+        self._tick: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def _bucket(self, tick: int) -> int:
+        return tick % len(self._buckets)
+
+    def schedule(self, key: str, deadline: float) -> None:
+        self.cancel(key)
+        index = self._bucket(math.floor(deadline / self.slot))
+        self._buckets[index].add(key)
+        self._deadlines[key] = (index, deadline)
+
+    def cancel(self, key: str) -> None:
+        entry = self._deadlines.pop(key, None)
+        if entry is not None:
+            self._buckets[entry[0]].discard(key)
+
+    def advance(self, now: float) -> List[str]:
+        """Quita y devuelve las claves cuyo deadline ya pasó."""
+        current = math.floor(now / self.slot)
+        if self._tick is None:
+            self._tick = current - len(self._buckets)
+        # la casilla de la última vuelta se revisa de nuevo: puede tener
+        # claves con deadline más adelante dentro del mismo tick. Si se atrasó
+        # más de una vuelta basta con revisar cada casilla una vez.
+        start = max(self._tick, current - len(self._buckets) + 1)
+        expired: List[str] = []
+        for tick in range(start, current + 1):
+            bucket = self._buckets[self._bucket(tick)]
+            for key in [k for k in bucket if self._deadlines[k][1] <= now]:
+                bucket.discard(key)
+                del self._deadlines[key]
+                expired.append(key)
+        self._tick = current
+        return expired
+
+    def clear(self) -> None:
+        for bucket in self._buckets:
+            bucket.clear()
+        self._deadlines.clear()
+
+
+@dataclass
+class DriftReport:
+    at: Optional[datetime] = None
+    status_mismatch: int = 0    # usuarios con estado distinto al del MS
+    missing_local: int = 0      # usuarios que el MS conoce y el índice no
+    missing_upstream: int = 0   # usuarios del índice que el MS ya no tiene
+    online_local: int = 0
+    online_upstream: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.status_mismatch + self.missing_local + self.missing_upstream
+
+
+@dataclass
+class IndexStats:
+    resyncs: int = 0
+    resync_errors: int = 0
+    expired: int = 0            # usuarios pasados a offline por falta de heartbeats
+    local_answers: int = 0      # stats / listados respondidos sin ir al MS
+    drift_total: int = 0        # suma del drift de todos los resyncs
+    last_drift: DriftReport = field(default_factory=DriftReport)
+
+
+class PresenceIndex:
+    def __init__(self, offline_after: float, slot: float, resync_interval: float) -> None:
+        self.offline_after = offline_after
+        self.resync_interval = resync_interval
+        self._records: Dict[str, UserPresence] = {}
+        self._online: Set[str] = set()
+        # usuarios online por tráfico local cuyo registro completo aún no se conoce
+        self._incomplete: Set[str] = set()
+        self._wheel = TimingWheel(slot=slot, slots=math.ceil(offline_after / slot) + 1)
+        self._ready = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats = IndexStats()
+        self.on_change: Optional[OnChange] = None
+
+    @property
+    def ready(self) -> bool:
+        """True después del primer resync exitoso."""
+        return self._ready
+
+    # --- tráfico local -------------------------------------------------
+
+    def _set_online(self, user_id: str, now: float) -> None:
+        self._online.add(user_id)
+        self._wheel.schedule(user_id, now + self.offline_after)
+
+    def _set_offline(self, user_id: str) -> None:
+        self._online.discard(user_id)
+        self._incomplete.discard(user_id)
+        self._wheel.cancel(user_id)
+
+    def _touch(self, user_id: str, status: StatusEnum, now: float) -> None:
+        record = self._records.get(user_id)
+        if record is not None:
+            self._records[user_id] = record.model_copy(update={
+                "status": status,
+                "lastSeen": datetime.fromtimestamp(now, timezone.utc),
+            })
+        elif status == StatusEnum.online:
+            self._incomplete.add(user_id)
+        if status == StatusEnum.online:
+            self._set_online(user_id, now)
+        else:
+            self._set_offline(user_id)
+
+    def heartbeat(self, user_id: str) -> None:
+        self._touch(user_id, StatusEnum.online, time.time())
+
+    def set_status(self, user_id: str, status: StatusEnum) -> None:
+        self._touch(user_id, status, time.time())
+
+    def upsert(self, presence: UserPresence) -> None:
+        """Registro completo visto en una respuesta del MS."""
+        self._records[presence.userId] = presence
+        self._incomplete.discard(presence.userId)
+        if presence.status == StatusEnum.online:
+            self._set_online(presence.userId, time.time())
+        else:
+            self._set_offline(presence.userId)
+
+    def load_online(self, presences: Iterable[UserPresence]) -> None:
+        """
+        Carga un listado de usuarios online del MS. Los usuarios sin registro
+        completo que no aparecen en él se dan por offline.
+        """
+        listed = best_by_user(presences)
+        for presence in listed.values():
+            self.upsert(presence)
+        for user_id in self._incomplete - listed.keys():
+            self._set_offline(user_id)
+
+    def remove(self, user_id: str) -> None:
+        self._records.pop(user_id, None)
+        self._set_offline(user_id)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Pasa a offline a los usuarios sin heartbeats; devuelve cuántos."""
+        expired = self._wheel.advance(time.time() if now is None else now)
+        for user_id in expired:
+            record = self._records.get(user_id)
+            if record is not None:
+                self._records[user_id] = record.model_copy(update={"status": StatusEnum.offline})
+            self._online.discard(user_id)
+            self._incomplete.discard(user_id)
+            if self.on_change is not None:
+                self.on_change(user_id, StatusEnum.offline.value, record.lastSeen if record is not None else None)
+        self.stats.expired += len(expired)
+        return len(expired)
+
+    # --- consultas -----------------------------------------------------
+
+    def counts(self) -> Tuple[int, int]:
+        """(total, online). Usuarios conocidos solo por tráfico local cuentan como online."""
+        total = len(self._records) + len(self._incomplete)
+        return total, len(self._online)
+
+    def online_records(self) -> Optional[List[UserPresence]]:
+        """
+        Registros de los usuarios online, o None si de alguno solo se conoce
+        el estado (se conectó por este gateway después del último resync).
+        """
+        if self._incomplete:
+            return None
+        return [self._records[user_id] for user_id in self._online]
+
+    def local_stats(self) -> Optional[PresenceStatsResponse]:
+        """Stats desde el índice, o None si aún no hubo un resync."""
+        if not self._ready:
+            return None
+        total, online = self.counts()
+        self.stats.local_answers += 1
+        return PresenceStatsResponse(
+            status="success",
+            message="Estadísticas de presencia (índice del gateway)",
+            data=PresenceStatsData(total=total, online=online, offline=total - online),
+        )
+
+    def local_online_list(self) -> Optional[PresenceListResponse]:
+        """Usuarios online desde el índice, o None si hay que preguntarle al MS."""
+        if not self._ready:
+            return None
+        users = self.online_records()
+        if users is None:
+            return None
+        self.stats.local_answers += 1
+        return PresenceListResponse(
+            status="success",
+            message="Usuarios online (índice del gateway)",
+            data=PresenceListData(total_users=len(users), users=users),
+        )
+
+    # --- resync con el MS ----------------------------------------------
+
+    def _drift(self, upstream: Dict[str, UserPresence]) -> DriftReport:
+        report = DriftReport(
+            at=datetime.now(timezone.utc),
+            online_local=len(self._online),
+            online_upstream=sum(1 for p in upstream.values() if p.status == StatusEnum.online),
+        )
+        local_ids = self._records.keys() | self._incomplete
+        report.missing_local = len(upstream.keys() - local_ids)
+        report.missing_upstream = len(local_ids - upstream.keys())
+        for user_id, presence in upstream.items():
+            if user_id in local_ids and (user_id in self._online) != (presence.status == StatusEnum.online):
+                report.status_mismatch += 1
+        return report
+
+    def load(self, presences: Iterable[UserPresence]) -> DriftReport:
+        """Reemplaza el índice con el listado del MS y devuelve el drift encontrado."""
+        upstream = best_by_user(presences)
+        # la primera carga no es drift: el índice estaba vacío
+        report = self._drift(upstream) if self._ready else DriftReport(at=datetime.now(timezone.utc))
+        now = time.time()
+        if self.on_change is not None:
+            self._notify_transitions(upstream)
+        self._records = upstream
+        self._online = set()
+        self._incomplete = set()
+        self._wheel.clear()
+        for user_id, presence in upstream.items():
+            if presence.status == StatusEnum.online:
+                # el lastSeen del MS puede ir atrasado (heartbeats agrupados):
+                # el plazo para pasar a offline se cuenta desde el resync
+                self._set_online(user_id, now)
+        self._ready = True
+        self.stats.resyncs += 1
+        self.stats.drift_total += report.total
+        self.stats.last_drift = report
+        return report
+
+    def _notify_transitions(self, upstream: Dict[str, UserPresence]) -> None:
+        """Avisa los usuarios cuyo estado online cambia al adoptar el listado del MS."""
+        for user_id in self._online - upstream.keys():
+            self.on_change(user_id, StatusEnum.offline.value, None)
+        for user_id, presence in upstream.items():
+            online = presence.status == StatusEnum.online
+            if online != (user_id in self._online):
+                self.on_change(user_id, presence.status.value, presence.lastSeen)
+
+    async def resync(self) -> DriftReport:
+        listing = await presencia_client.list_presence()
+        report = self.load(listing.data.users)
+        if report.total:
+            logger.info(
+                "Drift del índice de presencia: %d estados distintos, %d faltantes, %d sobrantes",
+                report.status_mismatch, report.missing_local, report.missing_upstream,
+            )
+        return report
+
+    async def _run(self) -> None:
+        next_resync = 0.0
+        while True:
+            now = time.monotonic()
+            if now >= next_resync:
+                try:
+                    await self.resync()
+                except Exception:  # el loop no debe morir por un resync fallido
+                    self.stats.resync_errors += 1
+                    logger.exception("Error al sincronizar el índice de presencia")
+                next_resync = now + self.resync_interval
+            self.expire()
+            await asyncio.sleep(self._wheel.slot)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        total, online = self.counts()
+        drift = self.stats.last_drift
+        return {
+            "ready": self._ready,
+            "users": total,
+            "online": online,
+            "incomplete": len(self._incomplete),
+            "resyncs": self.stats.resyncs,
+            "resync_errors": self.stats.resync_errors,
+            "expired": self.stats.expired,
+            "local_answers": self.stats.local_answers,
+            "drift_total": self.stats.drift_total,
+            "last_drift": {
+                "at": drift.at,
+                "status_mismatch": drift.status_mismatch,
+                "missing_local": drift.missing_local,
+                "missing_upstream": drift.missing_upstream,
+                "online_local": drift.online_local,
+                "online_upstream": drift.online_upstream,
+            },
+        }
+
+
+presence_index = PresenceIndex(
+    offline_after=settings.presence_index_offline_after,
+    slot=settings.presence_index_wheel_slot,
+    resync_interval=settings.presence_index_resync_interval,
+)
@@ -1,6 +1,5 @@
-import httpx
-
 from app.core.config import settings
+from app.core.upstream import get_client
 from app.services.usuarios.schemas import (
     UserRegisterIn,
     UserLoginIn,
@@ -16,17 +15,17 @@ ME_URL = f"{BASE_URL}/v1/users/me"
 
 
 async def register_user(payload: UserRegisterIn) -> UserOut:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(REGISTER_URL, json=payload.dict())
-        resp.raise_for_status()
-        return UserOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(REGISTER_URL, json=payload.dict())
+    resp.raise_for_status()
+    return UserOut.model_validate_json(resp.content)
 
 
 async def login_user(payload: UserLoginIn) -> TokenOut:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(LOGIN_URL, json=payload.dict())
-        resp.raise_for_status()
-        return TokenOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(LOGIN_URL, json=payload.dict())
+    resp.raise_for_status()
+    return TokenOut.model_validate_json(resp.content)
 
 
 async def get_me(authorization_header: str) -> UserOut:
@@ -36,20 +35,20 @@ async def get_me(authorization_header: str) -> UserOut:
     """
     headers = {"Authorization": authorization_header}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(ME_URL, headers=headers)
-        resp.raise_for_status()
-        return UserOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.get(ME_URL, headers=headers)
+    resp.raise_for_status()
+    return UserOut.model_validate_json(resp.content)
 
 
 async def update_me(authorization_header: str, payload: UserUpdateIn) -> UserOut:
     headers = {"Authorization": authorization_header}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.patch(
-            ME_URL,
-            headers=headers,
-            json=payload.dict(exclude_unset=True),
-        )
-        resp.raise_for_status()
-        return UserOut(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.patch(
+        ME_URL,
+        headers=headers,
+        json=payload.dict(exclude_unset=True),
+    )
+    resp.raise_for_status()
+    return UserOut.model_validate_json(resp.content)
@@ -2,6 +2,7 @@
 import httpx
 
 from app.core.config import settings
+from app.core.upstream import get_client
 from app.services.wikipedia.schemas import (
     ChatWikipediaRequest,
     ChatWikipediaResponse,
@@ -24,7 +25,7 @@ async def chat_wikipedia(payload: ChatWikipediaRequest) -> ChatWikipediaResponse
         pool=None,
     )
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        resp = await client.post(url, json=payload.model_dump())
-        resp.raise_for_status()
-        return ChatWikipediaResponse(**resp.json())
+    client = get_client(BASE_URL)
+    resp = await client.post(url, json=payload.model_dump(), timeout=timeout)
+    resp.raise_for_status()
+    return ChatWikipediaResponse.model_validate_json(resp.content)
@@ -0,0 +1,88 @@
+"""
+Benchmark del prefiltro de lista negra (app.services.moderacion.blacklist).
+
+Mide el throughput (MB/s) de buscar una lista negra sintética en textos
+limpios, el peor caso porque hay que recorrer el texto completo:
+
+- Aho-Corasick del gateway (solo la búsqueda y con la normalización),
+- `any(palabra in texto)`: una búsqueda por palabra (en C),
+- una expresión regular con todas las palabras en alternancia.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.blacklist_matcher [repeticiones]
+"""
+import random
+import re
+import sys
+import timeit
+from typing import Any, Callable, List
+
+from app.services.moderacion.blacklist import AhoCorasick, BlacklistMatcher, normalize
+from app.services.moderacion.schemas import WordResponse
+
+# consonantes sin vocales: no aparecen en el vocabulario de los textos
+_ALPHABET = "bcdfghjklmnpqrstvwxzñ"
+_VOCABULARY = (
+    "hola alguien tiene la solución del certamen de arquitectura de software "
+    "mañana hay ayudantía en el edificio p y después almuerzo en el casino "
+    "el profesor subió las notas del control revisen aula por favor gracias"
+).split()
+
+
+def _words(count: int, rng: random.Random) -> List[WordResponse]:
+    return [
+        WordResponse(
+            id=str(i),
+            word="".join(rng.choice(_ALPHABET) for _ in range(rng.randint(5, 10))),
+            language="es",
+            category="insulto",
+            severity="high",
+            is_active=True,
+            is_regex=False,
+            added_at="2025-01-01T00:00:00",
+            updated_at="2025-01-01T00:00:00",
+        )
+        for i in range(count)
+    ]
+
+
+def _clean_text(size: int, words: List[str], rng: random.Random) -> str:
+    parts: List[str] = []
+    length = 0
+    while length < size:
+        token = rng.choice(_VOCABULARY)
+        parts.append(token)
+        length += len(token) + 1
+    text = " ".join(parts)[:size]
+    assert not any(w in normalize(text) for w in words), "el texto debe estar limpio"
+    return text
+
+
+def _run(label: str, fn: Callable[[], Any], size: int, number: int) -> None:
+    best = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    print(f"  {label:<40} {best * 1e3:>9.3f} ms  {size / best / 1e6:>8.2f} MB/s")
+
+
+def main(number: int = 5) -> None:
+    rng = random.Random(49)
+    for word_count in (100, 1000):
+        entries = _words(word_count, rng)
+        literals = [normalize(w.word) for w in entries]
+        matcher = BlacklistMatcher(entries)
+        automaton = AhoCorasick(literals)
+        alternation = re.compile("|".join(map(re.escape, sorted(literals, key=len, reverse=True))))
+        print(f"\n{word_count} palabras — {len(automaton.goto)} nodos en el autómata")
+
+        for size in (1_000, 100_000, 1_000_000):
+            text = _clean_text(size, literals, rng)
+            normalized = normalize(text)
+            print(f" texto limpio de {size} caracteres:")
+            _run("Aho-Corasick (search)", lambda: automaton.search(normalized), size, number)
+            _run("BlacklistMatcher.search (+ normalize)", lambda: matcher.search(text), size, number)
+            _run("normalize", lambda: normalize(text), size, number)
+            _run("any(palabra in texto)", lambda: any(w in normalized for w in literals), size, number)
+            _run("regex en alternancia", lambda: alternation.search(normalized), size, number)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
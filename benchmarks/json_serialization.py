@@ -0,0 +1,116 @@
+"""
+Benchmark de serialización / deserialización JSON del gateway.
+
+Compara, sobre payloads realistas (página de 200 mensajes, 1000 miembros de
+canal y 1000 registros de presencia):
+
+- Respuesta: jsonable_encoder + json (FastAPI clásico), dump_json de Pydantic
+  (FastAPI reciente con response_model), TypeAdapter.dump_python + dumps del
+  gateway (clase de respuesta propia) y dumps del gateway sobre el modelo.
+- Upstream: Model(**resp.json()) contra Model.model_validate_json(resp.content).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.json_serialization [repeticiones]
+"""
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core import serialization
+from app.services.canales.schemas import ChannelMember
+from app.services.mensajes.schemas import MessagesPageOut
+from app.services.presencia.schemas import PresenceListResponse
+
+
+def _messages_page() -> MessagesPageOut:
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    thread_id = uuid.uuid4()
+    items = [
+        {
+            "id": uuid.uuid4(),
+            "thread_id": thread_id,
+            "user_id": uuid.uuid4(),
+            "type": "text",
+            "content": f"Mensaje {i}: ¿alguien tiene la solución del certamen? " * 2,
+            "paths": [f"threads/{thread_id}/adjunto-{i}.pdf"] if i % 5 == 0 else None,
+            "created_at": now + timedelta(seconds=i),
+            "updated_at": now + timedelta(seconds=i),
+        }
+        for i in range(200)
+    ]
+    return MessagesPageOut(items=items, next_cursor="eyJvZmZzZXQiOjIwMH0", has_more=True)
+
+
+def _members() -> List[ChannelMember]:
+    return [
+        ChannelMember(id=str(uuid.uuid4()), joined_at=1735732800.0 + i, status="normal")
+        for i in range(1000)
+    ]
+
+
+def _presence() -> PresenceListResponse:
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    users = [
+        {
+            "id": str(uuid.uuid4()),
+            "userId": f"user-{i}",
+            "device": "web",
+            "status": "online" if i % 3 else "offline",
+            "connectedAt": now,
+            "lastSeen": now + timedelta(seconds=i),
+        }
+        for i in range(1000)
+    ]
+    return PresenceListResponse(
+        status="success",
+        message="ok",
+        data={"total_users": len(users), "users": users},
+    )
+
+
+def _run(label: str, fn: Callable[[], Any], number: int) -> None:
+    best = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    print(f"  {label:<46} {best * 1e6:>10.1f} µs")
+
+
+def main(number: int = 200) -> None:
+    payloads: Dict[str, Any] = {
+        "MessagesPageOut (200 mensajes)": (_messages_page(), MessagesPageOut),
+        "List[ChannelMember] (1000)": (_members(), List[ChannelMember]),
+        "PresenceListResponse (1000)": (_presence(), PresenceListResponse),
+    }
+    print(f"backend del gateway: {serialization.BACKEND}")
+
+    for name, (value, model) in payloads.items():
+        adapter = TypeAdapter(model)
+        raw = adapter.dump_json(value)
+        print(f"\n{name} — {len(raw)} bytes")
+
+        print(" respuesta:")
+        _run("jsonable_encoder + json.dumps", lambda: json.dumps(jsonable_encoder(value)).encode(), number)
+        _run("TypeAdapter.dump_json (FastAPI nativo)", lambda: adapter.dump_json(value), number)
+        _run(
+            "dump_python(mode=json) + gateway dumps",
+            lambda: serialization.dumps(adapter.dump_python(value, mode="json")),
+            number,
+        )
+        _run("gateway dumps (modelo directo)", lambda: serialization.dumps(value), number)
+
+        print(" upstream:")
+        if isinstance(value, list):
+            item_model = model.__args__[0]
+            _run("[Model(**item) for item in json.loads()]", lambda: [item_model(**i) for i in json.loads(raw)], number)
+        else:
+            _run("Model(**json.loads())", lambda: model(**json.loads(raw)), number)
+            _run("Model(**gateway loads())", lambda: model(**serialization.loads(raw)), number)
+        _run("validate_json (Pydantic, sin dict intermedio)", lambda: adapter.validate_json(raw), number)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,46 @@
+"""
+Fixtures comunes.
+
+Los microservicios se simulan con `httpx.MockTransport`: todo cliente httpx
+que cree el gateway durante el test responde con el handler de `upstream`.
+"""
+from typing import Callable, List, Optional
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+class Upstream:
+    def __init__(self) -> None:
+        self.handler: Optional[Handler] = None
+        self.requests: List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.handler is None:
+            return httpx.Response(404, json={"detail": "sin handler en el test"})
+        return self.handler(request)
+
+
+@pytest.fixture
+def upstream(monkeypatch: pytest.MonkeyPatch) -> Upstream:
+    mock = Upstream()
+    original = httpx.AsyncClient.__init__
+
+    def init(self, *args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(mock)
+        original(self, *args, **kwargs)
+
+    monkeypatch.setattr(httpx.AsyncClient, "__init__", init)
+    return mock
+
+
+@pytest.fixture
+def client(upstream: Upstream) -> TestClient:
+    # sin `with`: no corre el lifespan (pollers, resync, etc.)
+    return TestClient(app)
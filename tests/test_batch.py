@@ -0,0 +1,68 @@
+import uuid
+
+import httpx
+
+from app.api.batch.v1.routes import _to_item
+from app.api.batch.v1.schemas import BatchSubRequest
+from app.core.dispatch import SubResponse
+
+BATCH = "/api/v1/batch"
+
+
+def _batch(client, *paths):
+    response = client.post(BATCH, json={"requests": [{"id": str(i), "path": p} for i, p in enumerate(paths)]})
+    assert response.status_code == 200
+    return response.json()["responses"]
+
+
+def test_nested_batch_is_rejected(client):
+    [item] = _batch(client, BATCH)
+    assert item["status"] == 400
+
+
+def test_percent_encoded_nested_batch_is_rejected(client):
+    [plain, encoded] = _batch(client, "/api/v1/ba%74ch", "/api/v1/%62atch/")
+    assert plain["status"] == 400
+    assert encoded["status"] == 400
+    assert plain["body"]["detail"] == "No se permiten batches anidados"
+
+
+def test_encoded_prefix_is_checked_after_decoding(client):
+    [item] = _batch(client, "/%61pi/v1/canales/")
+    # decodificada calza con el prefijo y llega al router (no es un 400 del batch)
+    assert item["status"] != 400
+
+
+def test_path_outside_api_is_rejected(client):
+    [item] = _batch(client, "/stats/upstream")
+    assert item["status"] == 400
+
+
+def test_ndjson_sub_response_is_returned_as_text(client, upstream):
+    thread_id = str(uuid.uuid4())
+    messages = [
+        {"id": str(uuid.UUID(int=i)), "thread_id": thread_id, "user_id": str(uuid.uuid4()), "content": f"m{i}"}
+        for i in (1, 2)
+    ]
+    upstream.handler = lambda request: httpx.Response(
+        200, json={"items": messages, "next_cursor": None, "has_more": False},
+    )
+
+    [item] = _batch(client, f"/api/v1/mensajes/threads/{thread_id}/export?format=ndjson")
+    assert item["status"] == 200
+    assert isinstance(item["body"], str)
+    assert len(item["body"].splitlines()) == 2
+
+
+def test_invalid_json_fails_only_that_item():
+    item = BatchSubRequest(id="x", path="/api/v1/algo")
+    response = SubResponse(200, [(b"content-type", b"application/json")], b"{no es json")
+    result = _to_item(item, response)
+    assert result.status == 502
+    assert result.id == "x"
+
+
+def test_json_suffix_media_types_are_parsed():
+    item = BatchSubRequest(path="/api/v1/algo")
+    response = SubResponse(200, [(b"content-type", b"application/problem+json; charset=utf-8")], b'{"a": 1}')
+    assert _to_item(item, response).body == {"a": 1}
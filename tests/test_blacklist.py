@@ -0,0 +1,97 @@
+import asyncio
+import random
+
+import pytest
+
+from app.services.moderacion import blacklist
+from app.services.moderacion.blacklist import AhoCorasick, BlacklistMatcher, BlacklistMirror, normalize
+from app.services.moderacion.schemas import BlacklistWordsResponse, WordResponse
+
+
+def _word(word, is_regex=False, is_active=True):
+    return WordResponse(
+        id=word,
+        word=word,
+        language="es",
+        category="insulto",
+        severity="high",
+        is_active=is_active,
+        is_regex=is_regex,
+        added_at="2026-01-01T00:00:00Z",
+        updated_at="2026-01-01T00:00:00Z",
+    )
+
+
+def test_normalize_folds_case_accents_and_spaces():
+    assert normalize("  ÁRBOL   Pingüino\tÑandú ") == " arbol pinguino nandu "
+    assert normalize("Hola  Mundo") == "hola mundo"
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+
+    assert automaton.find_all("ushers") == ["she", "he", "hers"]
+    assert automaton.search("ahishers") == "his"
+    assert automaton.search("nada aqui") is None
+
+
+def test_aho_corasick_matches_naive_search():
+    rng = random.Random(49)
+    for _ in range(200):
+        patterns = {"".join(rng.choices("abc", k=rng.randint(1, 4))) for _ in range(rng.randint(1, 8))}
+        text = "".join(rng.choices("abcd", k=rng.randint(0, 30)))
+        automaton = AhoCorasick(patterns)
+
+        expected = {p for p in patterns if p in text}
+        assert set(automaton.find_all(text)) == expected
+        assert (automaton.search(text) is None) == (not expected)
+
+
+def test_aho_corasick_ignores_empty_patterns():
+    automaton = AhoCorasick(["", "x"])
+
+    assert len(automaton) == 1
+    assert automaton.search("abc") is None
+
+
+def test_matcher_normalizes_literals_and_skips_inactive_words():
+    matcher = BlacklistMatcher([_word("Tonto"), _word("Bobó"), _word("feo", is_active=False)])
+
+    assert matcher.search("eres un TONTO") == "tonto"
+    assert matcher.search("bobo") == "bobo"
+    assert matcher.search("qué feo") is None
+
+
+def test_matcher_checks_regexes_on_raw_and_normalized_text():
+    matcher = BlacklistMatcher([_word(r"t[o0]nt[o0]", is_regex=True), _word(r"cañ[oó]n", is_regex=True)])
+
+    assert matcher.search("T0NTO") == r"t[o0]nt[o0]"
+    assert matcher.search("CAÑÓN") == r"cañ[oó]n"
+    assert matcher.search("hola") is None
+
+
+def test_matcher_rejects_invalid_regex():
+    with pytest.raises(ValueError):
+        BlacklistMatcher([_word("(sin cerrar", is_regex=True)])
+
+
+def test_mirror_pages_words_and_forwards_until_loaded(monkeypatch):
+    words = [_word(f"palabra{i}") for i in range(5)]
+    pages = []
+
+    async def list_words(limit, skip):
+        pages.append(skip)
+        return BlacklistWordsResponse(total=len(words), words=words[skip:skip + limit])
+
+    monkeypatch.setattr(blacklist.moderacion_client, "list_words", list_words)
+    mirror = BlacklistMirror(refresh_interval=60, page_size=2)
+
+    assert mirror.check("hola") is None
+    asyncio.run(mirror.load())
+
+    assert pages == [0, 2, 4]
+    assert mirror.check("hola") is True
+    assert mirror.check("una PALABRA3 aquí") is False
+    mirror.invalidate()
+    assert mirror.check("hola") is None
+    assert mirror.stats.unready == 2
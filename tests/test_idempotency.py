@@ -0,0 +1,124 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from app.core.idempotency import REPLAYED_HEADER, IdempotencyStore
+
+
+def _store() -> IdempotencyStore:
+    return IdempotencyStore(ttl=60, max_entries=100, max_key_length=16)
+
+
+class Counter:
+    def __init__(self, error=None) -> None:
+        self.calls = 0
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return {"n": self.calls}
+
+
+def test_same_key_replays_first_result():
+    async def scenario():
+        store, call, response = _store(), Counter(), Response()
+        first = await store.run("create:u1", "k", "body", call)
+        second = await store.run("create:u1", "k", "body", call, response)
+        return first, second, call.calls, response.headers.get(REPLAYED_HEADER)
+
+    first, second, calls, replayed = asyncio.run(scenario())
+    assert first == second == {"n": 1}
+    assert calls == 1
+    assert replayed == "true"
+
+
+def test_concurrent_duplicates_share_one_call():
+    async def scenario():
+        store, call = _store(), Counter()
+        results = await asyncio.gather(*(store.run("create:u1", "k", "body", call) for _ in range(5)))
+        return results, call.calls, store.stats.waited
+
+    results, calls, waited = asyncio.run(scenario())
+    assert results == [{"n": 1}] * 5
+    assert calls == 1
+    assert waited == 4
+
+
+def test_reused_key_with_other_body_is_rejected():
+    async def scenario():
+        store, call = _store(), Counter()
+        await store.run("create:u1", "k", "body", call)
+        await store.run("create:u1", "k", "otro body", call)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(scenario())
+    assert exc.value.status_code == 422
+
+
+@pytest.mark.parametrize("key", ["", "x" * 17])
+def test_invalid_key_length_is_rejected(key):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_store().run("create:u1", key, "body", Counter()))
+    assert exc.value.status_code == 400
+
+
+def test_keys_are_scoped_per_user():
+    async def scenario():
+        store, call = _store(), Counter()
+        first = await store.run("create:u1", "k", "body", call)
+        second = await store.run("create:u2", "k", "body", call)
+        return first, second
+
+    assert asyncio.run(scenario()) == ({"n": 1}, {"n": 2})
+
+
+def test_client_errors_are_replayed_but_server_errors_are_retried():
+    async def scenario():
+        store = _store()
+        rejected = Counter(HTTPException(status_code=409, detail="conflicto"))
+        failing = Counter(HTTPException(status_code=503, detail="caído"))
+        for call, key in ((rejected, "a"), (rejected, "a"), (failing, "b"), (failing, "b")):
+            with pytest.raises(HTTPException):
+                await store.run("create:u1", key, "body", call)
+        return rejected.calls, failing.calls
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_without_key_every_call_runs():
+    async def scenario():
+        store, call = _store(), Counter()
+        await store.run("create:u1", None, "body", call)
+        await store.run("create:u1", None, "body", call)
+        return call.calls
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_create_message_retry_does_not_post_twice(client, upstream):
+    thread_id, user_id = str(uuid.uuid4()), str(uuid.uuid4())
+    created = {
+        "id": str(uuid.uuid4()),
+        "thread_id": thread_id,
+        "user_id": user_id,
+        "content": "hola",
+        "created_at": "2026-01-01T00:00:00Z",
+    }
+    upstream.handler = lambda request: httpx.Response(201, json=created)
+    headers = {"X-User-Id": user_id, "Idempotency-Key": f"retry-{uuid.uuid4().hex[:8]}"}
+    url = f"/api/v1/mensajes/threads/{thread_id}/messages"
+
+    first = client.post(url, json={"content": "hola"}, headers=headers)
+    second = client.post(url, json={"content": "hola"}, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert second.headers.get(REPLAYED_HEADER) == "true"
+    assert [r.method for r in upstream.requests] == ["POST"]
@@ -0,0 +1,130 @@
+import uuid
+
+import httpx
+import pytest
+
+from app.core.config import settings
+
+
+class FakeMessages:
+    """MS de mensajes en memoria: páginas del más nuevo al más antiguo con cursor = offset."""
+
+    def __init__(self, thread_id: str, count: int) -> None:
+        self.thread_id = thread_id
+        self.user_id = str(uuid.uuid4())
+        self.store = []
+        for _ in range(count):
+            self._add()
+
+    def _add(self) -> dict:
+        i = len(self.store) + 1
+        message = {
+            "id": str(uuid.UUID(int=i)),
+            "thread_id": self.thread_id,
+            "user_id": self.user_id,
+            "content": f"m{i}",
+            "created_at": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+            "updated_at": None,
+        }
+        self.store.append(message)
+        return message
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "GET":
+            offset = int(request.url.params.get("cursor") or 0)
+            limit = int(request.url.params["limit"])
+            newest = list(reversed(self.store))
+            more = offset + limit < len(newest)
+            return httpx.Response(200, json={
+                "items": newest[offset:offset + limit],
+                "next_cursor": str(offset + limit) if more else None,
+                "has_more": more,
+            })
+        if request.method == "POST":
+            return httpx.Response(201, json=self._add())
+        message_id = request.url.path.rsplit("/", 1)[1]
+        if request.method == "PUT":
+            for message in self.store:
+                if message["id"] == message_id:
+                    message["content"] = "editado"
+                    message["updated_at"] = "2026-01-01T01:00:00Z"
+                    return httpx.Response(200, json=message)
+        if request.method == "DELETE":
+            self.store[:] = [m for m in self.store if m["id"] != message_id]
+            return httpx.Response(204)
+        return httpx.Response(404, json={"detail": "no encontrado"})
+
+
+@pytest.fixture
+def messages(upstream):
+    fake = FakeMessages(str(uuid.uuid4()), count=20)
+    upstream.handler = fake
+    return fake
+
+
+def _base(messages):
+    return f"/api/v1/mensajes/threads/{messages.thread_id}"
+
+
+def _delta(client, messages, since=None, limit=5):
+    params = {"limit": limit}
+    if since is not None:
+        params["since"] = since
+    response = client.get(_base(messages) + "/delta", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_delta_without_checkpoint_resets_with_first_page(client, messages):
+    body = _delta(client, messages)
+
+    assert body["reset"] is True
+    assert [m["content"] for m in body["created"]] == ["m20", "m19", "m18", "m17", "m16"]
+    assert body["checkpoint"]
+
+
+def test_delta_returns_created_updated_and_deleted_since_checkpoint(client, messages):
+    checkpoint = _delta(client, messages)["checkpoint"]
+    base, headers = _base(messages), {"X-User-Id": messages.user_id}
+    for _ in range(7):
+        client.post(base + "/messages", json={"content": "x"}, headers=headers)
+    client.put(f"{base}/messages/{uuid.UUID(int=2)}", json={"content": "e"}, headers=headers)
+    client.delete(f"{base}/messages/{uuid.UUID(int=3)}", headers=headers)
+    client.delete(f"{base}/messages/{uuid.UUID(int=22)}", headers=headers)
+
+    body = _delta(client, messages, since=checkpoint)
+
+    assert body["reset"] is False
+    assert body["journal_complete"] is True
+    created = {m["id"] for m in body["created"]}
+    assert created == {str(uuid.UUID(int=i)) for i in (21, 23, 24, 25, 26, 27)}
+    assert [m["id"] for m in body["updated"]] == [str(uuid.UUID(int=2))]
+    assert set(body["deleted"]) == {str(uuid.UUID(int=3)), str(uuid.UUID(int=22))}
+
+
+def test_delta_from_latest_checkpoint_is_empty(client, messages):
+    checkpoint = _delta(client, messages)["checkpoint"]
+
+    body = _delta(client, messages, since=checkpoint)
+
+    assert (body["created"], body["updated"], body["deleted"]) == ([], [], [])
+    assert body["reset"] is False
+
+
+def test_delta_resets_when_changes_exceed_max_pages(client, messages, monkeypatch):
+    monkeypatch.setattr(settings, "messages_delta_max_pages", 2)
+    checkpoint = _delta(client, messages)["checkpoint"]
+    headers = {"X-User-Id": messages.user_id}
+    for _ in range(15):
+        client.post(_base(messages) + "/messages", json={"content": "x"}, headers=headers)
+
+    body = _delta(client, messages, since=checkpoint)
+
+    assert body["reset"] is True
+    assert len(body["created"]) == 5
+
+
+def test_delta_rejects_invalid_checkpoint(client, messages):
+    response = client.get(_base(messages) + "/delta", params={"since": "basura"})
+
+    assert response.status_code == 400
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+
+from app.services.mensajes.importer import ndjson_lines
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def _collect(lines):
+    return [item async for item in lines]
+
+
+def test_ndjson_lines_joins_chunks_and_skips_blank_lines():
+    lines = ndjson_lines(_chunks(b'{"a": 1}\n\n{"b"', b': 2}\n  \n{"c": 3}'), max_line_bytes=100)
+
+    assert asyncio.run(_collect(lines)) == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (5, b'{"c": 3}')]
+
+
+def test_ndjson_lines_rejects_oversized_line():
+    lines = ndjson_lines(_chunks(b'{"a": 1}\n', b"x" * 20, b"y" * 20), max_line_bytes=32)
+
+    with pytest.raises(ValueError):
+        asyncio.run(_collect(lines))
+
+
+def _created(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    thread_id = request.url.path.split("/")[-2]
+    return httpx.Response(201, json={
+        "id": str(uuid.uuid4()),
+        "thread_id": thread_id,
+        "user_id": request.headers["X-User-Id"],
+        "content": body["content"],
+        "created_at": "2026-01-01T00:00:00Z",
+    })
+
+
+def test_import_creates_lines_in_order_per_thread(client, upstream):
+    upstream.handler = _created
+    t1, t2 = str(uuid.uuid4()), str(uuid.uuid4())
+    u1, u2 = str(uuid.uuid4()), str(uuid.uuid4())
+    body = "\n".join([
+        json.dumps({"thread_id": t1, "content": "a1"}),
+        json.dumps({"thread_id": t2, "content": "b1"}),
+        "no es json",
+        json.dumps({"thread_id": t1, "content": "a2"}),
+        json.dumps({"thread_id": t2, "content": "b2", "user_id": u2}),
+        json.dumps({"thread_id": t1, "content": "a3"}),
+    ])
+
+    response = client.post("/api/v1/mensajes/import", content=body, headers={"X-User-Id": u1})
+
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert results[-1] == {"summary": {"lines": 6, "created": 5, "failed": 1}}
+    by_line = {r["line"]: r for r in results[:-1]}
+    assert by_line[3]["status_code"] == 422
+    assert all(by_line[n]["status_code"] == 201 for n in (1, 2, 4, 5, 6))
+
+    sent = [(r.url.path.split("/")[-2], json.loads(r.content)["content"], r.headers["X-User-Id"]) for r in upstream.requests]
+    assert [c for t, c, _ in sent if t == t1] == ["a1", "a2", "a3"]
+    assert [(c, u) for t, c, u in sent if t == t2] == [("b1", u1), ("b2", u2)]
+
+
+def test_import_without_user_fails_the_line(client, upstream):
+    upstream.handler = _created
+    body = json.dumps({"thread_id": str(uuid.uuid4()), "content": "x"})
+
+    response = client.post("/api/v1/mensajes/import", content=body)
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert results[0]["status_code"] == 422
+    assert results[-1]["summary"]["created"] == 0
+    assert upstream.requests == []
@@ -0,0 +1,94 @@
+import httpx
+import pytest
+
+from app.api.presencia.v1 import routes as presencia_routes
+from app.core.config import settings
+from app.services.presencia.index import PresenceIndex, TimingWheel
+
+
+@pytest.fixture
+def index(monkeypatch):
+    fresh = PresenceIndex(offline_after=30, slot=1, resync_interval=60)
+    monkeypatch.setattr(presencia_routes, "presence_index", fresh)
+    return fresh
+
+
+@pytest.fixture
+def direct_heartbeats(monkeypatch):
+    monkeypatch.setattr(settings, "presence_heartbeat_write_behind", False)
+
+
+def test_rejected_heartbeat_does_not_mark_user_online(client, upstream, index, direct_heartbeats):
+    upstream.handler = lambda request: httpx.Response(404, json={"detail": "Usuario no encontrado"})
+
+    response = client.patch("/api/v1/presencia/u1", json={"heartbeat": True})
+
+    assert response.status_code == 404
+    assert index.counts() == (0, 0)
+    assert index.online_records() == []
+
+
+def test_accepted_heartbeat_marks_user_online(client, upstream, index, direct_heartbeats):
+    upstream.handler = lambda request: httpx.Response(200, json={"status": "success", "message": "ok"})
+
+    response = client.patch("/api/v1/presencia/u1", json={"heartbeat": True})
+
+    assert response.status_code == 200
+    assert index.counts() == (1, 1)
+
+
+def test_write_behind_heartbeat_marks_user_online(client, upstream, index, monkeypatch):
+    monkeypatch.setattr(settings, "presence_heartbeat_write_behind", True)
+    recorded = []
+    monkeypatch.setattr(presencia_routes.heartbeat_aggregator, "record", recorded.append)
+
+    response = client.patch("/api/v1/presencia/u1", json={"heartbeat": True})
+
+    assert response.status_code == 200
+    assert recorded == ["u1"]
+    assert upstream.requests == []
+    assert index.counts() == (1, 1)
+
+
+def test_timing_wheel_expires_only_past_deadlines():
+    wheel = TimingWheel(slot=1, slots=4)
+    wheel.schedule("a", 10.5)
+    wheel.schedule("b", 12.0)
+
+    assert wheel.advance(10.0) == []
+    assert wheel.advance(10.6) == ["a"]
+    assert wheel.advance(11.9) == []
+    assert wheel.advance(12.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_timing_wheel_reschedule_and_cancel():
+    wheel = TimingWheel(slot=1, slots=4)
+    wheel.advance(0.0)
+    wheel.schedule("a", 1.5)
+    wheel.schedule("a", 3.5)
+    wheel.schedule("b", 2.0)
+    wheel.cancel("b")
+
+    assert wheel.advance(2.5) == []
+    assert wheel.advance(3.5) == ["a"]
+
+
+def test_timing_wheel_catches_up_after_more_than_one_turn():
+    wheel = TimingWheel(slot=1, slots=4)
+    wheel.advance(0.0)
+    wheel.schedule("a", 2.0)
+    wheel.schedule("b", 3.0)
+
+    assert sorted(wheel.advance(50.0)) == ["a", "b"]
+
+
+def test_index_expires_users_without_heartbeats(index):
+    changes = []
+    index.on_change = lambda user_id, state, last_seen: changes.append((user_id, state))
+    index._set_online("u1", now=100.0)
+    index._set_online("u2", now=120.0)
+
+    assert index.expire(now=131.0) == 1
+    assert changes == [("u1", "offline")]
+    assert index.counts()[1] == 1
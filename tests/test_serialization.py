@@ -0,0 +1,23 @@
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+
+from app.core.serialization import FASTAPI_NATIVE_JSON, GatewayJSONResponse
+from app.main import app
+
+
+def _api_routes():
+    return [r for r in app.routes if isinstance(r, APIRoute)]
+
+
+def test_native_pydantic_serialization_is_kept():
+    routes = _api_routes()
+    assert routes
+    for route in routes:
+        if FASTAPI_NATIVE_JSON:
+            # con una clase explícita FastAPI deja de usar dump_json
+            assert isinstance(route.response_class, DefaultPlaceholder), route.path
+        else:
+            response_class = route.response_class
+            if isinstance(response_class, DefaultPlaceholder):
+                response_class = response_class.value
+            assert issubclass(response_class, GatewayJSONResponse), route.path
@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+from app.api.views.v1 import routes as views_routes
+from app.services.archivos.schemas import FileOut
+
+
+def _file(name, deleted=False):
+    now = datetime.now(timezone.utc)
+    return FileOut(
+        id=uuid.uuid4(),
+        filename=name,
+        mime_type="text/plain",
+        size=1,
+        bucket="b",
+        object_key=name,
+        thread_id="t1",
+        checksum_sha256="0" * 64,
+        created_at=now,
+        deleted_at=now if deleted else None,
+    )
+
+
+def _stub_sections(monkeypatch, files):
+    async def get_thread(thread_id):
+        return None
+
+    async def list_messages(**kwargs):
+        request = httpx.Request("GET", "http://mensajes/threads")
+        raise httpx.HTTPStatusError("boom", request=request, response=httpx.Response(503, request=request))
+
+    async def list_files(**kwargs):
+        return files
+
+    monkeypatch.setattr(views_routes.hilos_client, "get_thread", get_thread)
+    monkeypatch.setattr(views_routes.mensajes_client, "list_messages", list_messages)
+    monkeypatch.setattr(views_routes.archivos_client, "list_files", list_files)
+
+
+def test_deleted_files_skipped_when_messages_section_fails(client, monkeypatch):
+    _stub_sections(monkeypatch, [_file("vivo.txt"), _file("borrado.txt", deleted=True)])
+
+    response = client.get("/api/v1/views/thread/t1", params={"fields": "messages,attachments"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert "messages" in body["errors"]
+    assert [f["filename"] for f in body["attachments"]] == ["vivo.txt"]
+
+
+def test_deleted_files_skipped_without_messages(client, monkeypatch):
+    _stub_sections(monkeypatch, [_file("vivo.txt"), _file("borrado.txt", deleted=True)])
+
+    response = client.get("/api/v1/views/thread/t1", params={"fields": "attachments"})
+
+    assert response.status_code == 200
+    assert [f["filename"] for f in response.json()["attachments"]] == ["vivo.txt"]
@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.archivos.schemas import FileOut
+from app.services.archivos.zip_stream import unique_entry_names
+
+
+def _file(filename):
+    return FileOut(
+        id=uuid.uuid4(),
+        filename=filename,
+        mime_type="text/plain",
+        size=1,
+        bucket="b",
+        object_key="k",
+        checksum_sha256="0" * 64,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("../../x", "x"),
+        ("a/../../x", "a/x"),
+        ("/etc/passwd", "etc/passwd"),
+        ("..\\..\\win.ini", "win.ini"),
+        ("C:\\Windows\\x.dll", "Windows/x.dll"),
+        ("./informe.pdf", "informe.pdf"),
+    ],
+)
+def test_entry_names_cannot_escape_the_archive(filename, expected):
+    [(name, _)] = unique_entry_names([_file(filename)])
+    assert name == expected
+
+
+def test_empty_entry_name_falls_back_to_id():
+    file = _file("../..")
+    [(name, _)] = unique_entry_names([file])
+    assert name == str(file.id)
+
+
+def test_duplicate_names_get_a_counter():
+    names = [name for name, _ in unique_entry_names([_file("informe.pdf"), _file("../informe.pdf")])]
+    assert names == ["informe.pdf", "informe (1).pdf"]